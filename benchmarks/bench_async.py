@@ -0,0 +1,98 @@
+# async_control.py: 1 to 20 simulated toys driven at 20 Hz (heading and
+# speed every tick, 10 ms BLE round trip each), one control thread per toy
+# against one asyncio loop for all of them. late_p95_ms is how far a tick
+# finished after its deadline (simulated time), from the same fixed-bucket
+# histogram (tracing.Histogram, sqrt(2) steps) for both, cpu_ms the process
+# CPU time for 10 simulated seconds (2 s real, clock at 5x).
+import asyncio
+import threading
+import time
+
+import common  # noqa: F401
+
+import async_control
+import simulator
+from backend import SpheroEduAPI
+from tracing import Histogram
+
+FLEETS = (1, 5, 10, 20)
+PERIOD = 0.05
+SECONDS = 10.0
+
+
+def fleet(n, clock):
+    return [simulator.SimToy('SB-FLEET%02d' % i, clock=clock, latency=0.01, jitter=0.002, seed=i)
+            for i in range(n)]
+
+
+def thread_loop(toy, clock, late):
+    # the threaded controllers' shape: blocking calls, absolute deadlines
+    with SpheroEduAPI(toy) as api:
+        start = deadline = clock.perf_counter()
+        tick = 0
+        while deadline - start < SECONDS:
+            api.set_heading((tick * 5) % 360)
+            api.set_speed(60)
+            tick += 1
+            deadline += PERIOD
+            now = clock.perf_counter()
+            if now - deadline > PERIOD:
+                deadline = now
+            elif now < deadline:
+                clock.sleep(deadline - now)
+            late.add(max(0.0, clock.perf_counter() - deadline))
+
+
+def run_threads(n):
+    clock = simulator.VirtualClock(5)
+    toys = fleet(n, clock)
+    lates = [Histogram() for _ in toys]
+    threads = [threading.Thread(target=thread_loop, args=(toy, clock, late))
+               for toy, late in zip(toys, lates)]
+    cpu = time.process_time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    late = Histogram()
+    for h in lates:
+        late.merge(h)
+    return late.percentile(0.95), time.process_time() - cpu
+
+
+async def async_fleet(toys):
+    apis = [async_control.AsyncSpheroAPI(toy) for toy in toys]
+    for api in apis:
+        await api.__aenter__()
+    results = await async_control.run_fleet(apis, async_control.circle_step, PERIOD, SECONDS)
+    for api in apis:
+        await api.__aexit__(None, None, None)
+    late = Histogram()
+    for r in results:
+        late.merge(r.late)
+    return late
+
+
+def run_async(n):
+    clock = simulator.VirtualClock(5)
+    cpu = time.process_time()
+    late = asyncio.run(async_fleet(fleet(n, clock)))
+    return late.percentile(0.95), time.process_time() - cpu
+
+
+def bench_async_fleet():
+    metrics = {}
+    for n in FLEETS:
+        late, cpu = run_async(n)
+        metrics['async_%d_late_p95_ms' % n] = late * 1e3
+        metrics['async_%d_cpu_ms' % n] = cpu * 1e3
+    return metrics
+
+
+def bench_thread_fleet():
+    metrics = {}
+    for n in FLEETS:
+        late, cpu = run_threads(n)
+        metrics['threads_%d_late_p95_ms' % n] = late * 1e3
+        metrics['threads_%d_cpu_ms' % n] = cpu * 1e3
+    return metrics
@@ -0,0 +1,47 @@
+# battery.py: how well the smoothed discharge slope predicts the time left
+# and when the critical stop fires, on a simulated BOLT that drains 1.5 V/h
+# and sags under random motor load (readings are rounded to 10 mV like the
+# robot's). Reading the published status is compared with the BLE round trip
+# each control loop paid before (30 ms link latency).
+import random
+
+from common import best_of
+
+import battery
+import simulator
+from backend import Power, SpheroEduAPI
+
+DRAIN_PER_HOUR = 1.5
+PERIOD = 30.0
+
+
+def bench_battery_prediction():
+    clock = simulator.VirtualClock(float('inf'))
+    toy = simulator.SimToy('SB-BATT', clock=clock, latency=0.03, jitter=0.0,
+                           drain_per_hour=DRAIN_PER_HOUR, seed=1)
+    fired = []
+    monitor = battery.BatteryMonitor(toy, period=PERIOD, on_critical=lambda s: fired.append(clock.perf_counter()),
+                                     log=lambda *a: None)
+    load = random.Random(1)
+    errors = []
+    with SpheroEduAPI(toy) as api:
+        # unloaded voltage reaches the critical level here
+        critical_at = toy.started + (toy.full_voltage - battery.CRITICAL_V) / DRAIN_PER_HOUR * 3600
+        while not fired and clock.perf_counter() < critical_at + 600:
+            api.set_speed(load.choice([0, 60, 120, 200]))
+            status = monitor.sample()
+            if status.minutes_left is not None and clock.perf_counter() - toy.started > 300:
+                errors.append(abs(status.minutes_left * 60 - (critical_at - clock.perf_counter())))
+            clock.advance(PERIOD)
+        api.set_speed(0)
+        blocking = clock.perf_counter()
+        Power.get_battery_voltage(toy)
+        blocking = clock.perf_counter() - blocking
+    return {
+        'predict_err_mean_s': sum(errors) / len(errors),
+        'predict_err_max_s': max(errors),
+        'critical_late_s': fired[0] - critical_at if fired else float('nan'),
+        'reads': monitor.reads,
+        'blocking_read_ms': blocking * 1e3,
+        'status_read_us': best_of(lambda: monitor.status.state, number=100000) * 1e6,
+    }
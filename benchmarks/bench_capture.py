@@ -0,0 +1,113 @@
+# capture.py: three consumers of one 1280x960 20 fps MJPEG camera
+# (fakemjpeg.py), each in its own process like turtleCam.py, recordTurtle.py
+# and a vision script. "independent" is every consumer opening and decoding
+# the stream itself; "shared" is the capture daemon decoding once into a
+# FrameRing with the consumers attached to it. cpu_s is the CPU time of all
+# the processes (not the fake camera) over SECONDS once they are running,
+# pss_bytes their summed proportional set size (shared pages counted once in
+# total), consumer_fps the frames each consumer got per second.
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from common import ROOT, Skip, require
+
+import fakemjpeg
+
+CONSUMERS = 3
+SECONDS = 4.0
+WARMUP = 1.5
+
+
+def consume(camera, url, stop, frames):
+    # stands in for showing/recording/analysing a frame: read every 8th pixel
+    import capture
+    import cv2
+    source = capture.SharedCapture(camera) if url is None else cv2.VideoCapture(url)
+    n = 0
+    while not stop.is_set():
+        ok, frame = source.read()
+        if not ok:
+            break
+        frame[::8, ::8].mean()
+        n += 1
+    source.release()
+    frames.put(n)
+
+
+def pss(pid):
+    try:
+        with open('/proc/%d/smaps_rollup' % pid) as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def cpu(pid):
+    # utime + stime of all the threads of pid, in seconds
+    with open('/proc/%d/stat' % pid) as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def run(shared, url):
+    ctx = multiprocessing.get_context('spawn')
+    stop, frames = ctx.Event(), ctx.Queue()
+    pids, daemon = [], None
+    if shared:
+        # its own process group and resource tracker, as when run by hand
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, 'cameraStreams', 'capture.py'),
+                                   '--camera', 'bench=' + url], stdout=subprocess.DEVNULL)
+        deadline = time.monotonic() + 10
+        while not os.path.exists('/dev/shm/frames-bench'):
+            if time.monotonic() > deadline or daemon.poll() is not None:
+                daemon.kill()
+                raise Skip('capture daemon did not start')
+            time.sleep(0.05)
+        pids.append(daemon.pid)
+    procs = [ctx.Process(target=consume, args=('bench', None if shared else url, stop, frames))
+             for _ in range(CONSUMERS)]
+    for p in procs:
+        p.start()
+    pids += [p.pid for p in procs]
+    time.sleep(WARMUP)
+    start = sum(cpu(pid) for pid in pids)
+    time.sleep(SECONDS / 2)
+    memory = sum(pss(pid) for pid in pids)
+    time.sleep(SECONDS / 2)
+    used = sum(cpu(pid) for pid in pids) - start
+    stop.set()
+    counts = [frames.get(timeout=10) for _ in range(CONSUMERS)]
+    for p in procs:
+        p.join(timeout=10)
+    if daemon is not None:
+        daemon.send_signal(signal.SIGINT)
+        daemon.wait(timeout=10)
+    return used, memory, sum(counts) / CONSUMERS / (SECONDS + WARMUP)
+
+
+def bench_capture_fanout():
+    require('cv2')
+    require('numpy')
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        raise Skip('needs Linux /proc for memory accounting')
+    camera = fakemjpeg.FakeMjpegServer(fakemjpeg.synthetic_jpegs(width=1280, height=960), fps=20).start()
+    try:
+        cpu_ind, pss_ind, fps_ind = run(False, camera.url)
+        cpu_sh, pss_sh, fps_sh = run(True, camera.url)
+    finally:
+        camera.stop()
+    return {
+        'independent_cpu_s': cpu_ind,
+        'shared_cpu_s': cpu_sh,
+        'independent_pss_bytes': pss_ind,
+        'shared_pss_bytes': pss_sh,
+        'independent_consumer_fps': fps_ind,
+        'shared_consumer_fps': fps_sh,
+    }
@@ -0,0 +1,68 @@
+# Joystick control loops of driveWithJoystick.py and flaskJoystick.py, driven
+# by a scripted joystick against a simulated toy without BLE latency, so the
+# numbers are the CPU cost of one loop iteration.
+import math
+import time
+
+import common  # noqa: F401
+import pygame
+from spherov2.types import Color
+
+import driveWithJoystick
+import flaskJoystick
+import simulator
+
+TICKS = 3000
+
+
+class TickJoystick(simulator.SimJoystick):
+    # stick position follows the loop count; calls stop() after `ticks` loops
+
+    def __init__(self, ticks, stop):
+        super().__init__(script=self.sweep)
+        self.ticks = 0
+        self.limit = ticks
+        self.stop = stop
+
+    def sweep(self, t):
+        k = self.ticks / 40.0
+        return {'axes': (0.8 * math.sin(k), -0.8 * math.cos(k))}
+
+    def get_axis(self, i):
+        if i == 0:
+            self.ticks += 1
+            if self.ticks >= self.limit:
+                self.stop()
+        return super().get_axis(i)
+
+
+def sim_toy(name):
+    return simulator.SimToy(name, latency=0.0, jitter=0.0)
+
+
+def bench_drive_control_loop():
+    controller = driveWithJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = TickJoystick(TICKS, lambda: setattr(controller, 'is_running', False))
+    controller.toy = sim_toy('SB-DRIVE')
+    pygame.init()
+    start = time.perf_counter()
+    controller.control_toy()
+    elapsed = time.perf_counter() - start
+    return {
+        'tick_us': elapsed / TICKS * 1e6,
+        'ble_commands_per_tick': sum(controller.toy.commands.values()) / TICKS,
+    }
+
+
+def bench_flask_control_loop():
+    controller = flaskJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = TickJoystick(TICKS, controller._stop_evt.set)
+    controller.toy = sim_toy('SB-FLASK')
+    pygame.init()
+    start = time.perf_counter()
+    controller._loop()
+    elapsed = time.perf_counter() - start
+    return {
+        'tick_us': elapsed / TICKS * 1e6,
+        'ble_commands_per_tick': sum(controller.toy.commands.values()) / TICKS,
+    }
@@ -0,0 +1,54 @@
+# course.py on generated courses with hundreds of waypoints: validating and
+# compiling a plan against loading the cached plan, which is what starting a
+# run costs. The plans use a calibrated SpeedModel, as race.py does.
+import json
+import os
+import random
+import tempfile
+
+from common import best_of
+
+import calibration
+import course
+
+MODEL = calibration.SpeedModel([(30, 16.7, 2.0), (50, 28.0, 4.5), (70, 41.7, 7.0),
+                                (100, 60.5, 11.0), (150, 86.0, 17.0), (200, 112.0, 24.0)])
+
+
+def random_course(waypoints, seed=0):
+    # right-angle turns with varied lengths, like the taped courses on the floor
+    rng = random.Random(seed)
+    x = y = 0.0
+    points = [[x, y]]
+    heading = 0
+    for _ in range(waypoints - 1):
+        heading = (heading + rng.choice((90, 270))) % 360
+        cm = rng.uniform(40, 250)
+        x += cm * [1, 0, -1, 0][heading // 90]
+        y += cm * [0, 1, 0, -1][heading // 90]
+        points.append([round(x, 1), round(y, 1)])
+    return {'name': 'random%d' % waypoints, 'waypoints': points}
+
+
+def bench_course_plan():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (100, 500):
+            path = os.path.join(tmp, 'course%d.json' % n)
+            with open(path, 'w') as f:
+                json.dump(random_course(n), f)
+            cache = os.path.join(tmp, 'cache%d' % n)
+
+            def cold():
+                # what a run would cost without the cache: parse, validate, compile
+                plan = course.compile_plan(course.load_course(path), 70, MODEL)
+                course.save_plan(plan, cache)
+
+            def warm():
+                course.load_plan(course.load_course(path), 70, MODEL, cache_dir=cache)
+
+            results['compile_%d_ms' % n] = best_of(cold, number=10, repeat=3) * 1e3
+            results['cached_%d_ms' % n] = best_of(warm, number=10, repeat=3) * 1e3
+        plan, _ = course.load_plan(course.load_course(path), 70, MODEL, cache_dir=cache)
+        results['plan_500_bytes'] = os.path.getsize(course.plan_path(plan.key, cache))
+    return results
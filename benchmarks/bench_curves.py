@@ -0,0 +1,78 @@
+# curves.py: per-tick cost of mapping the stick to (heading, throttle) with
+# the default linear profile (no table), with a precompiled table of the same
+# curve and with the shaped curves evaluated directly, against the math
+# driveWithJoystick did every loop. The linear profile must give exactly the
+# old commands (speed in command units at preset 255), on the table grid and
+# for any 16-bit pygame axis value.
+import itertools
+import math
+import random
+import time
+
+from common import best_of
+
+import curves
+
+DEADZONE = 0.2
+SPEED = 255
+
+
+def inline(x, y):
+    # the loop body curves.py replaced
+    dx, dy = x, -y
+    mag = math.hypot(dx, dy)
+    if mag > DEADZONE:
+        return math.degrees(math.atan2(dx, dy)), min(1.0, mag)
+    return None
+
+
+def command(mapped):
+    return None if mapped is None else (mapped[0], int(SPEED * mapped[1]))
+
+
+def bench_curves_mapping():
+    rng = random.Random(1)
+    sticks = [(rng.randint(-32768, 32767) / 32768, rng.randint(-32768, 32767) / 32768) for _ in range(1024)]
+    linear = curves.curve('linear').map
+    lookup = curves.ResponseCurve('table', deadzone=DEADZONE).map
+    it = itertools.cycle(sticks)
+    inline_s = best_of(lambda: inline(*next(it)), number=50000)
+    linear_s = best_of(lambda: linear(*next(it)), number=50000)
+    table_s = best_of(lambda: lookup(*next(it)), number=50000)
+    snap = curves.curve('snap')
+    evaluate_s = best_of(lambda: snap.evaluate(*next(it)), number=50000)
+    swap_s = best_of(lambda: curves.curve(curves.next_profile('linear')), number=50000)
+    start = time.perf_counter()
+    curves.ResponseCurve('bench', **curves.PROFILES['expo'])
+    compile_s = time.perf_counter() - start
+    return {
+        'inline_us': inline_s * 1e6,
+        'linear_us': linear_s * 1e6,
+        'table_us': table_s * 1e6,
+        'snap_evaluate_us': evaluate_s * 1e6,
+        'swap_us': swap_s * 1e6,
+        'compile_ms': compile_s * 1e3,
+    }
+
+
+def bench_curves_linear_equivalence():
+    curve = curves.curve('linear')
+    grid = [curve.axis(i) for i in range(curve.steps + 1)]
+    grid_mismatches = sum(1 for x in grid for y in grid if command(inline(x, y)) != command(curve.map(x, y)))
+    speed_diff = heading_diff = 0
+    deadzone_flips = 0
+    rng = random.Random(2)
+    for _ in range(200000):
+        x, y = rng.randint(-32768, 32767) / 32768, rng.randint(-32768, 32767) / 32768
+        a, b = command(inline(x, y)), command(curve.map(x, y))
+        if (a is None) != (b is None):
+            deadzone_flips += 1
+        elif a is not None:
+            speed_diff = max(speed_diff, abs(a[1] - b[1]))
+            heading_diff = max(heading_diff, abs((a[0] - b[0] + 180) % 360 - 180))
+    return {
+        'grid_mismatches': grid_mismatches,
+        'max_speed_diff': speed_diff,
+        'max_heading_diff_deg': heading_diff,
+        'deadzone_edge_flips': deadzone_flips,
+    }
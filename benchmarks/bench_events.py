@@ -0,0 +1,75 @@
+# events.py: collision and tilt notifications from a scripted simulated toy
+# handled by the driveWithJoystick loop, the per-tick cost of dispatch()
+# against the acceleration polling it replaced, and a notification flood.
+import math
+import threading
+import time
+
+from common import best_of
+
+import pygame
+from spherov2.types import Color
+
+import driveWithJoystick
+import events
+import simulator
+from bench_control_loop import TickJoystick
+from backend import SpheroEduAPI
+
+# seconds of simulated game time: a bump every 2 s, a hill from 10 to 14 s
+SCRIPT = [(t, 'collision') for t in range(2, 20, 2)] + [(10, 'tilt', 35.0), (14, 'tilt', 0.0)]
+
+
+def bench_events_drive_loop():
+    controller = driveWithJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = TickJoystick(2500, lambda: setattr(controller, 'is_running', False))
+    # the notification threads need real time to run: this toy gets a clock
+    # at 20x instead of the stepped one, and 5 ms per command moves it on
+    controller.toy = simulator.SimToy('SB-EVENTS', clock=simulator.VirtualClock(20), latency=0.005, jitter=0.0)
+    script = simulator.SimEventScript(controller.toy, SCRIPT).start()
+    pygame.init()
+    controller.control_toy()
+    fired = sum(1 for e in script.fired if e[1] == 'collision')
+    return {
+        'collisions_fired': fired,
+        'collisions_handled': controller.collisions,
+        'tilts_handled': controller.tilts,
+        'events_dropped': controller.events.dropped,
+        'accel_samples': controller.toy.sensor_control.samples,
+    }
+
+
+def bench_events_dispatch():
+    toy = simulator.SimToy('SB-POLL', latency=0.0, jitter=0.0)
+    with SpheroEduAPI(toy) as api:
+        def poll():
+            # what driveWithJoystick did every loop before events.py
+            acc = api.get_acceleration()
+            return abs(math.degrees(math.atan2(acc['x'], acc['z']))) >= 30
+        poll_s = best_of(poll, number=20000)
+    bus = events.EventBus()
+    bus.subscribe(events.COLLISION, lambda e: None)
+    idle_s = best_of(bus.dispatch, number=20000)
+
+    def one():
+        bus.post(events.COLLISION)
+        bus.dispatch()
+    one_s = best_of(one, number=20000)
+    return {'poll_us': poll_s * 1e6, 'dispatch_idle_us': idle_s * 1e6, 'post_dispatch_us': one_s * 1e6}
+
+
+def bench_events_flood():
+    # 4 notification threads posting 5000 collisions each into a 32-deep bus
+    bus = events.EventBus(maxsize=32)
+    handled = []
+    bus.subscribe(events.COLLISION, handled.append)
+    threads = [threading.Thread(target=lambda: [bus.post(events.COLLISION) for _ in range(5000)])
+               for _ in range(4)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    post_s = (time.perf_counter() - start) / 20000
+    bus.dispatch()
+    return {'post_us': post_s * 1e6, 'handled': len(handled), 'dropped': bus.dropped}
@@ -0,0 +1,74 @@
+# game.py: two rounds for five driveWithJoystick players on simulated toys
+# with a 30 ms BLE round trip. Players bump into things, press the booster
+# and two of them drive up a hill. tick_late_* is how far the 20 Hz engine
+# tick ran behind its deadline (simulated time) while the five control loops
+# were busy with BLE; replay_matches is 1 when replaying the event log gives
+# the scores the engine published.
+import math
+import threading
+
+from common import Skip
+
+import pygame
+from spherov2.types import Color
+
+import driveWithJoystick
+import game
+import simulator
+
+PLAYERS = 5
+ROUND_SECONDS = 10.0
+
+
+def stick(number):
+    def script(t):
+        # circle at 70 % throw, booster button every 6 s
+        phase = t / 3.0 + number
+        buttons = {driveWithJoystick.buttons['R2']} if t % 6.0 < 0.3 else set()
+        return {'axes': (0.7 * math.sin(phase), -0.7 * math.cos(phase)), 'buttons': buttons}
+    return script
+
+
+def bench_game_rounds():
+    # threads need real time: one 5x clock shared by the engine and all toys
+    clock = simulator.VirtualClock(5)
+    engine = game.GameEngine(range(1, PLAYERS + 1), rounds=2, round_seconds=ROUND_SECONDS, countdown=1.0,
+                             break_seconds=2.0, clock=clock, log=lambda *a: None)
+    pygame.init()
+    controllers, threads = [], []
+    for number in range(1, PLAYERS + 1):
+        controller = driveWithJoystick.SpheroController(
+            simulator.SimJoystick(stick(number), clock=clock), Color(255, 0, 0), number, game=engine)
+        controller.toy = simulator.SimToy('SB-GAME%d' % number, clock=clock, latency=0.03, jitter=0.01,
+                                          seed=number)
+        script = [(t, 'collision') for t in range(2 + number, 30, 3)]
+        if number <= 2:
+            script += [(4.0, 'tilt', 35.0), (7.0, 'tilt', 0.0)]
+        simulator.SimEventScript(controller.toy, script).start()
+        controllers.append(controller)
+        threads.append(threading.Thread(target=controller.run_supervised, daemon=True))
+    engine.start()
+    for t in threads:
+        t.start()
+    finished = engine.wait(timeout=60)
+    for controller in controllers:
+        controller.is_running = False
+    for t in threads:
+        t.join(timeout=5)
+    engine.stop()
+    if not finished:
+        raise Skip('game did not finish')
+    lateness = sorted(engine.tick_lateness)
+    replayed = game.replay(engine.events)
+    kinds = [e.kind for e in engine.events]
+    return {
+        'tick_late_p50_ms': lateness[len(lateness) // 2] * 1e3,
+        'tick_late_p99_ms': lateness[int(len(lateness) * 0.99)] * 1e3,
+        'tick_overruns': engine.overruns,
+        'events': len(engine.events),
+        'collisions': kinds.count(game.COLLISION),
+        'boosts': kinds.count(game.BOOST),
+        'hill_penalties': kinds.count('hill'),
+        'replay_matches': int([(p.number, p.score) for p in replayed.standings()] ==
+                              [(p.number, p.score) for p in engine.state.standings()]),
+    }
@@ -0,0 +1,100 @@
+# sphero/lights.py: LED writes of the joystick loop and the race countdown on
+# a simulated toy with the default BLE latency (30 ms +/- 10 ms per command).
+#
+# The drive loop runs 20 virtual seconds of a scripted joystick that circles
+# the stick and holds the speed buttons (1 for 5 s, none for 5 s, 4 for 5 s,
+# then 2 and 3 alternating every second). led_requests is how many LED calls
+# the loop makes, one BLE write each before lights.py; led_writes is what
+# reached the toy. tick_ms is the virtual time of one loop iteration, BLE
+# round trips included. flush_us is the CPU cost of a flush with nothing to
+# send.
+import common  # noqa: F401
+import pygame
+from spherov2.types import Color
+
+from common import best_of
+import driveWithJoystick
+import lights
+import race
+import simulator
+
+SECONDS = 20.0
+LED_COMMANDS = ('set_main_led', 'set_front_led', 'set_back_led', 'set_matrix_character',
+                'clear_matrix')
+
+
+def held_buttons(t):
+    if t < 5:
+        return {0}
+    if t < 10:
+        return set()
+    if t < 15:
+        return {3}
+    return {1} if int(t) % 2 else {2}
+
+
+class ScriptedJoystick(simulator.SimJoystick):
+    # circles the stick, holds the buttons of held_buttons(); stop() after SECONDS
+
+    def __init__(self, stop):
+        super().__init__(script=self.script)
+        self.stop = stop
+        self.ticks = 0
+
+    def script(self, t):
+        state = self.circle(t)
+        state['buttons'] = held_buttons(t)
+        return state
+
+    def get_axis(self, i):
+        if i == 0:
+            self.ticks += 1
+            if self.clock.perf_counter() - self.start >= SECONDS:
+                self.stop()
+        return super().get_axis(i)
+
+
+def led_writes(toy):
+    return sum(toy.commands[c] for c in LED_COMMANDS)
+
+
+def bench_lights_drive_loop():
+    controller = driveWithJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = ScriptedJoystick(lambda: setattr(controller, 'is_running', False))
+    controller.toy = simulator.SimToy('SB-LIGHTS', seed=1)
+    pygame.init()
+    start = controller.toy.clock.perf_counter()
+    controller.control_toy()
+    elapsed = controller.toy.clock.perf_counter() - start
+    ticks = controller.joystick.ticks
+    requests = controller.lights.requests
+    writes = led_writes(controller.toy)
+    return {
+        'ticks': ticks,
+        'led_requests': requests,
+        'led_writes': writes,
+        'writes_saved_pct': 100.0 * (1.0 - writes / requests),
+        'tick_ms': elapsed / ticks * 1e3,
+    }
+
+
+def bench_lights_countdown():
+    toy = simulator.SimToy('SB-COUNTDOWN', seed=2)
+    with simulator.SpheroEduAPI(toy) as api:
+        light = lights.Lights()
+        light.set_back_led(255)
+        light.set_main_led(race.LED_RUN)
+        start = toy.clock.perf_counter()
+        light.play(lights.Countdown())
+        light.wait(api)
+        countdown = toy.clock.perf_counter() - start
+        writes = led_writes(toy)
+        idle = lights.Lights()
+        idle.set_main_led(race.LED_RUN)
+        idle.flush(api)
+        flush = best_of(lambda: idle.flush(api), number=2000)
+    return {
+        'countdown_s': countdown,
+        'countdown_writes': writes,
+        'flush_us': flush * 1e6,
+    }
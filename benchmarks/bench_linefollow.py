@@ -0,0 +1,64 @@
+# linefollow_pkg: detection + steering per frame on synthetic 1280x960
+# camera frames (the TurtleBot stream size) of a dark floor line whose
+# offset and direction sweep like a winding track, plus the same with lane
+# markings (swept less: the lane centre is only found while both markings
+# are in view). Errors are against the true offset (-1..1) and angle of each
+# frame; fps is frames processed per second of CPU on one core.
+import math
+import time
+
+from common import require
+
+FRAMES = 120
+
+
+def track(count, amplitude=0.6, **kw):
+    from linefollow_pkg.lane import render_line
+    frames = []
+    for i in range(count):
+        offset = amplitude * math.sin(i * 0.11)
+        angle = 0.4 * math.sin(i * 0.07 + 1.0)
+        frames.append((offset, angle, render_line(offset, angle, 1280, 960, noise=24, seed=i, **kw)))
+    return frames
+
+
+def run(frames, stride=1):
+    from linefollow_pkg.lane import LineDetector, Steering
+    detector, steering = LineDetector(stride=stride), Steering()
+    offset_err, angle_err, lost = [], [], 0
+    start = time.process_time()
+    for n, (offset, angle, frame) in enumerate(frames):
+        detection = detector.detect(frame)
+        steering.update(detection, n / 20.0)
+        if not detection.found:
+            lost += 1
+            continue
+        offset_err.append(abs(detection.offset - offset))
+        angle_err.append(abs(detection.angle - angle))
+    seconds = time.process_time() - start
+    offset_err.sort()
+    return {
+        'fps': len(frames) / seconds,
+        'frame_ms': seconds / len(frames) * 1e3,
+        'offset_err_mean': sum(offset_err) / max(1, len(offset_err)),
+        'offset_err_p95': offset_err[int(len(offset_err) * 0.95)] if offset_err else float('nan'),
+        'angle_err_mean_deg': math.degrees(sum(angle_err) / max(1, len(angle_err))),
+        'lost_frames': lost,
+    }
+
+
+def bench_linefollow_line():
+    require('cv2')
+    require('numpy')
+    frames = track(FRAMES)
+    metrics = {}
+    for stride in (1, 4):
+        for key, value in run(frames, stride).items():
+            metrics['stride%d_%s' % (stride, key)] = value
+    return metrics
+
+
+def bench_linefollow_lane():
+    require('cv2')
+    require('numpy')
+    return run(track(FRAMES, 0.2, lane=True, thickness=0.03))
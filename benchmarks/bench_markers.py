@@ -0,0 +1,66 @@
+# markers.py: 30 synthetic 1920x1080 overview frames (a 300x200 cm arena
+# seen at an angle, 6 robots with 10 cm ArUco markers at random poses, sensor
+# noise). "full" detects at full resolution; "half" detects at scale 0.5 and
+# refines the corners at full resolution. Errors are against the rendered
+# poses; board_read_us is a PoseBoard.latest() from another reader.
+import math
+import random
+import time
+
+from common import best_of, require
+
+FRAMES = 30
+ROBOTS = 6
+ARENA_IMAGE = [(200, 1000), (1720, 1000), (1500, 150), (420, 150)]
+ARENA_CM = [(0, 0), (300, 0), (300, 200), (0, 200)]
+
+
+def scenes(homography):
+    import markers
+    rng = random.Random(0)
+    out = []
+    for n in range(FRAMES):
+        poses = [(i, rng.uniform(20, 280), rng.uniform(20, 180), rng.uniform(0, 360))
+                 for i in range(ROBOTS)]
+        out.append((poses, markers.render_markers(poses, homography, noise=12, seed=n)))
+    return out
+
+
+def run(tracker, frames):
+    pos_err, head_err, found = [], [], 0
+    start = time.perf_counter()
+    results = [tracker.poses(frame) for _, frame in frames]
+    seconds = time.perf_counter() - start
+    for (truth, _), poses in zip(frames, results):
+        truth = {i: (x, y, h) for i, x, y, h in truth}
+        for p in poses:
+            x, y, h = truth[p.id]
+            pos_err.append(math.hypot(p.x - x, p.y - y))
+            head_err.append(abs((p.heading - h + 180) % 360 - 180))
+            found += 1
+    return {
+        'fps': len(frames) / seconds,
+        'frame_ms': seconds / len(frames) * 1e3,
+        'pos_err_mean_cm': sum(pos_err) / max(1, len(pos_err)),
+        'pos_err_max_cm': max(pos_err, default=float('nan')),
+        'heading_err_mean_deg': sum(head_err) / max(1, len(head_err)),
+        'detected_pct': 100.0 * found / (len(frames) * ROBOTS),
+    }
+
+
+def bench_markers_overview():
+    require('cv2')
+    import markers
+    homography = markers.FloorHomography.from_points(ARENA_IMAGE, ARENA_CM)
+    frames = scenes(homography)
+    metrics = {}
+    for name, scale in (('full', 1.0), ('half', 0.5)):
+        for key, value in run(markers.MarkerTracker(homography, scale=scale), frames).items():
+            metrics['%s_%s' % (name, key)] = value
+    board = markers.PoseBoard('bench', create=True)
+    board.publish(markers.MarkerTracker(homography).poses(frames[0][1]))
+    reader = markers.PoseBoard('bench')
+    metrics['board_read_us'] = best_of(reader.latest, number=2000) * 1e6
+    reader.close()
+    board.close()
+    return metrics
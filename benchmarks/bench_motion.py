@@ -0,0 +1,75 @@
+# motion.py: 30 s of synthetic 1280x960 20 fps video (sensor noise on a
+# still scene, with two 4 s stretches of a moving box and one robot command
+# while the scene is still), recorded whole like recordTurtle.py does and
+# with the motion-triggered recorder (1 s pre-roll, 3 s post-roll).
+# saved_pct is the share of XVID bytes not written, detect_ms the detection
+# cost per frame, missed_active_frames moving frames that did not end up in
+# a clip.
+import os
+import tempfile
+
+from common import require
+
+FPS = 20.0
+WIDTH, HEIGHT = 1280, 960
+# (seconds, moving)
+SCRIPT = [(8, False), (4, True), (8, False), (4, True), (6, False)]
+COMMAND_AT = 16.0
+
+
+def quiet(*args):
+    pass
+
+
+def video():
+    # (moving, frame) for the whole script; noise from a small pool keeps it cheap
+    np = require('numpy')
+    cv2 = require('cv2')
+    rng = np.random.default_rng(0)
+    base = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    base[:] = np.linspace(40, 200, WIDTH, dtype=np.uint8)[None, :, None]
+    noise = [rng.integers(0, 8, base.shape, dtype=np.uint8) for _ in range(8)]
+    i = 0
+    x = 100
+    for seconds, moving in SCRIPT:
+        for _ in range(int(seconds * FPS)):
+            frame = base + noise[i % len(noise)]
+            if moving:
+                x = 100 + (x + 25) % (WIDTH - 400)
+            cv2.rectangle(frame, (x, 300), (x + 200, 500), (0, 0, 255), -1)
+            i += 1
+            yield moving, frame
+
+
+def bench_motion_recording():
+    cv2 = require('cv2')
+    import motion
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'continuous.avi')
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), FPS, (WIDTH, HEIGHT))
+        for _, frame in video():
+            out.write(frame)
+        out.release()
+        continuous = os.path.getsize(path)
+
+        recorder = motion.MotionRecorder(FPS, pre_roll=1.0, post_roll=3.0, directory=tmp, log=quiet)
+        missed = 0
+        for n, (moving, frame) in enumerate(video()):
+            t = n / FPS
+            if abs(t - COMMAND_AT) < 0.5 / FPS:
+                recorder.trigger('cmd_vel')
+            written = recorder.frames_written
+            recorder.feed(frame, t)
+            missed += moving and recorder.frames_written == written
+        recorder.close()
+        stats = recorder.stats()
+    return {
+        'continuous_bytes': continuous,
+        'motion_bytes': stats['bytes'],
+        'saved_pct': 100.0 * (1 - stats['bytes'] / continuous),
+        'frames_written_pct': 100.0 * stats['written'] / stats['frames'],
+        'clips': stats['clips'],
+        'detect_ms': stats['detect_ms'],
+        'missed_active_frames': missed,
+    }
@@ -0,0 +1,97 @@
+# planner_pkg: synthetic building maps of 500..4000 cells square (5 cm
+# cells, so up to 200x200 m): 5 m rooms with 10 cm walls, a door in every
+# wall and furniture blocks, an unknown border. prepare_s computes the
+# costmap, distance transform and jump tables and writes them to the cache;
+# cached_load_ms is a second start that memory-maps them back. Queries go
+# between random free cells of the reachable part; A* (over the costmap,
+# every cell in Python) only runs on the smaller maps.
+import os
+import shutil
+import tempfile
+import time
+
+from common import require
+
+SIZES = (500, 1000, 2000, 4000)
+QUERIES = 30
+ASTAR_SIZES = (500, 1000)
+ASTAR_QUERIES = 5
+
+
+def building(size, seed=0, room=100):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    image = np.full((size, size), 254, np.uint8)
+    for k in range(0, size, room):
+        image[k:k + 2, :] = 0
+        image[:, k:k + 2] = 0
+    for r in range(0, size, room):
+        for c in range(0, size, room):
+            # a door in the top and in the left wall of every room
+            d = int(rng.integers(10, room - 30))
+            image[r:r + 2, c + d:c + d + 20] = 254
+            d = int(rng.integers(10, room - 30))
+            image[r + d:r + d + 20, c:c + 2] = 254
+            for _ in range(3):
+                h, w = rng.integers(5, 20, 2)
+                y, x = rng.integers(10, room - 30, 2)
+                image[r + y:r + y + h, c + x:c + x + w] = 0
+    image[:20, :] = image[-20:, :] = image[:, :20] = image[:, -20:] = 205
+    return image
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def queries(grid, count, seed=1):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(grid.labels)
+    main = np.argmax(np.bincount(labels.ravel())[1:]) + 1
+    rows, cols = np.nonzero(labels == main)
+    pick = rng.integers(len(rows), size=(count, 2))
+    return [((rows[a], cols[a]), (rows[b], cols[b])) for a, b in pick]
+
+
+def timed(search, grid, pairs):
+    from planner_pkg.search import path_length
+    ms, lengths = [], []
+    for start, goal in pairs:
+        begin = time.perf_counter()
+        path = search(grid, start, goal)
+        ms.append((time.perf_counter() - begin) * 1e3)
+        lengths.append(path_length(path) * grid.resolution)
+    return ms, lengths
+
+
+def bench_planner_maps():
+    require('cv2')
+    require('numpy')
+    from planner_pkg.gridmap import GridMap, write_map
+    from planner_pkg.search import astar, jps
+    metrics = {}
+    folder = tempfile.mkdtemp(prefix='bench_planner')
+    try:
+        for size in SIZES:
+            path = write_map(os.path.join(folder, 'map%d.yaml' % size), building(size))
+            cache = os.path.join(folder, 'cache')
+            start = time.perf_counter()
+            GridMap.load(path).prepare(cache_dir=cache)
+            metrics['%d_prepare_s' % size] = time.perf_counter() - start
+            start = time.perf_counter()
+            grid = GridMap.load(path)
+            assert grid.prepare(cache_dir=cache)
+            metrics['%d_cached_load_ms' % size] = (time.perf_counter() - start) * 1e3
+            pairs = queries(grid, QUERIES)
+            ms, lengths = timed(jps, grid, pairs)
+            metrics['%d_jps_p50_ms' % size] = percentile(ms, 0.5)
+            metrics['%d_jps_p95_ms' % size] = percentile(ms, 0.95)
+            metrics['%d_path_mean_m' % size] = sum(lengths) / len(lengths)
+            if size in ASTAR_SIZES:
+                ms, _ = timed(astar, grid, pairs[:ASTAR_QUERIES])
+                metrics['%d_astar_p50_ms' % size] = percentile(ms, 0.5)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return metrics
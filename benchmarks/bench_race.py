@@ -0,0 +1,76 @@
+# race.run_lap on a simulated BOLT with a realistic BLE latency (30 +/- 10 ms
+# per command). lap_time_s is simulated time, so it is reproducible; the end
+# error is the distance between where the toy stopped and where the course
+# says it should be.
+import math
+import time
+
+import common  # noqa: F401
+
+import calibration
+import race
+import simulator
+from backend import SpheroEduAPI
+
+
+def planned_end(segments_cm, headings):
+    x = sum(d * math.sin(math.radians(h)) for d, h in zip(segments_cm, headings))
+    y = sum(d * math.cos(math.radians(h)) for d, h in zip(segments_cm, headings))
+    return x, y
+
+
+def end_error(toy):
+    x, y = planned_end(race.SEGMENTS_CM, race.HEADINGS)
+    return math.hypot(toy.x - x, toy.y - y)
+
+
+def bench_race_lap():
+    toy = simulator.SimToy('SB-RACE', latency=0.03, jitter=0.01, seed=1)
+    start = time.perf_counter()
+    with SpheroEduAPI(toy) as api:
+        lap = race.run_lap(api, race.SEGMENTS_CM, race.HEADINGS,
+                           race.CM_PER_SEC_DEFAULT, race.SPEED_PCT_DEFAULT)
+    wall = time.perf_counter() - start
+    return {
+        'lap_time_s': lap,
+        'end_error_cm': end_error(toy),
+        'ble_commands': sum(toy.commands.values()),
+        'ble_wait_s': toy.ble_time,
+        'wall_ms': wall * 1e3,
+    }
+
+
+def bench_race_calibrated_speed():
+    # lap at a speed other than the one CM_PER_SEC_DEFAULT was measured at:
+    # constant cm/s against the fitted calibration model
+    speed = 150
+    errors = {}
+    for name in ('constant', 'calibrated'):
+        toy = simulator.SimToy('SB-CAL', latency=0.03, jitter=0.01, seed=2)
+        with SpheroEduAPI(toy) as api:
+            model = None
+            if name == 'calibrated':
+                model = calibration.calibrate(api, race.gentle_roll, log=lambda *a: None)
+            start = (toy.x, toy.y)
+            race.run_lap(api, race.SEGMENTS_CM, race.HEADINGS,
+                         race.CM_PER_SEC_DEFAULT, speed, model)
+        toy.x -= start[0]
+        toy.y -= start[1]
+        errors[name] = end_error(toy)
+    return {'constant_end_error_cm': errors['constant'],
+            'calibrated_end_error_cm': errors['calibrated']}
+
+
+def bench_race_stream():
+    # same lap, blocking api.roll per phase against commands sent ahead of
+    # their deadline (race.RollStreamer)
+    laps, errors = {}, {}
+    for name, stream in (('blocking', False), ('stream', True)):
+        toy = simulator.SimToy('SB-STREAM', latency=0.03, jitter=0.01, seed=3)
+        with SpheroEduAPI(toy) as api:
+            laps[name] = race.run_lap(api, race.SEGMENTS_CM, race.HEADINGS,
+                                      race.CM_PER_SEC_DEFAULT, race.SPEED_PCT_DEFAULT,
+                                      stream=stream)
+        errors[name] = end_error(toy)
+    return {'blocking_lap_time_s': laps['blocking'], 'stream_lap_time_s': laps['stream'],
+            'blocking_end_error_cm': errors['blocking'], 'stream_end_error_cm': errors['stream']}
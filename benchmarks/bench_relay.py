@@ -0,0 +1,103 @@
+# relay.py: 50 viewers of one 30 fps MJPEG camera (fakemjpeg.py on
+# localhost), once through the relay and once each connecting to the camera
+# directly like turtleCam.py does. upstream_*_bytes is what the camera (the
+# robot's Wi-Fi) has to send per second; latency is camera timestamp to a
+# viewer having the whole JPEG; shm_* is a local reader of the relay's
+# shared memory ring.
+import threading
+import time
+import urllib.request
+
+from common import require
+
+import fakemjpeg
+import relay
+from shmring import ShmRing
+
+VIEWERS = 50
+SECONDS = 3.0
+
+
+def quiet(*args):
+    pass
+
+
+def viewer(url, stop, latencies, frames):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        for headers, jpeg in relay.read_parts(response):
+            latencies.append(time.time() - float(headers['x-timestamp']))
+            frames.append(len(jpeg))
+            if stop.is_set():
+                return
+
+
+def watch(url, seconds=SECONDS, extra=None):
+    # VIEWERS clients on url for `seconds`; returns (latencies, frames per viewer)
+    stop = threading.Event()
+    latencies, frames = [], []
+    threads = [threading.Thread(target=viewer, args=(url, stop, latencies, frames), daemon=True)
+               for _ in range(VIEWERS)]
+    threads += [threading.Thread(target=f, args=(stop,), daemon=True) for f in extra or ()]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout=5)
+    return sorted(latencies), len(frames) / VIEWERS
+
+
+def pct(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float('nan')
+
+
+def bench_relay_fanout():
+    require('flask')
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log(self, *args):
+            pass
+
+    camera = fakemjpeg.FakeMjpegServer(fps=30).start()
+    cam = relay.CameraRelay('bench', camera.url, shm=True, log=quiet).start()
+    httpd = make_server('127.0.0.1', 0, relay.create_app({'bench': cam}), threaded=True,
+                        request_handler=QuietHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    shm_latencies = []
+
+    def shm_reader(stop):
+        ring = ShmRing('cam-bench')
+        seq = 0
+        while not stop.is_set():
+            frame = ring.next(seq, timeout=1.0)
+            if frame is not None:
+                seq = frame[0]
+                shm_latencies.append(time.time() - frame[1])
+        ring.close()
+
+    cam.next_frame(0)
+    sent = camera.bytes_sent
+    start = time.perf_counter()
+    latencies, frames = watch('http://127.0.0.1:%d/stream/bench' % httpd.server_port, extra=[shm_reader])
+    upstream = (camera.bytes_sent - sent) / (time.perf_counter() - start)
+    httpd.shutdown()
+    cam.stop()
+    camera.stop()
+
+    camera = fakemjpeg.FakeMjpegServer(fps=30).start()
+    start = time.perf_counter()
+    direct_latencies, direct_frames = watch(camera.url)
+    direct = camera.bytes_sent / (time.perf_counter() - start)
+    camera.stop()
+    shm_latencies.sort()
+    return {
+        'upstream_relay_bytes': upstream,
+        'upstream_direct_bytes': direct,
+        'relay_latency_p50_ms': pct(latencies, 0.5) * 1e3,
+        'relay_latency_p95_ms': pct(latencies, 0.95) * 1e3,
+        'direct_latency_p95_ms': pct(direct_latencies, 0.95) * 1e3,
+        'relay_frames_per_viewer': frames,
+        'direct_frames_per_viewer': direct_frames,
+        'shm_latency_p95_ms': pct(shm_latencies, 0.95) * 1e3,
+    }
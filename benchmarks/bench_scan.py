@@ -0,0 +1,39 @@
+# LaserScan callbacks of lidar_pkg and subpub_pkg on synthetic scans. The
+# nodes need a ROS 2 installation (rclpy) to be imported; the callbacks only
+# touch msg.ranges, so they are called on a plain object instead of a node.
+import random
+from types import SimpleNamespace
+
+from common import best_of, Skip
+
+try:
+    from lidar_pkg.lidar import Lidar
+    from subpub_pkg.subpub import Subpub
+    IMPORT_ERROR = None
+except ImportError as e:
+    IMPORT_ERROR = e
+
+
+def synthetic_scan(beams=360, seed=0):
+    rng = random.Random(seed)
+    return SimpleNamespace(ranges=[rng.uniform(0.12, 3.5) for _ in range(beams)])
+
+
+def node_state():
+    return SimpleNamespace(laser_forward=0, laser_frontLeft=0, laser_frontRight=0)
+
+
+def bench_scan_lidar_callback():
+    if IMPORT_ERROR:
+        raise Skip('ROS 2 not available (%s)' % IMPORT_ERROR)
+    msg, node = synthetic_scan(), node_state()
+    seconds = best_of(lambda: Lidar.laser_callback(node, msg), number=20000)
+    return {'callback_us': seconds * 1e6}
+
+
+def bench_scan_subpub_callback():
+    if IMPORT_ERROR:
+        raise Skip('ROS 2 not available (%s)' % IMPORT_ERROR)
+    msg, node = synthetic_scan(), node_state()
+    seconds = best_of(lambda: Subpub.laser_callback(node, msg), number=20000)
+    return {'callback_us': seconds * 1e6}
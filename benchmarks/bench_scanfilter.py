@@ -0,0 +1,64 @@
+# lidar_pkg/scanfilter.py: the scan_relay filter on synthetic scans of the
+# scanmatch room (360 beams like the TurtleBot3 LDS, and 1440), 1 cm noise
+# plus 1% spikes and 2% dropouts per scan. Bandwidth is the serialized
+# LaserScan size at the LDS rate (5 Hz, with intensities) against the relay
+# output (decimation 4, no intensities, 2 Hz), in_bytes and out_bytes are per
+# second. outliers_pct counts beams more than 10 cm off the true range (the
+# nearest true range of the group for the output) or missing where there is
+# a wall in range.
+import itertools
+
+import numpy as np
+
+from common import best_of, require
+
+SCANS = 50
+RATE_IN = 5.0
+RATE_OUT = 2.0
+DECIMATION = 4
+
+
+def scans(beams, rng):
+    from lidar_pkg.scanmatch import render_scan
+    truth = render_scan((0.3, -0.2, 0.4), beams)
+    out = []
+    for _ in range(SCANS):
+        scan = truth + rng.normal(0.0, 0.01, beams)
+        spikes = rng.random(beams) < 0.01
+        scan[spikes] = rng.uniform(0.12, 3.5, spikes.sum())
+        scan[rng.random(beams) < 0.02] = np.inf
+        out.append(scan)
+    return truth, out
+
+
+def outliers_pct(ranges, truth):
+    seen = np.isfinite(truth)
+    bad = seen & ~(np.abs(ranges - truth) <= 0.1)
+    return 100.0 * bad.sum() / seen.sum()
+
+
+def bench_scanfilter_relay():
+    require('numpy')
+    from lidar_pkg.scanfilter import laserscan_bytes, ScanFilter
+    rng = np.random.default_rng(0)
+    metrics = {}
+    for beams in (360, 1440):
+        truth, noisy = scans(beams, rng)
+        f = ScanFilter(beams, decimation=DECIMATION)
+        for scan in noisy[:-1]:
+            f.filter(scan)
+        out = f.filter(noisy[-1]).astype(np.float64)
+        group_truth = truth.reshape(-1, DECIMATION).min(axis=1)
+        bytes_in = laserscan_bytes(beams, beams) * RATE_IN
+        bytes_out = laserscan_bytes(f.out_beams) * RATE_OUT
+        cycle = itertools.cycle(noisy)
+        seconds = best_of(lambda: f.filter(next(cycle)), number=500)
+        metrics.update({
+            '%d_filter_us' % beams: seconds * 1e6,
+            '%d_in_bytes' % beams: bytes_in,
+            '%d_out_bytes' % beams: bytes_out,
+            '%d_reduction_pct' % beams: 100.0 * (1.0 - bytes_out / bytes_in),
+            '%d_outliers_in_pct' % beams: outliers_pct(noisy[-1], truth),
+            '%d_outliers_out_pct' % beams: outliers_pct(out, group_truth),
+        })
+    return metrics
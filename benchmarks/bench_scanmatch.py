@@ -0,0 +1,78 @@
+# lidar_pkg/scanmatch.py: scan-to-scan ICP on synthetic scans of a 5x4 m
+# room with boxes (render_scan), 360 beams (the TurtleBot3 LDS) and 1440,
+# 1 cm range noise. The scanner drives 100 scans around a 0.6 m circle at
+# 0.1..0.3 m/s and 5 Hz, so 2..6 cm and 3..10 degrees per scan. Errors are
+# against the true motion of every scan; drift is the integrated pose after
+# the lap against the truth. alloc_bytes is the peak Python/NumPy memory
+# allocated during one match (tracemalloc): what is left is NumPy's
+# fixed-size iteration buffer for broadcast operations, no scan-sized
+# arrays.
+import math
+import time
+import tracemalloc
+
+from common import require
+
+SCANS = 100
+RATE = 5.0
+RADIUS = 0.6
+
+
+def trajectory():
+    poses, a = [], 0.0
+    for k in range(SCANS + 1):
+        poses.append((RADIUS * math.cos(a), RADIUS * math.sin(a), a + math.pi / 2))
+        speed = 0.2 + 0.1 * math.sin(k * 0.2)
+        a += speed / RATE / RADIUS
+    return poses
+
+
+def relative(a, b):
+    c, s = math.cos(a[2]), math.sin(a[2])
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    return (c * dx + s * dy, -s * dx + c * dy,
+            math.atan2(math.sin(b[2] - a[2]), math.cos(b[2] - a[2])))
+
+
+def run(beams):
+    from lidar_pkg.scanmatch import render_scan, ScanMatcher, ScanOdometry
+    poses = trajectory()
+    scans = [render_scan(p, beams, noise=0.01, seed=k) for k, p in enumerate(poses)]
+    odometry = ScanOdometry(ScanMatcher(beams))
+    odometry.update(scans[0], 0.0)
+    ms, iterations, trans_err, rot_err = [], 0, [], []
+    for k in range(1, len(scans)):
+        start = time.perf_counter()
+        match = odometry.update(scans[k], k / RATE)
+        ms.append((time.perf_counter() - start) * 1e3)
+        iterations += match.iterations
+        truth = relative(poses[k - 1], poses[k])
+        trans_err.append(math.hypot(match.dx - truth[0], match.dy - truth[1]))
+        rot_err.append(abs(match.dtheta - truth[2]))
+    end = relative(poses[0], poses[-1])
+    tracemalloc.start()
+    odometry.matcher.match(scans[1])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms.sort()
+    return {
+        'scan_ms': ms[len(ms) // 2],
+        'scan_p95_ms': ms[int(len(ms) * 0.95)],
+        'iterations': iterations / len(ms),
+        'iteration_us': sum(ms) * 1e3 / iterations,
+        'trans_err_mean_cm': sum(trans_err) / len(trans_err) * 100,
+        'trans_err_max_cm': max(trans_err) * 100,
+        'rot_err_mean_deg': math.degrees(sum(rot_err) / len(rot_err)),
+        'drift_cm': math.hypot(odometry.pose[0] - end[0], odometry.pose[1] - end[1]) * 100,
+        'not_converged': odometry.failed,
+        'alloc_bytes': peak,
+    }
+
+
+def bench_scanmatch_icp():
+    require('numpy')
+    metrics = {}
+    for beams in (360, 1440):
+        for key, value in run(beams).items():
+            metrics['%d_%s' % (beams, key)] = value
+    return metrics
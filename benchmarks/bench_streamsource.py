@@ -0,0 +1,77 @@
+# streamsource.py: a 20 fps camera (fakemjpeg.py) that cuts every connection
+# after 1.5 s and has one 2 s outage (connections stall, new ones are
+# refused) 3 s into an 8 s session. "naive" is the scripts' old loop, which
+# ends on the first failed read(); "resilient" is StreamSource with a 1 s
+# read timeout. missing_s is the time the hole markers cover, timeline_err_s
+# how far frames + marker frames (recordTurtle.py's way) are off the real
+# duration, recover_ms from the end of the outage to the next frame.
+import threading
+import time
+
+from common import require
+
+import fakemjpeg
+
+FPS = 20.0
+SECONDS = 8.0
+OUTAGE_AT = 3.0
+OUTAGE = 2.0
+
+
+def quiet(*args):
+    pass
+
+
+def camera():
+    server = fakemjpeg.FakeMjpegServer(fakemjpeg.synthetic_jpegs(20, 320, 240), fps=FPS, drop_every=1.5)
+    server.start()
+    timer = threading.Timer(OUTAGE_AT, server.outage, (OUTAGE,))
+    timer.start()
+    return server, timer
+
+
+def bench_stream_reconnect():
+    cv2 = require('cv2')
+    import streamsource
+
+    server, timer = camera()
+    cap = cv2.VideoCapture(server.url)
+    start = time.monotonic()
+    naive = 0
+    while time.monotonic() - start < SECONDS:
+        ok, _ = cap.read()
+        if not ok:
+            break
+        naive += 1
+    naive_session = time.monotonic() - start
+    cap.release()
+    timer.cancel()
+    server.stop()
+
+    server, timer = camera()
+    cap = streamsource.StreamSource(server.url, timeout=1.0, log=quiet)
+    start = time.monotonic()
+    outage_end = start + OUTAGE_AT + OUTAGE
+    frames = markers = 0
+    recover = None
+    while time.monotonic() - start < SECONDS:
+        ok, _ = cap.read()
+        if not ok:
+            continue
+        frames += 1
+        markers += max(0, round(cap.gap * FPS) - 1)
+        if recover is None and time.monotonic() > outage_end:
+            recover = time.monotonic() - outage_end
+    duration = time.monotonic() - start
+    stats = cap.stats()
+    cap.release()
+    server.stop()
+    return {
+        'naive_session_s': naive_session,
+        'naive_frames': naive,
+        'resilient_frames': frames,
+        'resilient_reopens': stats['reopens'],
+        'resilient_missing_s': stats['missing_s'],
+        'timeline_err_s': abs((frames + markers) / FPS - duration),
+        'recover_ms': (recover or float('nan')) * 1e3,
+    }
@@ -0,0 +1,40 @@
+# supervisor.py: time to recover from BLE link drops. The driveWithJoystick
+# loop runs against a simulated toy that loses its link three times (0.3,
+# 1 and 2.5 s); every failing command times out after 0.5 s like a dead BLE
+# link. recover_*_s is from the failed command giving up to the restored
+# session, closing the dead session (another timeout) included;
+# outage_excess_s how much longer than the drop itself driving was cut off.
+from common import Skip
+
+import pygame
+from spherov2.types import Color
+
+import driveWithJoystick
+import simulator
+from bench_control_loop import TickJoystick
+
+DROPS = [(3.0, 'drop', 0.3), (8.0, 'drop', 1.0), (14.0, 'drop', 2.5)]
+
+
+def bench_supervisor_recover():
+    controller = driveWithJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = TickJoystick(4000, lambda: setattr(controller, 'is_running', False))
+    # threads (fault script, backoff waits) need real time: 20x clock, 5 ms per command
+    toy = simulator.SimToy('SB-FAULT', clock=simulator.VirtualClock(20), latency=0.005, jitter=0.0)
+    controller.toy = toy
+    script = simulator.SimEventScript(toy, DROPS).start()
+    pygame.init()
+    controller.control_toy()
+    outages = controller.supervisor.outages
+    if len(outages) < len(DROPS):
+        raise Skip('run ended before all drops (%d of %d)' % (len(outages), len(DROPS)))
+    # driving is cut off from the drop until the restored session
+    starts = [script._start + t for t, _, _ in DROPS]
+    cut = [recovered - dropped for dropped, (_, recovered) in zip(starts, outages)]
+    recover = controller.supervisor.recovery_times()
+    return {
+        'recover_mean_s': sum(recover) / len(recover),
+        'recover_max_s': max(recover),
+        'outage_excess_s': max(c - d[2] for c, d in zip(cut, DROPS)),
+        'connect_attempts': controller.supervisor.attempts,
+    }
@@ -0,0 +1,45 @@
+# telemetry.py: cost of one record on the control thread, log size for a
+# lap sampled at 20 Hz, and loading/comparing the splits of 50 laps.
+import os
+import tempfile
+
+from common import best_of, require
+
+import race
+import simulator
+import telemetry
+from backend import SpheroEduAPI
+
+
+def bench_telemetry_record():
+    with tempfile.TemporaryDirectory() as tmp:
+        with telemetry.TelemetryRecorder(os.path.join(tmp, 'bench.sptl')) as recorder:
+            seconds = best_of(lambda: recorder.record(telemetry.SAMPLE, 0, 90, 412, -3, 10, -20, 998, 150, 75),
+                              number=20000)
+            dropped = recorder.dropped
+    return {'record_us': seconds * 1e6, 'dropped_records': dropped}
+
+
+def write_laps(folder, laps):
+    # race laps on the stepped simulator; the 20 Hz samples of a real-time
+    # run are added afterwards so the files have their real size
+    for seed in range(laps):
+        toy = simulator.SimToy('SB-TEL', latency=0.03, jitter=0.01, seed=seed)
+        path = os.path.join(folder, 'lap%02d.sptl' % seed)
+        with telemetry.TelemetryRecorder(path, {'course': 'ring'}) as recorder:
+            with SpheroEduAPI(toy) as api:
+                lap = race.run_lap(telemetry.TelemetryAPI(api, recorder), race.SEGMENTS_CM, race.HEADINGS,
+                                   race.CM_PER_SEC_DEFAULT, race.SPEED_PCT_DEFAULT, telemetry=recorder)
+            for _ in range(int(lap * 20)):
+                recorder.record(telemetry.SAMPLE, 0, 0, 400, 0, 0, 0, 1000, 0, 0)
+    return lap
+
+
+def bench_telemetry_analysis():
+    require('numpy')
+    with tempfile.TemporaryDirectory() as tmp:
+        lap = write_laps(tmp, 50)
+        paths = sorted(os.path.join(tmp, name) for name in os.listdir(tmp))
+        size = os.path.getsize(paths[-1])
+        seconds = best_of(lambda: telemetry.compare(paths), number=1, repeat=3)
+    return {'lap_log_bytes': size, 'log_bytes_per_s': size / lap, 'compare_50_laps_ms': seconds * 1e3}
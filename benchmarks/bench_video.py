@@ -0,0 +1,57 @@
+# Camera pipeline steps on synthetic 1280x960 frames (the TurtleBot stream
+# size): MJPEG decode as done by VideoCapture for mjpg-streamer, the
+# rescale_frame of turtleCam.py and writing XVID like recordTurtle.py.
+import os
+import tempfile
+
+from common import best_of, require, Skip
+
+WIDTH, HEIGHT = 1280, 960
+
+
+def synthetic_frames(count=30):
+    np = require('numpy')
+    cv2 = require('cv2')
+    rng = np.random.default_rng(0)
+    base = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    base[:] = np.linspace(40, 200, WIDTH, dtype=np.uint8)[None, :, None]
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = 40 + i * 30
+        cv2.rectangle(frame, (x, 300), (x + 200, 500), (0, 0, 255), -1)
+        frame += rng.integers(0, 8, frame.shape, dtype=np.uint8)
+        frames.append(frame)
+    return frames
+
+
+def bench_video_mjpeg_decode():
+    cv2 = require('cv2')
+    frame = synthetic_frames(1)[0]
+    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    seconds = best_of(lambda: cv2.imdecode(jpeg, cv2.IMREAD_COLOR), number=20, repeat=3)
+    return {'decode_ms': seconds * 1e3, 'decode_fps': 1.0 / seconds, 'jpeg_bytes': int(jpeg.size)}
+
+
+def bench_video_rescale():
+    require('cv2')
+    from turtleCam import rescale_frame
+    frame = synthetic_frames(1)[0]
+    seconds_75 = best_of(lambda: rescale_frame(frame, 75), number=20, repeat=3)
+    seconds_100 = best_of(lambda: rescale_frame(frame, 100), number=20, repeat=3)
+    return {'rescale_75_ms': seconds_75 * 1e3, 'rescale_100_ms': seconds_100 * 1e3}
+
+
+def bench_video_record_xvid():
+    cv2 = require('cv2')
+    frames = synthetic_frames()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.avi')
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), 20.0, (WIDTH, HEIGHT))
+        if not out.isOpened():
+            raise Skip('no XVID encoder in this OpenCV build')
+        frame_iter = iter(frames * 100)
+        seconds = best_of(lambda: out.write(next(frame_iter)), number=len(frames), repeat=3)
+        out.release()
+        size = os.path.getsize(path)
+    return {'write_ms': seconds * 1e3, 'bytes_per_frame': size // (3 * len(frames))}
@@ -0,0 +1,46 @@
+# Shared set-up for the benchmark modules, imported before anything else.
+#
+# The scripts in sphero/ and cameraStreams/ are run from their own folder and
+# the ROS packages are not installed here, so their folders are put on the
+# import path. Sphero benchmarks always run on the simulator with a stepped
+# virtual clock: simulated seconds cost no real time and results do not
+# depend on how loaded the machine is.
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for folder in ['sphero', 'cameraStreams'] + sorted(glob.glob(os.path.join(ROOT, 'packages', '*'))):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ['SPHERO_SIM'] = '1'
+os.environ['SPHERO_SIM_SPEEDUP'] = 'inf'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+class Skip(Exception):
+    """Raise from a benchmark that cannot run here (missing ROS, OpenCV, ...)."""
+
+
+def best_of(fn, number=1000, repeat=5):
+    # seconds per call, best of `repeat` runs of `number` calls
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def require(module_name):
+    # import an optional dependency or skip the benchmark
+    try:
+        return __import__(module_name)
+    except ImportError as e:
+        raise Skip('%s not available (%s)' % (module_name, e))
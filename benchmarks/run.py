@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Runs the benchmarks in this folder and stores the results as JSON.
+#
+#   python benchmarks/run.py                      run all, save results/<commit>.json
+#   python benchmarks/run.py -k race -k video     only benchmarks matching a word
+#   python benchmarks/run.py --compare benchmarks/results/abc1234.json --threshold 0.1
+#
+# Every bench_*.py module defines bench_* functions that return a dict of
+# metrics. The unit suffix of a metric tells the comparison which way is
+# better: _s/_ms/_us/_cm/_bytes are lower-is-better, _fps/_per_s/_pct are
+# higher-is-better, anything else is informational. With --compare the exit
+# status is 1 when a metric got worse than the baseline by more than
+# --threshold (relative).
+import argparse
+import contextlib
+import datetime
+import importlib
+import inspect
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from common import ROOT, Skip  # noqa: E402  (sets up paths and the simulator)
+
+LOWER_IS_BETTER = ('_s', '_ms', '_us', '_cm', '_bytes')
+HIGHER_IS_BETTER = ('_fps', '_per_s', '_pct')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def discover(words):
+    benchmarks = []
+    for filename in sorted(os.listdir(HERE)):
+        if not (filename.startswith('bench_') and filename.endswith('.py')):
+            continue
+        module = importlib.import_module(filename[:-3])
+        for name, fn in inspect.getmembers(module, inspect.isfunction):
+            if name.startswith('bench_') and fn.__module__ == module.__name__:
+                short = name[len('bench_'):]
+                if not words or any(w in short for w in words):
+                    benchmarks.append((short, fn))
+    return benchmarks
+
+
+def run(benchmarks, verbose=False):
+    results = {}
+    for name, fn in benchmarks:
+        output = io.StringIO()
+        try:
+            # the scripts print a lot, keep the report readable
+            with contextlib.redirect_stdout(sys.stdout if verbose else output):
+                results[name] = fn()
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+        except Exception:
+            results[name] = {'error': traceback.format_exc(limit=3)}
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, metrics):
+    if 'skipped' in metrics:
+        print('%-32s skipped: %s' % (name, metrics['skipped']))
+    elif 'error' in metrics:
+        print('%-32s ERROR\n%s' % (name, metrics['error']))
+    else:
+        values = '  '.join('%s=%s' % (k, '%.4g' % v if isinstance(v, float) else v)
+                           for k, v in metrics.items())
+        print('%-32s %s' % (name, values))
+
+
+def direction(metric):
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(current, baseline, threshold):
+    # list of human readable regressions of current against baseline
+    regressions = []
+    for name, metrics in current.items():
+        old = baseline.get(name, {})
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            before = old.get(metric)
+            if not sign or not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            if before == 0:
+                continue
+            change = (value - before) / abs(before)
+            if -sign * change > threshold:
+                regressions.append('%s.%s: %.4g -> %.4g (%+.1f%%)' % (
+                    name, metric, before, value, change * 100))
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description='Run the performance benchmarks')
+    p.add_argument('-k', dest='words', action='append', default=[],
+                   help='only run benchmarks whose name contains this word')
+    p.add_argument('--output', help='results file (default benchmarks/results/<commit>.json)')
+    p.add_argument('--compare', help='baseline results file to check for regressions')
+    p.add_argument('--threshold', type=float, default=0.10,
+                   help='allowed relative slowdown before a metric counts as regressed')
+    p.add_argument('--list', action='store_true', help='only list the benchmarks')
+    p.add_argument('-v', '--verbose', action='store_true', help='show benchmark output')
+    args = p.parse_args()
+
+    benchmarks = discover(args.words)
+    if args.list:
+        for name, fn in benchmarks:
+            print(name)
+        return 0
+
+    commit = git_commit()
+    results = run(benchmarks, args.verbose)
+    report = {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results,
+    }
+    output = args.output or os.path.join(HERE, 'results', commit + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('\nresults written to %s' % output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        print('compared with %s (%s), threshold %.0f%%' % (
+            args.compare, baseline.get('commit'), args.threshold * 100))
+        for line in regressions:
+            print('REGRESSION ' + line)
+        if regressions:
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
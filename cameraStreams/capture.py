@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Capture daemon: decodes a camera once into shared memory for every local
+# consumer.
+#
+# turtleCam.py and recordTurtle.py side by side each open the stream and
+# decode every frame themselves. With the daemon running, the frames are
+# decoded once, straight into a FrameRing (shmring.py) named frames-<camera>,
+# and the scripts attach to it instead: open_camera() returns a reader with
+# the cv2.VideoCapture interface whose frames are read-only NumPy views of
+# the ring, so attaching costs no decode and no copy. Without the daemon
+# open_camera() opens the camera itself, as before. The daemon reads through
+# a StreamSource (streamsource.py): a dropped camera is reopened and the
+# readers just see no new frames meanwhile.
+#
+#   python capture.py                          # turtle = camera_url()
+#   python capture.py --camera nao=tcp://10.2.172.130:3000
+#   python turtleCam.py & python recordTurtle.py
+import argparse
+import time
+from multiprocessing import shared_memory
+
+from relay import camera_url
+from shmring import FrameRing
+from streamsource import StreamSource, open_url
+
+SLOTS = 4  # a reader may fall 3 frames behind before its view is reused
+
+
+def ring_name(camera):
+    return "frames-" + camera
+
+
+class CaptureDaemon:
+    """Decodes `url` into the FrameRing frames-<camera> until stop is set."""
+
+    def __init__(self, url, camera="turtle", slots=SLOTS, log=print):
+        self.url = url
+        self.camera = camera
+        self.slots = slots
+        self.log = log
+        self.frames = 0
+
+    def _create(self, shape):
+        name = ring_name(self.camera)
+        try:
+            return FrameRing(name, shape, self.slots, create=True)
+        except FileExistsError:
+            # left behind by a daemon that was killed: attach it plainly (the
+            # tracker registration is undone by unlink), close and remove it
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            return FrameRing(name, shape, self.slots, create=True)
+
+    def run(self, stop=None):
+        source = StreamSource(self.url, log=self.log)
+        ring = None
+        try:
+            while stop is None or not stop.is_set():
+                if ring is None:
+                    # the first frame tells the ring's shape
+                    ok, first = source.read()
+                    if ok:
+                        ring = self._create(first.shape)
+                        ring.write(first, source.stamp)
+                        self.log(f"{self.camera}: {first.shape[1]}x{first.shape[0]} frames "
+                                 f"in shared memory {ring.name}")
+                    continue
+                _, slot = ring.claim()
+                ok, image = source.read(slot)
+                if not ok:
+                    continue
+                if image is not slot:
+                    # the stream changed size: readers attached to the old shape
+                    self.log(f"{self.camera}: frame size changed to {image.shape}")
+                    break
+                ring.commit(source.stamp)
+                self.frames += 1
+        finally:
+            source.release()
+            if ring is not None:
+                ring.close()
+
+
+class SharedCapture:
+    """cv2.VideoCapture look-alike on a FrameRing: read() waits for the next frame.
+
+    The frame is a read-only view into shared memory; copy it to keep it
+    longer than a few frame periods.
+    """
+
+    def __init__(self, camera="turtle", timeout=5.0):
+        self.ring = FrameRing(ring_name(camera))
+        self.timeout = timeout
+        self.seq = self.ring.latest() - 1 if self.ring.latest() else 0
+        self.stamp = 0.0
+
+    def isOpened(self):
+        return self.ring is not None
+
+    def read(self):
+        frame = self.ring.next(self.seq, self.timeout) if self.ring is not None else None
+        if frame is None:
+            return False, None
+        self.seq, self.stamp, image = frame
+        return True, image
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+def open_camera(camera="turtle"):
+    """The daemon's frames when it runs, else the camera itself."""
+    try:
+        return SharedCapture(camera)
+    except FileNotFoundError:
+        return open_url(camera_url(camera))
+
+
+def main():
+    p = argparse.ArgumentParser(description="Decode a camera once into shared memory")
+    p.add_argument("--camera", default=None, metavar="NAME=URL",
+                   help="camera to capture (default: turtle=camera_url())")
+    p.add_argument("--slots", type=int, default=SLOTS)
+    args = p.parse_args()
+    name, url = args.camera.split("=", 1) if args.camera else ("turtle", camera_url())
+    daemon = CaptureDaemon(url, name, args.slots)
+    started = time.monotonic()
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"{daemon.frames} frames in {time.monotonic() - started:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
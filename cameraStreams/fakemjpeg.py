@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Local stand-in for the TurtleBot's mjpg-streamer (:8080/?action=stream):
+# a multipart/x-mixed-replace stream of JPEG frames at a fixed rate, with the
+# Content-Length and X-Timestamp part headers mjpg-streamer sends. Every
+# connection gets the current frame of one shared camera clock, and the
+# bytes sent are counted, so tests can measure what the robot's Wi-Fi would
+# carry. For testing reconnects it can cut every connection after a while
+# (drop_every) and go away altogether for a few seconds (outage()).
+#
+#   server = FakeMjpegServer(fps=30).start()
+#   cv2.VideoCapture(server.url)
+#   ...
+#   server.stop()
+#
+#   python fakemjpeg.py --port 8080 --fps 20      # point the scripts at it
+#   python fakemjpeg.py --drop-every 10 --outage-every 30
+import argparse
+import http.server
+import threading
+import time
+
+BOUNDARY = "boundarydonotcross"
+
+
+def synthetic_jpegs(count=30, width=640, height=480, quality=80):
+    """JPEG frames of a moving box (OpenCV), or JPEG-framed filler without it."""
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        filler = bytes(range(256)) * (width * height // 40 // 256)
+        return [b"\xff\xd8" + bytes([i]) + filler + b"\xff\xd9" for i in range(count)]
+    base = np.zeros((height, width, 3), np.uint8)
+    base[:] = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None]
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * width // count) % (width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (0, 0, 255), -1)
+        cv2.putText(frame, str(i), (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+
+class FakeMjpegServer:
+
+    def __init__(self, frames=None, fps=30.0, host="127.0.0.1", port=0, drop_every=None):
+        self.frames = frames or synthetic_jpegs()
+        self.period = 1.0 / fps
+        self.drop_every = drop_every
+        self.bytes_sent = 0
+        self.connections = 0
+        self.active = 0
+        self.drops = 0
+        self.down_until = 0.0
+        self.seq = 0
+        self.stamp = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/?action=stream"
+
+    def start(self):
+        for target in (self._camera, self._httpd.serve_forever):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _camera(self):
+        # the shared frame clock: a new frame every period
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            with self._cond:
+                self.seq += 1
+                self.stamp = time.time()
+                self._cond.notify_all()
+            deadline += self.period
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    def outage(self, seconds):
+        """Stall every connection (then drop it) and refuse new ones for `seconds`."""
+        self.down_until = time.monotonic() + seconds
+
+    def down(self):
+        return time.monotonic() < self.down_until
+
+    def next_frame(self, after):
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after or self._stop.is_set(), timeout=1.0)
+            return self.seq, self.stamp
+
+    def _count(self, n):
+        with self._lock:
+            self.bytes_sent += n
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if server.down():
+                    self.close_connection = True
+                    return  # closed without a response, as if the robot were gone
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace;boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                with server._lock:
+                    server.connections += 1
+                    server.active += 1
+                try:
+                    self.stream()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def stream(self):
+                seq = 0
+                cut = None if server.drop_every is None else time.monotonic() + server.drop_every
+                while not server._stop.is_set():
+                    if server.down():
+                        # the link is gone: nothing arrives until it is back,
+                        # then the connection turns out to be dead
+                        while server.down() and not server._stop.is_set():
+                            time.sleep(0.05)
+                        cut = time.monotonic()
+                    if cut is not None and time.monotonic() >= cut:
+                        with server._lock:
+                            server.drops += 1
+                        return
+                    seq, stamp = server.next_frame(seq)
+                    jpeg = server.frames[seq % len(server.frames)]
+                    head = (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n"
+                            f"X-Timestamp: {stamp:.6f}\r\n\r\n").encode()
+                    self.wfile.write(head + jpeg + b"\r\n")
+                    server._count(len(head) + len(jpeg) + 2)
+
+        return Handler
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fake mjpg-streamer for testing the camera scripts")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--fps", type=float, default=20.0)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--drop-every", type=float, default=None, metavar="S",
+                   help="cut every connection after S seconds")
+    p.add_argument("--outage-every", type=float, default=None, metavar="S",
+                   help="go away for --outage seconds every S seconds")
+    p.add_argument("--outage", type=float, default=3.0, metavar="S")
+    args = p.parse_args()
+    server = FakeMjpegServer(fps=args.fps, host=args.host, port=args.port, drop_every=args.drop_every).start()
+    print(f"Streaming on {server.url} (Ctrl+C to stop)")
+    next_outage = time.monotonic() + (args.outage_every or float("inf"))
+    try:
+        while True:
+            time.sleep(5)
+            if time.monotonic() >= next_outage:
+                print(f"outage of {args.outage:.0f} s")
+                server.outage(args.outage)
+                next_outage += args.outage_every
+            print(f"{server.active} clients, {server.bytes_sent / 1e6:.1f} MB sent, {server.drops} dropped")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
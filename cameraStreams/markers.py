@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# Robot poses on the arena floor from the overview camera, using ArUco
+# markers (one per robot, on top of it).
+#
+# Detection runs on a downscaled grayscale frame (scale 0.5: about 5x
+# cheaper than at 1920x1080). Only the corners it finds are refined at full
+# resolution, with cornerSubPix in a small window around each one. A floor
+# homography (FloorHomography) maps the corners to centimetres on the floor.
+# A pose is the marker centre plus the heading of its top edge's normal, in
+# degrees, counter-clockwise from the floor x axis. Without a homography
+# poses are in pixels.
+#
+# Poses are published on a PoseBoard: a small ShmRing (shmring.py) that any
+# local process reads in microseconds, e.g. navigation or race timing:
+#   board = PoseBoard('overview')
+#   t, poses = board.latest()             # {marker id: MarkerPose}
+# With --ros they also go to overview/marker_<id> (geometry_msgs/PoseStamped,
+# metres, frame "arena").
+#
+#   python markers.py calibrate --image arena.png --anchors anchors.json
+#   python markers.py run --url rtsp://... --homography overview_homography.json --show
+import argparse
+import json
+import math
+import struct
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from shmring import ShmRing
+
+DICTIONARY = cv2.aruco.DICT_4X4_50
+SCALE = 0.5
+MAX_MARKERS = 50
+POSE = struct.Struct("<Ifff")  # id, x, y, heading (degrees)
+REFINE = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 20, 0.01)
+
+MarkerPose = namedtuple("MarkerPose", ["id", "x", "y", "heading", "corners"])
+
+
+class FloorHomography:
+    """Image pixels -> floor coordinates (cm) through a 3x3 homography."""
+
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix, np.float64).reshape(3, 3)
+
+    @classmethod
+    def from_points(cls, image_points, floor_points):
+        # at least 4 pairs; more are fitted in the least-squares sense
+        matrix, _ = cv2.findHomography(np.float32(image_points), np.float32(floor_points))
+        if matrix is None:
+            raise ValueError("cannot fit a homography to these points")
+        return cls(matrix)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)["H"])
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"H": self.matrix.tolist()}, f, indent=1)
+
+    def to_floor(self, points):
+        points = np.asarray(points, np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.matrix).reshape(-1, 2)
+
+    def to_image(self, points):
+        points = np.asarray(points, np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, np.linalg.inv(self.matrix)).reshape(-1, 2)
+
+
+class MarkerTracker:
+
+    def __init__(self, homography=None, scale=SCALE, dictionary=DICTIONARY, ids=None):
+        self.homography = homography
+        self.scale = scale
+        self.ids = None if ids is None else set(ids)
+        params = cv2.aruco.DetectorParameters()
+        self.detector = cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(dictionary), params)
+        # half window of the full-resolution refinement: a bit more than
+        # one downscaled pixel
+        self.window = max(2, int(round(1.5 / scale)))
+
+    def corners(self, frame):
+        """{id: 4x2 full-resolution corners} of the markers in a BGR or gray frame."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = gray if self.scale == 1 else cv2.resize(
+            gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        found, ids, _ = self.detector.detectMarkers(small)
+        if ids is None:
+            return {}
+        found = {int(i): c.reshape(4, 2) for i, c in zip(ids.ravel(), found)
+                 if self.ids is None or int(i) in self.ids}
+        if not found or self.scale == 1:
+            return found
+        # corners of the small image to full resolution (pixel centres), then
+        # refined on the full frame around each corner only
+        points = (np.concatenate(list(found.values())) + 0.5) / self.scale - 0.5
+        points = np.ascontiguousarray(points, np.float32).reshape(-1, 1, 2)
+        cv2.cornerSubPix(gray, points, (self.window, self.window), (-1, -1), REFINE)
+        return {i: points[4 * n:4 * n + 4].reshape(4, 2) for n, i in enumerate(found)}
+
+    def poses(self, frame):
+        return [self.pose(i, c) for i, c in self.corners(frame).items()]
+
+    def pose(self, marker_id, corners):
+        floor = corners if self.homography is None else self.homography.to_floor(corners)
+        centre = floor.mean(axis=0)
+        # marker "up": from the centre towards the middle of the top edge
+        up = (floor[0] + floor[1]) / 2 - centre
+        if self.homography is None:
+            up = up * (1, -1)  # image y points down
+        heading = math.degrees(math.atan2(up[1], up[0])) % 360
+        return MarkerPose(marker_id, float(centre[0]), float(centre[1]), heading, corners)
+
+
+class PoseBoard:
+    """Latest marker poses in shared memory: one writer, any number of readers."""
+
+    def __init__(self, camera="overview", create=False):
+        self.ring = ShmRing("markers-" + camera, slots=4, slot_size=4 + POSE.size * MAX_MARKERS,
+                            create=create)
+
+    def publish(self, poses, t=None):
+        poses = poses[:MAX_MARKERS]
+        data = struct.pack("<I", len(poses)) + b"".join(
+            POSE.pack(p.id, p.x, p.y, p.heading) for p in poses)
+        return self.ring.write(data, t)
+
+    def latest(self):
+        """(time.time() of the frame, {id: MarkerPose}); (0.0, {}) before the first frame."""
+        frame = self.ring.read()
+        if frame is None:
+            return 0.0, {}
+        _, t, data = frame
+        n = struct.unpack_from("<I", data)[0]
+        poses = (MarkerPose(*POSE.unpack_from(data, 4 + k * POSE.size), None) for k in range(n))
+        return t, {p.id: p for p in poses}
+
+    def close(self):
+        self.ring.close()
+
+
+def ros_publisher(node_name="overview_markers"):
+    """publish(poses, t) to overview/marker_<id> as PoseStamped (needs ROS 2)."""
+    import rclpy
+    from geometry_msgs.msg import PoseStamped
+
+    rclpy.init()
+    node = rclpy.create_node(node_name)
+    publishers = {}
+
+    def publish(poses, t):
+        sec = int(t)
+        for p in poses:
+            if p.id not in publishers:
+                publishers[p.id] = node.create_publisher(PoseStamped, f"overview/marker_{p.id}", 10)
+            msg = PoseStamped()
+            msg.header.frame_id = "arena"
+            msg.header.stamp.sec, msg.header.stamp.nanosec = sec, int((t - sec) * 1e9)
+            msg.pose.position.x, msg.pose.position.y = p.x / 100.0, p.y / 100.0
+            yaw = math.radians(p.heading)
+            msg.pose.orientation.z, msg.pose.orientation.w = math.sin(yaw / 2), math.cos(yaw / 2)
+            publishers[p.id].publish(msg)
+
+    return publish
+
+
+def draw(frame, poses):
+    for p in poses:
+        if p.corners is None:
+            continue
+        pts = p.corners.astype(np.int32)
+        cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
+        cv2.putText(frame, f"{p.id}: {p.x:.0f},{p.y:.0f} {p.heading:.0f}deg", tuple(pts[0]),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return frame
+
+
+def render_markers(poses, homography, image_size=(1920, 1080), side_cm=10.0,
+                   dictionary=DICTIONARY, noise=0, seed=0):
+    """Synthetic overview frame: markers (id, x_cm, y_cm, heading) on a gray floor."""
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+    frame = np.full((height, width), 150, np.uint8)
+    aruco = cv2.aruco.getPredefinedDictionary(dictionary)
+    px = 200
+    for marker_id, x, y, heading in poses:
+        marker = cv2.aruco.generateImageMarker(aruco, marker_id, px)
+        # floor corners, top-left first (as detected), "up" along heading
+        a = math.radians(heading)
+        up = np.array([math.cos(a), math.sin(a)]) * side_cm / 2
+        right = np.array([up[1], -up[0]])
+        centre = np.array([x, y])
+        floor = [centre + up - right, centre + up + right, centre - up + right, centre - up - right]
+        image = homography.to_image(floor).astype(np.float32)
+        edge, down = image[1] - image[0], image[3] - image[0]
+        if edge[0] * down[1] - edge[1] * down[0] < 0:
+            # the homography mirrors: left and right swap on the floor
+            image = image[[1, 0, 3, 2]]
+        src = np.float32([[0, 0], [px, 0], [px, px], [0, px]])
+        warp = cv2.getPerspectiveTransform(src, image)
+        cv2.warpPerspective(marker, warp, (width, height), frame, borderMode=cv2.BORDER_TRANSPARENT)
+    if noise:
+        frame = cv2.add(frame, rng.integers(0, noise, frame.shape, dtype=np.uint8))
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def calibrate(args):
+    frame = cv2.imread(args.image)
+    if frame is None:
+        raise SystemExit(f"cannot read {args.image}")
+    with open(args.anchors) as f:
+        anchors = {int(k): v for k, v in json.load(f).items()}  # id -> [x_cm, y_cm]
+    corners = MarkerTracker(scale=1.0, ids=anchors).corners(frame)
+    if len(corners) < 4:
+        raise SystemExit(f"found anchor markers {sorted(corners)}, need at least 4 of {sorted(anchors)}")
+    homography = FloorHomography.from_points([c.mean(axis=0) for c in corners.values()],
+                                             [anchors[i] for i in corners])
+    homography.save(args.homography)
+    print(f"homography from markers {sorted(corners)} saved to {args.homography}")
+
+
+def run(args):
+    from streamsource import StreamSource
+    homography = FloorHomography.load(args.homography) if args.homography else None
+    tracker = MarkerTracker(homography, scale=args.scale)
+    board = PoseBoard(args.camera, create=True)
+    ros = ros_publisher() if args.ros else None
+    cap = StreamSource(args.url)
+    frames, spent, started = 0, 0.0, time.monotonic()
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            start = time.perf_counter()
+            poses = tracker.poses(frame)
+            spent += time.perf_counter() - start
+            board.publish(poses, cap.stamp)
+            if ros is not None:
+                ros(poses, cap.stamp)
+            frames += 1
+            if args.show:
+                cv2.imshow("markers", draw(frame, poses))
+                if cv2.waitKey(1) == 27:
+                    break
+            if time.monotonic() - started >= 5.0:
+                print(f"{frames / (time.monotonic() - started):.1f} fps, "
+                      f"{1e3 * spent / frames:.1f} ms/frame, markers {sorted(p.id for p in poses)}")
+                frames, spent, started = 0, 0.0, time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        board.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="ArUco robot poses from the overview camera")
+    sub = p.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("calibrate", help="fit the floor homography to anchor markers")
+    c.add_argument("--image", required=True, help="overview frame with the anchor markers")
+    c.add_argument("--anchors", required=True, help='JSON {"id": [x_cm, y_cm], ...}, at least 4')
+    c.add_argument("--homography", default="overview_homography.json")
+    r = sub.add_parser("run", help="detect markers on the stream and publish their poses")
+    r.add_argument("--url", required=True, help="overview camera stream")
+    r.add_argument("--homography", default=None, help="from `calibrate`; poses in pixels without it")
+    r.add_argument("--camera", default="overview", help="PoseBoard name: markers-<camera>")
+    r.add_argument("--scale", type=float, default=SCALE, help="detection scale")
+    r.add_argument("--ros", action="store_true", help="also publish overview/marker_<id> topics")
+    r.add_argument("--show", action="store_true")
+    args = p.parse_args()
+    calibrate(args) if args.command == "calibrate" else run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Motion-triggered recording: only write the parts of a session where
+# something happens.
+#
+# MotionDetector compares each frame with the previous one on a 160x120
+# grayscale copy (resize, blur, absdiff, count: well under a millisecond for
+# a 1280x960 frame) and reports the fraction of pixels that changed.
+# MotionRecorder keeps the last `pre_roll` seconds in a preallocated ring in
+# memory; motion, or an event from trigger() (a robot command, a key), opens
+# a new clip that starts with the pre-roll, and the clip is closed once
+# `post_roll` seconds pass without motion or events.
+#
+#   recorder = MotionRecorder(fps=20.0)
+#   recorder.feed(frame)                 # every frame
+#   recorder.trigger("cmd_vel")          # from any thread
+#   recorder.close()
+import datetime
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SMALL = (160, 120)     # detection size
+THRESHOLD = 16         # gray levels a pixel must change by
+MIN_CHANGED = 0.003    # fraction of changed pixels that is motion
+
+
+class MotionDetector:
+
+    def __init__(self, size=SMALL, threshold=THRESHOLD, min_changed=MIN_CHANGED):
+        self.size = size
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.prev = None
+        self.changed = 0.0
+
+    def __call__(self, frame):
+        """Fraction of pixels that changed since the previous frame."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)  # camera and JPEG noise
+        prev, self.prev = self.prev, small
+        if prev is None:
+            self.changed = 0.0
+        else:
+            self.changed = np.count_nonzero(cv2.absdiff(small, prev) > self.threshold) / small.size
+        return self.changed
+
+    def moving(self, frame):
+        return self(frame) >= self.min_changed
+
+
+class MotionRecorder:
+
+    def __init__(self, fps=20.0, pre_roll=1.0, post_roll=3.0, directory=".", fourcc="XVID",
+                 detector=None, log=print):
+        self.fps = fps
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.directory = directory
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.detector = detector or MotionDetector()
+        self.log = log
+        self.writer = None
+        self.paths = []
+        self.frames_in = 0
+        self.frames_written = 0
+        self.detect_s = 0.0
+        self._ring = None          # pre-roll frames, preallocated on the first frame
+        self._ring_next = 0
+        self._ring_count = 0
+        self._last_trigger = None
+        self._event = None
+        self._lock = threading.Lock()
+
+    def trigger(self, reason="event"):
+        """Record from now on (with pre-roll) for at least post_roll seconds."""
+        with self._lock:
+            self._event = reason
+
+    def feed(self, frame, stamp=None):
+        """Buffer or write one frame; True while a clip is being recorded."""
+        stamp = time.time() if stamp is None else stamp
+        self.frames_in += 1
+        start = time.perf_counter()
+        moving = self.detector.moving(frame)
+        self.detect_s += time.perf_counter() - start
+        with self._lock:
+            event, self._event = self._event, None
+        if moving or event:
+            self._last_trigger = stamp
+        if self.writer is None:
+            if not (moving or event):
+                self._buffer(frame)
+                return False
+            self._open(frame.shape, stamp, event or f"motion {self.detector.changed:.1%}")
+        self.writer.write(frame)
+        self.frames_written += 1
+        if stamp - self._last_trigger >= self.post_roll:
+            self._close()
+        return self.writer is not None
+
+    def _buffer(self, frame):
+        size = max(1, round(self.pre_roll * self.fps))
+        if self._ring is None or self._ring.shape[1:] != frame.shape:
+            self._ring = np.empty((size,) + frame.shape, np.uint8)
+            self._ring_next = self._ring_count = 0
+        np.copyto(self._ring[self._ring_next], frame)
+        self._ring_next = (self._ring_next + 1) % size
+        self._ring_count = min(size, self._ring_count + 1)
+
+    def _open(self, shape, stamp, reason):
+        name = datetime.datetime.fromtimestamp(stamp).strftime("%Y%m%d%H%M%S_%f")[:-3] + ".avi"
+        path = os.path.join(self.directory, name)
+        self.writer = cv2.VideoWriter(path, self.fourcc, self.fps, (shape[1], shape[0]))
+        self.paths.append(path)
+        self.log(f"recording {name} ({reason})")
+        # the pre-roll, oldest first
+        size = len(self._ring) if self._ring is not None else 0
+        for i in range(self._ring_count):
+            self.writer.write(self._ring[(self._ring_next - self._ring_count + i) % size])
+        self.frames_written += self._ring_count
+        self._ring_count = 0
+
+    def _close(self):
+        self.writer.release()
+        self.writer = None
+        self.log(f"stopped {os.path.basename(self.paths[-1])}")
+
+    def close(self):
+        if self.writer is not None:
+            self._close()
+
+    def bytes_written(self):
+        return sum(os.path.getsize(p) for p in self.paths if os.path.exists(p))
+
+    def stats(self):
+        return {"frames": self.frames_in, "written": self.frames_written, "clips": len(self.paths),
+                "bytes": self.bytes_written(),
+                "detect_ms": 1e3 * self.detect_s / max(1, self.frames_in)}
+
+
+def cmd_vel_events(recorder, topic="cmd_vel"):
+    """Trigger the recorder on every non-zero Twist on `topic` (needs ROS 2; thread)."""
+    try:
+        import rclpy
+        from geometry_msgs.msg import Twist
+    except ImportError:
+        print(f"ROS 2 not available, not listening to {topic}")
+        return None
+
+    def spin():
+        rclpy.init()
+        node = rclpy.create_node("record_turtle_events")
+
+        def on_twist(msg):
+            if msg.linear.x or msg.linear.y or msg.angular.z:
+                recorder.trigger(topic)
+
+        node.create_subscription(Twist, topic, on_twist, 10)
+        try:
+            rclpy.spin(node)
+        finally:
+            node.destroy_node()
+
+    thread = threading.Thread(target=spin, daemon=True)
+    thread.start()
+    return thread
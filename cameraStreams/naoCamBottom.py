@@ -1,21 +1,20 @@
 import cv2
+from streamsource import StreamSource
 
 def main():
     # TCP/IP address and port
     stream_address = 'tcp://10.2.172.130:3000'
 
-    # Create a VideoCapture object
-    cap = cv2.VideoCapture(stream_address)
+    # Create a VideoCapture object that reopens the stream when it drops
+    cap = StreamSource(stream_address)
 
-    while(cap.isOpened()):
+    while True:
         ret, frame = cap.read()
         if ret:
             # Display the frame
             cv2.imshow('frame', frame)
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        else:
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             break
     cap.release()
     cv2.destroyAllWindows()
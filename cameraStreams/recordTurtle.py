@@ -1,11 +1,17 @@
+import argparse
 import cv2
 import datetime
-import os
+from capture import open_camera
+from motion import MotionRecorder, cmd_vel_events
+from streamsource import StreamSource, marker_frame
 
-def record_video_and_capture_images():
+FPS = 20.0
+
+def record_video_and_capture_images(recorder=None):
     # Start video capture
     cap = cv2.VideoCapture(0)
-    cap = cv2.VideoCapture("http://10.2.172."+os.getenv('ROS_DOMAIN_ID')+":8080/?action=stream")
+    # capture.py's shared frames, else TURTLECAM_URL / the robot; reopened when it drops
+    cap = StreamSource(open_camera)
 
     # Define the codec for video recording
     fourcc = cv2.VideoWriter_fourcc(*'XVID')
@@ -14,15 +20,33 @@ def record_video_and_capture_images():
     while True:
         ret, frame = cap.read()
         if not ret:
-            break
+            # stream dropped: keep the window alive while it reconnects
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            continue
+
+        # Motion mode: the recorder decides what to write, in clips
+        if recorder is not None:
+            recorder.feed(frame, cap.stamp)
 
         # Initialize the VideoWriter object when the frame is available
-        if out is None:
+        elif out is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            out = cv2.VideoWriter(f'{timestamp}.avi', fourcc, 20.0, (1280, 960))
+            out = cv2.VideoWriter(f'{timestamp}.avi', fourcc, FPS, (1280, 960))
+
+        # Fill a hole in the stream with marker frames so the video keeps real
+        # time, and note it in <timestamp>.gaps.txt
+        if out is not None and cap.gap:
+            start = datetime.datetime.fromtimestamp(cap.stamp - cap.gap)
+            marker = marker_frame(frame.shape, f"NO SIGNAL {start:%H:%M:%S} +{cap.gap:.1f} s")
+            for _ in range(round(cap.gap * FPS) - 1):
+                out.write(marker)
+            with open(f'{timestamp}.gaps.txt', 'a') as gaps:
+                gaps.write(f"{start.isoformat(timespec='milliseconds')} {cap.gap:.2f}\n")
 
         # Write the frame to the video file
-        out.write(frame)
+        if out is not None:
+            out.write(frame)
 
         # Display the frame
         cv2.imshow('frame', frame)
@@ -35,14 +59,43 @@ def record_video_and_capture_images():
             img_timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
             cv2.imwrite(f'{img_timestamp}.png', frame)
 
+        # Start (or extend) a clip when 'r' is pressed in motion mode
+        if key & 0xFF == ord('r') and recorder is not None:
+            recorder.trigger("key")
+
         # Break the loop when 'q' is pressed
         if key & 0xFF == ord('q'):
             break
 
     # Release everything when job is finished
     cap.release()
-    out.release()
+    if out is not None:
+        out.release()
+    if recorder is not None:
+        recorder.close()
+        report(recorder)
     cv2.destroyAllWindows()
 
+def report(recorder):
+    stats = recorder.stats()
+    skipped = stats["frames"] - stats["written"]
+    per_frame = stats["bytes"] / max(1, stats["written"])
+    print(f"wrote {stats['written']} of {stats['frames']} frames in {stats['clips']} clips "
+          f"({stats['bytes'] / 1e6:.1f} MB, about {skipped * per_frame / 1e6:.1f} MB saved), "
+          f"motion detection {stats['detect_ms']:.2f} ms/frame")
+
 if __name__ == "__main__":
-    record_video_and_capture_images()
+    p = argparse.ArgumentParser(description="Record the TurtleBot camera (space: snapshot, q: quit)")
+    p.add_argument("--motion", action="store_true",
+                   help="only record around motion and robot commands, in clips (r: start a clip)")
+    p.add_argument("--pre-roll", type=float, default=1.0, help="seconds kept before a trigger")
+    p.add_argument("--post-roll", type=float, default=3.0, help="seconds recorded after the last trigger")
+    p.add_argument("--cmd-topic", default=None, metavar="TOPIC",
+                   help="also start clips on non-zero Twists on TOPIC (e.g. cmd_vel; needs ROS 2)")
+    args = p.parse_args()
+    recorder = None
+    if args.motion:
+        recorder = MotionRecorder(FPS, args.pre_roll, args.post_roll)
+        if args.cmd_topic:
+            cmd_vel_events(recorder, args.cmd_topic)
+    record_video_and_capture_images(recorder)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# Camera relay: one upstream connection per camera, any number of viewers.
+#
+# Every viewer that opens the TurtleBot's mjpg-streamer gets its own copy of
+# the stream over the robot's Wi-Fi. The relay reads each camera once and
+# hands the JPEG frames on as they are, never re-encoded:
+# - over HTTP: /stream/<camera> is an MJPEG stream like mjpg-streamer's, so
+#   cv2.VideoCapture and browsers open it the same way; /snapshot/<camera>
+#   is the newest JPEG, /stats the counters
+# - in shared memory (--shm): a ShmRing named cam-<camera> for local OpenCV
+#   consumers, see shm_frames()
+# A slow viewer skips frames and always gets the newest; it never holds up
+# the upstream or the other viewers. A dropped upstream is reopened with
+# backoff.
+#
+#   python relay.py --port 8090 --shm                      # turtle=$ROS_DOMAIN_ID's robot
+#   python relay.py --camera nao=http://10.2.172.130:8080/?action=stream
+#   TURTLECAM_URL=http://localhost:8090/stream/turtle python turtleCam.py
+import argparse
+import os
+import threading
+import time
+import urllib.request
+
+from shmring import ShmRing
+
+SHM_SLOT_SIZE = 1 << 20  # one 1280x960 JPEG fits easily
+
+
+def robot_url():
+    return "http://10.2.172." + os.getenv("ROS_DOMAIN_ID", "0") + ":8080/?action=stream"
+
+
+def camera_url(name="turtle"):
+    """Where a script opens the camera: $TURTLECAM_URL (e.g. the relay) or the robot itself."""
+    return os.getenv(name.upper() + "CAM_URL") or robot_url()
+
+
+def read_parts(stream):
+    """Yield (headers, jpeg) of a multipart/x-mixed-replace response body."""
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if not line.startswith(b"--"):
+            continue  # blank lines between parts
+        headers = {}
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            line = line.strip()
+            if not line:
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = headers.get("content-length")
+        if length is not None:
+            data = stream.read(int(length))
+        else:
+            # no length: up to the JPEG end marker
+            data = bytearray()
+            while not data.endswith(b"\xff\xd9"):
+                chunk = stream.read(1)
+                if not chunk:
+                    return
+                data += chunk
+            data = bytes(data)
+        if len(data) < int(length or 0):
+            return
+        yield headers, data
+
+
+class CameraRelay:
+    """Reads one camera on a thread; viewers wait for frames with next_frame()."""
+
+    def __init__(self, name, url, shm=False, timeout=5.0, backoff=0.5, max_backoff=8.0, log=print):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.log = log
+        # (seq, camera timestamp, jpeg); seq 0 = nothing yet
+        self.frame = (0, 0.0, b"")
+        self.bytes_in = 0
+        self.frames_in = 0
+        self.reconnects = 0
+        self.viewers = 0
+        self.ring = ShmRing("cam-" + name, slots=8, slot_size=SHM_SLOT_SIZE, create=True) if shm else None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+        if self.ring is not None:
+            self.ring.close()
+
+    def _run(self):
+        delay = self.backoff
+        while not self._stop.is_set():
+            try:
+                with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                    delay = self.backoff
+                    for headers, jpeg in read_parts(response):
+                        self._publish(headers, jpeg)
+                        if self._stop.is_set():
+                            return
+                self.log(f"{self.name}: upstream closed")
+            except OSError as e:
+                self.log(f"{self.name}: upstream error ({e}), retry in {delay:.1f} s")
+            self.reconnects += 1
+            self._stop.wait(delay)
+            delay = min(self.max_backoff, delay * 2)
+
+    def _publish(self, headers, jpeg):
+        try:
+            stamp = float(headers.get("x-timestamp", ""))
+        except ValueError:
+            stamp = time.time()
+        self.bytes_in += len(jpeg)
+        if self.ring is not None and len(jpeg) <= self.ring.slot_size:
+            self.ring.write(jpeg, stamp)
+        with self._cond:
+            self.frames_in += 1
+            self.frame = (self.frames_in, stamp, jpeg)
+            self._cond.notify_all()
+
+    def next_frame(self, after=0, timeout=5.0):
+        """The newest frame with seq > after, or None after timeout (or on stop)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.frame[0] > after or self._stop.is_set(), timeout)
+            return self.frame if self.frame[0] > after else None
+
+    def mjpeg(self, boundary="frame"):
+        # body of /stream/<camera>: one part per new frame, the viewer's own pace
+        with self._cond:
+            self.viewers += 1
+        try:
+            seq = 0
+            while not self._stop.is_set():
+                frame = self.next_frame(seq)
+                if frame is None:
+                    continue
+                seq, stamp, jpeg = frame
+                yield (f"--{boundary}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n"
+                       f"X-Timestamp: {stamp:.6f}\r\n\r\n").encode() + jpeg + b"\r\n"
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def stats(self):
+        return {"url": self.url, "frames": self.frames_in, "bytes_in": self.bytes_in,
+                "viewers": self.viewers, "reconnects": self.reconnects, "shm": self.ring is not None}
+
+
+def create_app(relays):
+    from flask import Flask, Response, abort, jsonify
+
+    app = Flask(__name__)
+
+    def relay_or_404(name):
+        if name not in relays:
+            abort(404)
+        return relays[name]
+
+    @app.route("/")
+    def index():
+        links = "".join(f'<li><a href="/stream/{n}">{n}</a> ({r.viewers} viewers)</li>' for n, r in relays.items())
+        return f"<html><body><h3>Camera relay</h3><ul>{links}</ul></body></html>"
+
+    @app.route("/stream/<name>")
+    def stream(name):
+        relay = relay_or_404(name)
+        return Response(relay.mjpeg(), mimetype="multipart/x-mixed-replace; boundary=frame",
+                        headers={"Cache-Control": "no-store"})
+
+    @app.route("/snapshot/<name>")
+    def snapshot(name):
+        frame = relay_or_404(name).next_frame(0, timeout=2.0)
+        if frame is None:
+            abort(503)
+        return Response(frame[2], mimetype="image/jpeg")
+
+    @app.route("/stats")
+    def stats():
+        return jsonify({n: r.stats() for n, r in relays.items()})
+
+    return app
+
+
+def shm_frames(name="turtle", timeout=5.0):
+    """Decoded frames (BGR arrays) from a relay's --shm ring; a slow reader skips to the newest."""
+    import cv2
+    import numpy as np
+    with ShmRing("cam-" + name) as ring:
+        seq = 0
+        while True:
+            frame = ring.next(seq, timeout)
+            if frame is None:
+                return
+            seq, _, jpeg = frame
+            yield cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+def main():
+    p = argparse.ArgumentParser(description="MJPEG relay: one upstream per camera, many viewers")
+    p.add_argument("--camera", action="append", default=[], metavar="NAME=URL",
+                   help="camera to relay (default: turtle=the ROS_DOMAIN_ID robot)")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--shm", action="store_true", help="also publish the frames in shared memory")
+    args = p.parse_args()
+    cameras = dict(c.split("=", 1) for c in args.camera) or {"turtle": robot_url()}
+    relays = {name: CameraRelay(name, url, shm=args.shm).start() for name, url in cameras.items()}
+    try:
+        create_app(relays).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        for relay in relays.values():
+            relay.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Ring of fixed-size slots in multiprocessing.shared_memory: one writer
+# process, any number of readers in other processes, no sockets or copies
+# through a pipe.
+#
+# Layout: a header (magic, slot count, slot size, latest sequence number)
+# and `slots` slots of (seq, timestamp, length, payload). The writer marks a
+# slot with seq 0 while it fills it and publishes the new seq last, so a
+# reader that finds the same seq before and after copying got a whole
+# payload (a seqlock); a slot overwritten meanwhile reads as None and the
+# reader moves on to the newest frame. Readers poll: there is no
+# cross-process wake-up in the standard library.
+#
+#   ring = ShmRing('turtlecam', slots=8, slot_size=512 * 1024, create=True)
+#   ring.write(jpeg_bytes)
+#   ...
+#   ring = ShmRing('turtlecam')              # in another process
+#   seq, t, data = ring.next(after=0, timeout=1.0)
+#
+# FrameRing is the same ring for decoded images of one fixed shape: the
+# writer decodes straight into a slot and readers get NumPy views of it,
+# so a frame is decoded once and never copied between processes.
+#
+#   ring = FrameRing('frames-turtle', shape=(960, 1280, 3), create=True)
+#   seq, slot = ring.claim()
+#   capture.read(slot)                       # decode into shared memory
+#   ring.commit()
+#   ...
+#   seq, t, image = FrameRing('frames-turtle').next(after=0, timeout=1.0)
+import struct
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+MAGIC = b"SHMR"
+HEADER = struct.Struct("<4sII4xQ")  # magic, slots, slot size, latest seq (offset 16)
+FRAME = struct.Struct("<III")        # FrameRing: height, width, channels (offset 24)
+SLOT = struct.Struct("<QdI4x")    # seq, time.time(), payload length
+ALIGN = 64
+
+_created = set()  # rings this process created (and will unlink)
+
+
+class ShmRing:
+
+    def __init__(self, name, slots=8, slot_size=1 << 20, create=False):
+        self.name = name
+        if create:
+            stride = -(-(SLOT.size + slot_size) // ALIGN) * ALIGN
+            self._shm = shared_memory.SharedMemory(name, create=True, size=ALIGN + slots * stride)
+            HEADER.pack_into(self._shm.buf, 0, MAGIC, slots, slot_size, 0)
+            _created.add(name)
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+            # only the creator may unlink it; before 3.13 the resource tracker
+            # of every attaching process would remove it at exit
+            if name not in _created:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            magic, slots, slot_size, _ = HEADER.unpack_from(self._shm.buf, 0)
+            if magic != MAGIC:
+                self._shm.close()
+                raise ValueError(f"{name}: not a shared memory ring")
+        self.owner = create
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stride = -(-(SLOT.size + slot_size) // ALIGN) * ALIGN
+        self.buf = self._shm.buf
+        self.seq = HEADER.unpack_from(self.buf, 0)[3]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _offset(self, seq):
+        return ALIGN + (seq % self.slots) * self.stride
+
+    def payload(self, seq, length):
+        """Zero-copy view of a slot's payload (valid until the slot is reused)."""
+        start = self._offset(seq) + SLOT.size
+        return self.buf[start:start + length]
+
+    # ---- writer ----
+
+    def write(self, data, t=None):
+        n = len(data)
+        if n > self.slot_size:
+            raise ValueError(f"{n} bytes do not fit a {self.slot_size} byte slot")
+        seq = self.seq + 1
+        off = self._offset(seq)
+        t = time.time() if t is None else t
+        SLOT.pack_into(self.buf, off, 0, t, n)
+        self.buf[off + SLOT.size:off + SLOT.size + n] = data
+        SLOT.pack_into(self.buf, off, seq, t, n)
+        struct.pack_into("<Q", self.buf, 16, seq)
+        self.seq = seq
+        return seq
+
+    # ---- readers ----
+
+    def latest(self):
+        return struct.unpack_from("<Q", self.buf, 16)[0]
+
+    def stamp(self, seq):
+        """(time, length) of slot seq, or None if it holds another frame by now."""
+        s, t, n = SLOT.unpack_from(self.buf, self._offset(seq))
+        return (t, n) if s == seq else None
+
+    def valid(self, seq):
+        return SLOT.unpack_from(self.buf, self._offset(seq))[0] == seq
+
+    def read(self, seq=None):
+        """(seq, time, bytes) of frame seq (default the newest), or None if it is gone."""
+        seq = self.latest() if seq is None else seq
+        if seq == 0:
+            return None
+        head = self.stamp(seq)
+        if head is None:
+            return None
+        data = bytes(self.payload(seq, head[1]))
+        return (seq, head[0], data) if self.valid(seq) else None
+
+    def next(self, after=0, timeout=None, poll=0.002):
+        """The newest frame after seq `after`, waiting up to timeout; None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.latest()
+            if seq > after:
+                frame = self.read(seq)
+                if frame is not None:
+                    return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        self.buf = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+            _created.discard(self.name)
+
+
+class FrameRing(ShmRing):
+    """ShmRing of uint8 images of one shape; slots are read and written as NumPy views."""
+
+    def __init__(self, name, shape=None, slots=4, create=False):
+        import numpy as np
+        if create:
+            shape = tuple(shape) + (1,) * (3 - len(shape))
+            super().__init__(name, slots, slot_size=shape[0] * shape[1] * shape[2], create=True)
+            FRAME.pack_into(self.buf, 24, *shape)
+        else:
+            super().__init__(name)
+            shape = FRAME.unpack_from(self.buf, 24)
+            if shape[0] * shape[1] * shape[2] != self.slot_size:
+                self.close()
+                raise ValueError(f"{name}: not a frame ring")
+        self.shape = shape if shape[2] > 1 else shape[:2]
+        self._views = [np.ndarray(self.shape, np.uint8, self.buf, self._offset(i) + SLOT.size)
+                       for i in range(self.slots)]
+        if not create:
+            for view in self._views:
+                view.flags.writeable = False
+
+    # ---- writer ----
+
+    def claim(self):
+        """(seq, view) of the next slot, marked as being written; fill it, then commit()."""
+        seq = self.seq + 1
+        SLOT.pack_into(self.buf, self._offset(seq), 0, 0.0, 0)
+        return seq, self._views[seq % self.slots]
+
+    def commit(self, t=None):
+        seq = self.seq + 1
+        SLOT.pack_into(self.buf, self._offset(seq), seq, time.time() if t is None else t, self.slot_size)
+        struct.pack_into("<Q", self.buf, 16, seq)
+        self.seq = seq
+        return seq
+
+    def write(self, frame, t=None):
+        # for sources that decode into their own array: one copy into the slot
+        _, view = self.claim()
+        view[...] = frame
+        return self.commit(t)
+
+    # ---- readers ----
+
+    def frame(self, seq):
+        """View of frame seq, or None if its slot holds another frame by now.
+
+        The view stays valid until the writer gets `slots` frames ahead; check
+        valid(seq) after using it, or copy it to keep it.
+        """
+        return self._views[seq % self.slots] if seq and self.valid(seq) else None
+
+    def read(self, seq=None):
+        seq = self.latest() if seq is None else seq
+        head = self.stamp(seq) if seq else None
+        return None if head is None else (seq, head[0], self._views[seq % self.slots])
+
+    def close(self):
+        self._views = []  # the views pin the buffer: SharedMemory.close() refuses while they exist
+        super().close()
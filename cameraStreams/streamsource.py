@@ -0,0 +1,128 @@
+# A camera stream that survives Wi-Fi hiccups.
+#
+# cv2.VideoCapture on the robot's stream returns False for good once the
+# connection drops, and a stalled connection can block read() for a long
+# time. StreamSource has the same read()/isOpened()/release() interface but:
+# - reads and opens time out (timeout seconds, OpenCV's FFmpeg options)
+# - a failed or timed-out read closes the capture and reopens it, at once
+#   the first time, then with exponential backoff; meanwhile read() returns
+#   (False, None) after at most `poll` seconds, so a viewer loop keeps
+#   running its cv2.waitKey()
+# - every frame is stamped (stamp, time.time() when it arrived) and `gap`
+#   says how many seconds went missing before it, so a recorder can mark the
+#   hole instead of ending the file (see marker_frame())
+#
+#   cap = StreamSource(camera_url())        # or StreamSource(open_camera)
+#   while True:
+#       ok, frame = cap.read()
+#       if ok and cap.gap:
+#           ...                             # cap.gap seconds are missing
+import time
+
+import cv2
+
+GAP_AFTER = 0.5  # seconds between frames that count as a gap
+
+
+def marker_frame(shape, text):
+    """A dark frame of `shape` with `text` on it, to stand in for missing frames."""
+    import numpy as np
+    frame = np.full(shape, 32, np.uint8)
+    scale = max(0.5, shape[1] / 800)
+    cv2.putText(frame, text, (int(20 * scale), shape[0] // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, (0, 0, 255), max(1, int(2 * scale)))
+    return frame
+
+
+def open_url(url, timeout=5.0):
+    """cv2.VideoCapture whose open and reads give up after `timeout` seconds."""
+    params = []
+    if hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):  # OpenCV >= 4.6
+        ms = int(timeout * 1000)
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, ms]
+    return cv2.VideoCapture(url, cv2.CAP_ANY, params)
+
+
+class StreamSource:
+    """cv2.VideoCapture look-alike that reopens its stream instead of ending."""
+
+    def __init__(self, source, timeout=5.0, backoff=0.5, max_backoff=8.0, poll=0.1, log=print):
+        # source: a URL/device for cv2.VideoCapture, or a callable returning a capture
+        self.source = source
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll = poll
+        self.log = log
+        self.cap = None
+        self.stamp = 0.0          # time.time() of the last frame
+        self.gap = 0.0            # seconds missing before the last frame
+        self.frames = 0
+        self.reopens = 0
+        self.gaps = []            # (time.time() of the hole's start, seconds)
+        self.last_frame = None    # time.monotonic() of the last frame
+        self._delay = 0.0
+        self._retry_at = 0.0
+        self._released = False
+        self._open()
+
+    def _open(self):
+        cap = self.source() if callable(self.source) else open_url(self.source, self.timeout)
+        if cap.isOpened():
+            self.cap = cap
+            return True
+        cap.release()
+        self._lost("cannot open stream")
+        return False
+
+    def _lost(self, why):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self._retry_at = time.monotonic() + self._delay
+        self.log(f"camera: {why}, reopening in {self._delay:.1f} s")
+        self._delay = min(self.max_backoff, max(self.backoff, self._delay * 2))
+
+    @property
+    def healthy(self):
+        """Open and delivering: a frame within the last `timeout` seconds."""
+        return (self.cap is not None and self.last_frame is not None
+                and time.monotonic() - self.last_frame < self.timeout)
+
+    def isOpened(self):
+        return not self._released
+
+    def read(self, image=None):
+        if self._released:
+            return False, None
+        if self.cap is None:
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                time.sleep(min(wait, self.poll))
+                return False, None
+            self.reopens += 1
+            if not self._open():
+                return False, None
+        ok, frame = self.cap.read() if image is None else self.cap.read(image)
+        if not ok or frame is None or frame.size == 0:
+            self._lost("stream lost")
+            return False, None
+        now = time.time()
+        self.gap = now - self.stamp if self.stamp and now - self.stamp > GAP_AFTER else 0.0
+        if self.gap:
+            self.gaps.append((self.stamp, self.gap))
+        self.stamp = now
+        self.last_frame = time.monotonic()
+        self.frames += 1
+        self._delay = 0.0
+        return True, frame
+
+    def release(self):
+        self._released = True
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def stats(self):
+        return {"frames": self.frames, "reopens": self.reopens, "gaps": len(self.gaps),
+                "missing_s": round(sum(g for _, g in self.gaps), 2), "healthy": self.healthy}
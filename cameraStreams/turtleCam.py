@@ -1,11 +1,9 @@
 import cv2
-import os
+from capture import open_camera
+from streamsource import StreamSource
 
 windowName = "turtleCam"
 
-cv2.namedWindow(windowName)
-vc = cv2.VideoCapture("http://10.2.172."+os.getenv('ROS_DOMAIN_ID')+":8080/?action=stream")
-
 
 def rescale_frame(frame, percent=75):
     width = int(frame.shape[1] * percent/ 100)
@@ -14,18 +12,29 @@ def rescale_frame(frame, percent=75):
     return cv2.resize(frame, dim, interpolation =cv2.INTER_AREA)
 
 
-if vc.isOpened(): # try to get the first frame
-    rval, frame = vc.read()
-else:
-    rval = False
-
-while rval:
-    frame = rescale_frame(frame,100)
-    cv2.imshow(windowName, frame)
-    rval, frame = vc.read()
-    key = cv2.waitKey(20)
-    if key == 27: # exit on ESC
-        break
-
-vc.release()
-cv2.destroyWindow(windowName)
+def main():
+    cv2.namedWindow(windowName)
+    # the capture daemon's shared frames when it runs (capture.py), else the
+    # robot itself or the relay when TURTLECAM_URL is set (relay.py); a
+    # dropped stream is reopened (streamsource.py)
+    vc = StreamSource(open_camera)
+    healthy = None
+
+    while True:
+        rval, frame = vc.read()
+        if rval:
+            frame = rescale_frame(frame,100)
+            cv2.imshow(windowName, frame)
+        if vc.healthy != healthy:
+            healthy = vc.healthy
+            cv2.setWindowTitle(windowName, windowName if healthy else windowName + " (no signal)")
+        key = cv2.waitKey(20)
+        if key == 27: # exit on ESC
+            break
+
+    vc.release()
+    cv2.destroyWindow(windowName)
+
+
+if __name__ == "__main__":
+    main()
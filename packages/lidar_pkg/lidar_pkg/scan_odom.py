@@ -0,0 +1,99 @@
+import math
+import time
+
+import rclpy
+# import the ROS2 python libraries
+from rclpy.node import Node
+from rclpy.time import Time
+# import the Odometry module from nav_msgs interface
+from nav_msgs.msg import Odometry
+# import the /scan subscription helper with selectable QoS and scan-age monitor
+from lidar_pkg.scan_qos import create_scan_subscription
+from lidar_pkg.scanmatch import ScanMatcher, ScanOdometry
+
+
+class ScanOdom(Node):
+    # Odometry from the lidar alone: every scan is matched to the previous
+    # one (lidar_pkg/scanmatch.py) and the integrated pose is published on
+    # scan_odom at scan rate, next to the wheel odometry on /odom.
+    #
+    #   ros2 run lidar_pkg scan_odom --ros-args -p qos_mode:=best_effort
+
+    def __init__(self):
+        # Here you have the class constructor
+        super().__init__('scan_odom')
+        self.declare_parameter('frame_id', 'odom')
+        self.declare_parameter('child_frame_id', 'base_scan')
+        self.declare_parameter('report_period', 10.0)
+        self.frame_id = self.get_parameter('frame_id').value
+        self.child_frame_id = self.get_parameter('child_frame_id').value
+        self.odometry = None
+        self.times = []
+        self.iterations = 0
+        # create the publisher object
+        self.publisher_ = self.create_publisher(Odometry, 'scan_odom', 10)
+        # create the subscriber object
+        self.subscriber, self.scan_age = create_scan_subscription(
+            self, self.laser_callback, default_mode='best_effort')
+        report_period = self.get_parameter('report_period').value
+        if report_period > 0:
+            self.create_timer(report_period, self.report)
+
+    def laser_callback(self, msg):
+        start = time.perf_counter()
+        if self.odometry is None or self.odometry.matcher.beams != len(msg.ranges):
+            # buffers are sized for one scan layout, made on the first scan
+            self.odometry = ScanOdometry(ScanMatcher(
+                len(msg.ranges), msg.angle_min, msg.angle_increment,
+                msg.range_min, msg.range_max))
+        stamp = Time.from_msg(msg.header.stamp).nanoseconds / 1e9
+        match = self.odometry.update(msg.ranges, stamp)
+        self.publish(msg.header.stamp)
+        self.times.append(time.perf_counter() - start)
+        self.iterations += match.iterations
+
+    def publish(self, stamp):
+        x, y, theta = self.odometry.pose
+        vx, vy, vtheta = self.odometry.velocity
+        odom = Odometry()
+        odom.header.stamp = stamp
+        odom.header.frame_id = self.frame_id
+        odom.child_frame_id = self.child_frame_id
+        odom.pose.pose.position.x = x
+        odom.pose.pose.position.y = y
+        odom.pose.pose.orientation.z = math.sin(theta / 2.0)
+        odom.pose.pose.orientation.w = math.cos(theta / 2.0)
+        odom.twist.twist.linear.x = vx
+        odom.twist.twist.linear.y = vy
+        odom.twist.twist.angular.z = vtheta
+        self.publisher_.publish(odom)
+
+    def report(self):
+        if not self.times:
+            return
+        ms = sorted(t * 1e3 for t in self.times)
+        self.get_logger().info(
+            '%d scans, match %.2f ms median %.2f ms p95, %.1f iterations, %d not converged'
+            % (len(ms), ms[len(ms) // 2], ms[int(len(ms) * 0.95)],
+               self.iterations / len(ms), self.odometry.failed))
+        self.times, self.iterations = [], 0
+
+
+def main(args=None):
+    # initialize the ROS communication
+    rclpy.init(args=args)
+    # declare the node constructor
+    scan_odom = ScanOdom()
+    try:
+        # pause the program execution, waits for a request to kill the node (ctrl+c)
+        rclpy.spin(scan_odom)
+    except KeyboardInterrupt:
+        pass
+    # Explicity destroy the node
+    scan_odom.destroy_node()
+    # shutdown the ROS communication
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
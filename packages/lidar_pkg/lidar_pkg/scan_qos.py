@@ -0,0 +1,111 @@
+# QoS profiles for /scan subscriptions plus a scan-age monitor.
+#
+# Every node that reads /scan picks one of the modes below through the
+# 'qos_mode' ROS parameter, e.g.
+#   ros2 run lidar_pkg lidar --ros-args -p qos_mode:=logging
+# The monitor compares msg.header.stamp to the time the callback runs, so the
+# logged scan age shows which profile keeps the control path on fresh data.
+from rclpy.qos import DurabilityPolicy, HistoryPolicy, QoSProfile
+from rclpy.qos import ReliabilityPolicy, qos_profile_sensor_data
+from rclpy.time import Time
+# import the LaserScan module from sensor_msgs interface
+from sensor_msgs.msg import LaserScan
+
+SCAN_QOS_MODES = {
+    # control path: best effort and only the newest scan, stale scans are dropped
+    'control': QoSProfile(
+        history=HistoryPolicy.KEEP_LAST,
+        depth=1,
+        reliability=ReliabilityPolicy.BEST_EFFORT,
+        durability=DurabilityPolicy.VOLATILE),
+    # plain best effort with a small queue (the rclpy sensor data preset)
+    'best_effort': qos_profile_sensor_data,
+    # logging: reliable with a deep queue so every scan gets delivered
+    'logging': QoSProfile(
+        history=HistoryPolicy.KEEP_LAST,
+        depth=10,
+        reliability=ReliabilityPolicy.RELIABLE),
+}
+
+
+def scan_qos(mode):
+    # return the QoS profile for one of the SCAN_QOS_MODES
+    try:
+        return SCAN_QOS_MODES[mode]
+    except KeyError:
+        raise ValueError('Unknown qos_mode "%s", expected one of: %s'
+                         % (mode, ', '.join(SCAN_QOS_MODES)))
+
+
+class ScanAgeMonitor:
+
+    def __init__(self, clock, mode=''):
+        # clock of the receiving node, ages are measured against it
+        self.clock = clock
+        self.mode = mode
+        self.last_age = None
+        self.reset()
+
+    def reset(self):
+        # start a new measurement window
+        self.count = 0
+        self.total_age = 0.0
+        self.min_age = float('inf')
+        self.max_age = 0.0
+        self.window_start = self.clock.now().nanoseconds
+
+    def record(self, msg):
+        # age of the scan in seconds: receive time minus the header stamp
+        now = self.clock.now().nanoseconds
+        stamp = Time.from_msg(msg.header.stamp).nanoseconds
+        return self.add((now - stamp) / 1e9)
+
+    def add(self, age):
+        self.last_age = age
+        self.count += 1
+        self.total_age += age
+        self.min_age = min(self.min_age, age)
+        self.max_age = max(self.max_age, age)
+        return age
+
+    @property
+    def mean_age(self):
+        return self.total_age / self.count if self.count else 0.0
+
+    def summary(self):
+        # one log line with the statistics of the current window
+        elapsed = (self.clock.now().nanoseconds - self.window_start) / 1e9
+        if not self.count:
+            return '[%s] no scans in %.1fs' % (self.mode, elapsed)
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        return ('[%s] %d scans (%.1f Hz) age ms: last %.1f mean %.1f '
+                'min %.1f max %.1f' % (
+                    self.mode, self.count, rate, self.last_age * 1e3,
+                    self.mean_age * 1e3, self.min_age * 1e3,
+                    self.max_age * 1e3))
+
+
+def create_scan_subscription(node, callback, default_mode='control',
+                             topic='/scan'):
+    # declare the qos parameters on the node and subscribe to the scan topic
+    # - qos_mode: one of SCAN_QOS_MODES
+    # - scan_age_report_period: seconds between age log lines (0 = off)
+    node.declare_parameter('qos_mode', default_mode)
+    node.declare_parameter('scan_age_report_period', 5.0)
+    mode = node.get_parameter('qos_mode').value
+    period = float(node.get_parameter('scan_age_report_period').value)
+    monitor = ScanAgeMonitor(node.get_clock(), mode)
+
+    def measured_callback(msg):
+        monitor.record(msg)
+        callback(msg)
+
+    subscription = node.create_subscription(
+        LaserScan, topic, measured_callback, scan_qos(mode))
+
+    if period > 0:
+        def report():
+            node.get_logger().info(monitor.summary())
+            monitor.reset()
+        node.create_timer(period, report)
+    return subscription, monitor
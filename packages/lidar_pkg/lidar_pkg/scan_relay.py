@@ -0,0 +1,117 @@
+import time
+
+import rclpy
+# import the ROS2 python libraries
+from rclpy.node import Node
+from rclpy.qos import HistoryPolicy, QoSProfile, ReliabilityPolicy
+# import the LaserScan module from sensor_msgs interface
+from sensor_msgs.msg import LaserScan
+# import the /scan subscription helper with selectable QoS and scan-age monitor
+from lidar_pkg.scan_qos import create_scan_subscription
+from lidar_pkg.scanfilter import laserscan_bytes, ScanFilter
+
+# remote consumers only want the newest scan, a lost one is not resent
+COMPACT_QOS = QoSProfile(history=HistoryPolicy.KEEP_LAST, depth=1,
+                         reliability=ReliabilityPolicy.BEST_EFFORT)
+
+
+class ScanRelay(Node):
+    # Republishes /scan filtered, decimated and at a lower rate on
+    # scan_compact for consumers on Wi-Fi (the dashboard, students on other
+    # ROS_DOMAIN_IDs through a domain bridge): a plain sensor_msgs/LaserScan
+    # with `decimation` times fewer beams and no intensities. Every scan
+    # goes through the filter (the temporal median needs them all), only
+    # publishing is rate limited.
+    #
+    #   ros2 run lidar_pkg scan_relay --ros-args -p decimation:=4 -p rate:=2.0
+
+    def __init__(self):
+        # Here you have the class constructor
+        super().__init__('scan_relay')
+        self.declare_parameter('median', 3)          # beams, odd; 1 = off
+        self.declare_parameter('temporal', 3)        # scans; 1 = off
+        self.declare_parameter('decimation', 4)      # input beams per output beam
+        self.declare_parameter('rate', 2.0)          # Hz; 0 = every scan
+        self.declare_parameter('report_period', 10.0)
+        param = self.get_parameter
+        self.median = param('median').value
+        self.temporal = param('temporal').value
+        self.decimation = param('decimation').value
+        rate = param('rate').value
+        self.period = 1.0 / rate if rate > 0 else 0.0
+        self.filter = None
+        self.next_publish = 0.0
+        self.times = []
+        self.bytes_in = self.bytes_out = 0
+        # create the publisher object
+        self.publisher_ = self.create_publisher(LaserScan, 'scan_compact', COMPACT_QOS)
+        # create the subscriber object
+        self.subscriber, self.scan_age = create_scan_subscription(
+            self, self.laser_callback, default_mode='best_effort')
+        report_period = param('report_period').value
+        if report_period > 0:
+            self.report_period = report_period
+            self.create_timer(report_period, self.report)
+
+    def laser_callback(self, msg):
+        start = time.perf_counter()
+        if self.filter is None or self.filter.beams != len(msg.ranges):
+            # buffers are sized for one scan layout, made on the first scan
+            self.filter = ScanFilter(len(msg.ranges), msg.angle_min, msg.angle_increment,
+                                     msg.range_min, msg.range_max, self.median,
+                                     self.temporal, self.decimation)
+        ranges = self.filter.filter(msg.ranges)
+        self.bytes_in += laserscan_bytes(len(msg.ranges), len(msg.intensities),
+                                         msg.header.frame_id)
+        now = time.monotonic()
+        if now >= self.next_publish:
+            self.next_publish = max(self.next_publish + self.period, now)
+            self.publish(msg, ranges)
+        self.times.append(time.perf_counter() - start)
+
+    def publish(self, msg, ranges):
+        f = self.filter
+        compact = LaserScan()
+        compact.header = msg.header
+        compact.angle_min = f.angle_min
+        compact.angle_max = f.angle_max
+        compact.angle_increment = f.angle_increment
+        compact.time_increment = msg.time_increment * f.decimation
+        compact.scan_time = msg.scan_time
+        compact.range_min = msg.range_min
+        compact.range_max = msg.range_max
+        compact.ranges = ranges.tolist()
+        self.publisher_.publish(compact)
+        self.bytes_out += laserscan_bytes(len(ranges), 0, msg.header.frame_id)
+
+    def report(self):
+        if not self.times:
+            return
+        us = sorted(t * 1e6 for t in self.times)
+        self.get_logger().info(
+            '%d scans, filter %.0f us median %.0f us p95, %.1f kB/s in, %.1f kB/s out (-%.0f%%)'
+            % (len(us), us[len(us) // 2], us[int(len(us) * 0.95)],
+               self.bytes_in / self.report_period / 1e3,
+               self.bytes_out / self.report_period / 1e3,
+               100.0 * (1.0 - self.bytes_out / max(1, self.bytes_in))))
+        self.times, self.bytes_in, self.bytes_out = [], 0, 0
+
+
+def main(args=None):
+    # initialize the ROS communication
+    rclpy.init(args=args)
+    # declare the node constructor
+    scan_relay = ScanRelay()
+    try:
+        # pause the program execution, waits for a request to kill the node (ctrl+c)
+        rclpy.spin(scan_relay)
+    except KeyboardInterrupt:
+        pass
+    # Explicity destroy the node
+    scan_relay.destroy_node()
+    # shutdown the ROS communication
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
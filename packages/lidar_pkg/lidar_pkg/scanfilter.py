@@ -0,0 +1,131 @@
+# LaserScan filtering and decimation for consumers on a slow link (the lab
+# dashboard, students over Wi-Fi), kept free of ROS imports so the relay
+# node, the tests and the offline benchmark share it.
+#
+# Per scan, all NumPy on buffers allocated once:
+#   clean       ranges outside [range_min, range_max], inf and nan become
+#               'no reading' (nan inside, +inf in the output as in REP 117)
+#   median      each beam becomes the median of the valid readings among
+#               its `median` neighbours: spikes and dropouts narrower than
+#               half the window go (and so do objects that narrow)
+#   temporal    then the median of the last `temporal` scans per beam, so a
+#               reading must persist to be published
+#   decimate    every `decimation` beams become one: the nearest valid
+#               reading of the group, so no obstacle disappears
+# The relay republishes the result as a plain sensor_msgs/LaserScan with
+# fewer beams (and without intensities), at a lower rate.
+import math
+
+import numpy as np
+
+
+def laserscan_bytes(beams, intensities=0, frame_id='base_scan'):
+    # serialized (CDR) size of a sensor_msgs/LaserScan, what DDS sends
+    size = 4 + 8                                  # encapsulation, stamp
+    size += 4 + len(frame_id) + 1                 # frame_id
+    size += (-size) % 4                           # align the floats
+    size += 7 * 4                                 # angles, times, range limits
+    return size + 4 + 4 * beams + 4 + 4 * intensities
+
+
+class ScanFilter:
+
+    def __init__(self, beams, angle_min=0.0, angle_increment=None, range_min=0.12,
+                 range_max=3.5, median=3, temporal=3, decimation=4):
+        if median < 1 or median % 2 == 0:
+            raise ValueError('median must be a positive odd number of beams, got %d' % median)
+        if temporal < 1 or decimation < 1:
+            raise ValueError('temporal and decimation must be at least 1')
+        if angle_increment is None:
+            angle_increment = 2.0 * math.pi / beams
+        self.beams = beams
+        self.range_min = range_min
+        self.range_max = range_max
+        self.median = median
+        self.temporal = temporal
+        self.decimation = decimation
+        # a full turn of beams wraps around for the median, a partial one
+        # is padded with 'no reading'
+        self.wraps = beams * angle_increment > 2.0 * math.pi - 1.5 * angle_increment
+        self.out_beams = -(-beams // decimation)
+        # output beam k stands for input beams k*decimation ..
+        # (k+1)*decimation - 1 and sits in the middle of them
+        self.angle_increment = angle_increment * decimation
+        self.angle_min = angle_min + angle_increment * (decimation - 1) / 2.0
+        self.angle_max = self.angle_min + self.angle_increment * (self.out_beams - 1)
+        half = median // 2
+        self._half = half
+        self._padded = np.full(beams + 2 * half, np.nan)
+        self._windows = np.lib.stride_tricks.sliding_window_view(self._padded, median)
+        self._sorted = np.empty((beams, median))
+        self._valid = np.empty((beams, median), bool)
+        self._count = np.empty(beams, np.intp)
+        self._pick = np.empty(beams, np.intp)
+        self._rows = np.arange(beams) * median
+        self._history = np.full((temporal, beams), np.nan)
+        self._history_t = np.empty((beams, temporal))
+        self._valid_t = np.empty((beams, temporal), bool)
+        self._rows_t = np.arange(beams) * temporal
+        self._next = 0
+        self._spatial = np.empty(beams)
+        self._smoothed = np.empty(beams)
+        self._groups = np.full(self.out_beams * decimation, np.nan)
+        self._out = np.empty(self.out_beams, np.float32)
+        self._bad, self._ok = np.empty(beams, bool), np.empty(beams, bool)
+        self._reduced = np.empty(self.out_beams)
+        self._none = np.empty(self.out_beams, bool)
+        self.scans = 0
+
+    def _nan_median(self, windows, sorted_, valid, rows, out):
+        # median of the valid (not nan) values of every row; nan sorts last,
+        # so it is the middle one of the first `count` (the lower one for an
+        # even count); nan where a row has none
+        sorted_[:] = windows
+        sorted_.sort(axis=1)
+        np.logical_not(np.isnan(sorted_, out=valid), out=valid)
+        np.sum(valid, axis=1, out=self._count)
+        np.subtract(self._count, 1, out=self._pick)
+        self._pick //= 2
+        np.maximum(self._pick, 0, out=self._pick)
+        self._pick += rows
+        np.take(sorted_, self._pick, out=out, mode='clip')
+        out[self._count == 0] = np.nan
+
+    def filter(self, ranges):
+        # the filtered, decimated ranges (float32, +inf for no reading). The
+        # array is reused by the next call: copy it to keep it.
+        half, beams = self._half, self.beams
+        clean = self._padded[half:half + beams]
+        clean[:] = ranges
+        bad, ok = self._bad, self._ok
+        np.less(clean, self.range_min, out=bad)
+        np.less_equal(clean, self.range_max, out=ok)     # False for inf and nan
+        np.logical_not(ok, out=ok)
+        bad |= ok
+        clean[bad] = np.nan
+        if half:
+            if self.wraps:
+                self._padded[:half] = clean[-half:]
+                self._padded[-half:] = clean[:half]
+            self._nan_median(self._windows, self._sorted, self._valid, self._rows,
+                             self._spatial)
+        else:
+            self._spatial[:] = clean
+        # temporal median over the last scans
+        self._history[self._next] = self._spatial
+        self._next = (self._next + 1) % self.temporal
+        self.scans += 1
+        if self.temporal > 1:
+            self._nan_median(self._history.T, self._history_t, self._valid_t, self._rows_t,
+                             self._smoothed)
+        else:
+            self._smoothed[:] = self._spatial
+        # nearest reading of every group of beams (fmin skips nan)
+        self._groups[:beams] = self._smoothed
+        np.fmin.reduce(self._groups.reshape(self.out_beams, self.decimation), axis=1,
+                       out=self._reduced)
+        np.isnan(self._reduced, out=self._none)
+        self._reduced[self._none] = np.inf
+        out = self._out
+        out[:] = self._reduced
+        return out
@@ -0,0 +1,308 @@
+# Scan-to-scan matching of consecutive LaserScans (point-to-line ICP), kept
+# free of ROS imports so the node, the tests and the offline benchmark share
+# it.
+#
+# Every scan becomes points in the scanner frame. The next scan is matched
+# to it: each of its points is moved by the current motion estimate,
+# projected back to a beam index of the previous scan and paired with the
+# nearest previous point within `window` (radians) of that beam, only
+# NARROW beams either side once the estimate has settled. A Gauss-Newton step
+# then minimises the distances of the points to the lines through their
+# partners (normals from the neighbouring beams), with Huber weights against
+# points that see something the other scan does not. The motion of the
+# previous step is the first guess.
+#
+# All arrays have the fixed size of a scan (invalid beams get weight 0) and
+# are allocated once in the constructor: a scan only fills them in place.
+import math
+from collections import namedtuple
+
+import numpy as np
+
+NARROW = 3        # beams either side once the estimate has settled
+SETTLED = 0.005   # m, last step below this (and below a beam in rotation)
+
+Match = namedtuple('Match', ['dx', 'dy', 'dtheta', 'iterations', 'converged', 'rms', 'pairs'])
+
+ROOM = [
+    # a 5 x 4 m room with two boxes and a slanted cabinet (render_scan)
+    ((-2.5, -2.0), (2.5, -2.0)), ((2.5, -2.0), (2.5, 2.0)),
+    ((2.5, 2.0), (-2.5, 2.0)), ((-2.5, 2.0), (-2.5, -2.0)),
+    ((0.8, 0.5), (1.3, 0.5)), ((1.3, 0.5), (1.3, 1.1)),
+    ((1.3, 1.1), (0.8, 1.1)), ((0.8, 1.1), (0.8, 0.5)),
+    ((-1.5, -1.2), (-0.9, -1.2)), ((-0.9, -1.2), (-0.9, -0.8)),
+    ((-0.9, -0.8), (-1.5, -0.8)), ((-1.5, -0.8), (-1.5, -1.2)),
+    ((-2.5, 1.0), (-1.6, 2.0)),
+]
+
+
+class ScanMatcher:
+
+    def __init__(self, beams, angle_min=0.0, angle_increment=None, range_min=0.12,
+                 range_max=3.5, window=0.1, max_pair_distance=0.3, huber=0.02,
+                 max_iterations=30, tolerance=1e-4, max_gap=0.25):
+        # window: how far (radians) a point may have moved around the
+        # scanner between scans; max_gap: neighbouring beams further apart
+        # than this are not on one surface (no normal)
+        if angle_increment is None:
+            angle_increment = 2.0 * math.pi / beams
+        self.beams = beams
+        self.angle_min = angle_min
+        self.angle_increment = angle_increment
+        self.range_min = range_min
+        self.range_max = range_max
+        self.max_pair_distance = max_pair_distance
+        self.huber = huber
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.max_gap = max_gap
+        # a full turn of beams wraps around, a partial one is clipped
+        self.wraps = beams * angle_increment > 2.0 * math.pi - 1.5 * angle_increment
+        # the first iterations search `window`, once the estimate settles
+        # NARROW beams around the projected bearing are enough
+        width = 2 * max(NARROW, int(math.ceil(window / angle_increment))) + 1
+        angles = angle_min + angle_increment * np.arange(beams)
+        n = beams
+        self._dir = np.stack([np.cos(angles), np.sin(angles)])
+        # previous scan: points, normals, usable; current scan: points, usable
+        self._ref, self._normal = np.zeros((2, n)), np.zeros((2, n))
+        self._ref_ok = np.zeros(n, bool)
+        self._cur, self._cur_ok = np.zeros((2, n)), np.zeros(n, bool)
+        self._penalty = np.zeros(n)
+        self._input, self._range = np.empty(n), np.empty(n)
+        self._has_ref = False
+        # per iteration
+        self._offsets, self._rows = {}, {}
+        for w in (width, 2 * NARROW + 1):
+            self._offsets[w] = np.arange(w) - w // 2
+            self._rows[w] = np.arange(n) * w
+        self.width = width
+        self._moved = np.empty((2, n))
+        self._beam = np.empty(n)
+        self._index = np.empty(n, np.intp)
+        self._cand = np.empty(n * width, np.intp)
+        self._dist = np.empty(n * width)
+        self._dist_y = np.empty(n * width)
+        self._best = np.empty(n, np.intp)
+        self._pair = np.empty(n, np.intp)
+        self._pair_dist = np.empty(n)
+        self._ok = np.empty(n, bool)
+        self._ok2 = np.empty(n, bool)
+        self._q = np.empty((2, n))
+        self._jac = np.empty((3, n))     # d residual / d (x, y, theta)
+        self._res = np.empty(n)
+        self._weight = np.empty(n)
+        self._wjac = np.empty((3, n))
+        self._tmp = np.empty(n)
+        self.last = (0.0, 0.0, 0.0)
+
+    def _points(self, ranges, points, ok):
+        r = self._input
+        r[:] = ranges
+        np.greater_equal(r, self.range_min, out=ok)
+        np.less_equal(r, self.range_max, out=self._ok2)    # also drops inf and nan
+        ok &= self._ok2
+        self._range.fill(0.0)
+        np.copyto(self._range, r, where=ok)
+        np.multiply(self._dir, self._range, out=points)
+
+    def set_reference(self, ranges):
+        # the scan the next one is matched to
+        self._points(ranges, self._ref, self._ref_ok)
+        self._finish_reference()
+        self._has_ref = True
+
+    def _finish_reference(self):
+        # normals of the reference points: the tangent from the previous to
+        # the next beam's point, turned by 90 degrees. Points without both
+        # neighbours on the same surface get no normal and are not paired.
+        ref, normal, ok, ok2, length = (self._ref, self._normal, self._ref_ok, self._ok2,
+                                        self._tmp)
+        np.subtract(ref[:, 2:], ref[:, :-2], out=normal[:, 1:-1])
+        np.subtract(ref[:, 1], ref[:, -1], out=normal[:, 0])
+        np.subtract(ref[:, 0], ref[:, -2], out=normal[:, -1])
+        np.logical_and(ok[2:], ok[:-2], out=ok2[1:-1])
+        ok2[0], ok2[-1] = ok[1] and ok[-1], ok[0] and ok[-2]
+        if not self.wraps:
+            ok2[0] = ok2[-1] = False
+        ok &= ok2
+        np.hypot(normal[0], normal[1], out=length)
+        np.greater(length, 1e-9, out=ok2)
+        ok &= ok2
+        np.less(length, 2.0 * self.max_gap, out=ok2)
+        ok &= ok2
+        length[~ok] = 1.0
+        normal /= length
+        normal[0], normal[1] = -normal[1], normal[0].copy()
+        # unusable reference points are never the nearest
+        np.logical_not(ok, out=ok2)
+        np.multiply(ok2, 1e12, out=self._penalty)
+
+    def match(self, ranges, guess=None):
+        # motion (dx, dy, dtheta) of the scanner from the reference scan to
+        # this one, in the reference scan's frame; this scan becomes the
+        # reference of the next call. The first call only stores the scan.
+        if not self._has_ref:
+            self.set_reference(ranges)
+            return Match(0.0, 0.0, 0.0, 0, True, 0.0, 0)
+        cur, cur_ok = self._cur, self._cur_ok
+        self._points(ranges, cur, cur_ok)
+        x, y, theta = self.last if guess is None else guess
+        moved, jac, res, weight = self._moved, self._jac, self._res, self._weight
+        converged, rms, pairs, previous = False, 0.0, 0, None
+        width = self.width
+        for iteration in range(1, self.max_iterations + 1):
+            c, s = math.cos(theta), math.sin(theta)
+            # current points in the reference frame
+            np.matmul(((c, -s), (s, c)), cur, out=moved)
+            moved[0] += x
+            moved[1] += y
+            pairs = self._associate(cur_ok, width)
+            if pairs < 3:
+                break
+            # residual: distance to the partner's line, along its normal
+            q, tmp = self._q, self._tmp
+            np.subtract(moved, q, out=q)
+            np.multiply(jac[0], q[0], out=res)
+            np.multiply(jac[1], q[1], out=tmp)
+            res += tmp
+            # d residual / d theta = normal . (rotated point turned by 90 deg)
+            np.subtract(moved[0], x, out=tmp)
+            np.multiply(jac[1], tmp, out=jac[2])
+            np.subtract(moved[1], y, out=tmp)
+            tmp *= jac[0]
+            jac[2] -= tmp
+            # Huber weights, 0 for unpaired points
+            np.abs(res, out=weight)
+            np.maximum(weight, self.huber, out=weight)
+            np.divide(self.huber, weight, out=weight)
+            weight *= self._ok
+            np.multiply(jac, weight, out=self._wjac)
+            hessian = self._wjac @ jac.T
+            gradient = self._wjac @ res
+            hessian += np.eye(3) * (1e-9 * np.trace(hessian) + 1e-12)
+            step = np.linalg.solve(hessian, -gradient)
+            if previous is not None and np.abs(step + previous).sum() < self.tolerance:
+                # flipping between two pairings: settle halfway
+                x, y, theta = x + step[0] / 2, y + step[1] / 2, theta + step[2] / 2
+                converged = True
+                break
+            previous = step
+            x, y, theta = x + step[0], y + step[1], theta + step[2]
+            np.multiply(res, res, out=tmp)
+            rms = math.sqrt(float(weight @ tmp) / max(1e-12, float(weight.sum())))
+            moved_by = abs(step[0]) + abs(step[1])
+            if moved_by < self.tolerance and abs(step[2]) < self.tolerance:
+                converged = True
+                break
+            if moved_by < SETTLED and abs(step[2]) < self.angle_increment:
+                width = 2 * NARROW + 1
+        # the current scan becomes the reference: swap the buffers, no copies
+        self._ref, self._cur = self._cur, self._ref
+        self._ref_ok, self._cur_ok = self._cur_ok, self._ref_ok
+        self._finish_reference()
+        if pairs < 3:
+            # nothing to match (e.g. all beams out of range): assume the
+            # robot kept moving as before
+            return Match(*self.last, iteration, False, 0.0, pairs)
+        self.last = (x, y, theta)
+        return Match(x, y, theta, iteration, converged, rms, pairs)
+
+    def _associate(self, cur_ok, width):
+        # pair every moved point with the nearest reference point among the
+        # `width` beams around its bearing; fills _q (partner), _jac[:2] (its
+        # normal) and _ok, returns the number of pairs
+        moved, beam, index = self._moved, self._beam, self._index
+        shape = (self.beams, width)
+        cand = self._cand[:shape[0] * width].reshape(shape)
+        dist = self._dist[:shape[0] * width].reshape(shape)
+        dist_y = self._dist_y[:shape[0] * width].reshape(shape)
+        np.arctan2(moved[1], moved[0], out=beam)
+        beam -= self.angle_min
+        beam /= self.angle_increment
+        np.rint(beam, out=beam)
+        np.copyto(index, beam, casting='unsafe')
+        np.add(index[:, None], self._offsets[width], out=cand)
+        if self.wraps:
+            np.mod(cand, self.beams, out=cand)
+        else:
+            np.clip(cand, 0, self.beams - 1, out=cand)
+        ref = self._ref
+        # (mode='clip': the indices are valid, and 'raise' copies through a
+        # temporary)
+        np.take(ref[0], cand, out=dist, mode='clip')
+        dist -= moved[0][:, None]
+        np.square(dist, out=dist)
+        np.take(ref[1], cand, out=dist_y, mode='clip')
+        dist_y -= moved[1][:, None]
+        np.square(dist_y, out=dist_y)
+        dist += dist_y
+        np.take(self._penalty, cand, out=dist_y, mode='clip')
+        dist += dist_y
+        np.argmin(dist, axis=1, out=self._best)
+        np.add(self._rows[width], self._best, out=self._best)
+        pair, pair_dist, ok = self._pair, self._pair_dist, self._ok
+        np.take(cand, self._best, out=pair, mode='clip')
+        np.take(dist, self._best, out=pair_dist, mode='clip')
+        np.less(pair_dist, self.max_pair_distance ** 2, out=ok)
+        ok &= cur_ok
+        np.take(ref[0], pair, out=self._q[0], mode='clip')
+        np.take(ref[1], pair, out=self._q[1], mode='clip')
+        np.take(self._normal[0], pair, out=self._jac[0], mode='clip')
+        np.take(self._normal[1], pair, out=self._jac[1], mode='clip')
+        return int(np.count_nonzero(ok))
+
+
+def compose(pose, motion):
+    # pose (x, y, theta) moved by motion (dx, dy, dtheta) given in its frame
+    x, y, theta = pose
+    dx, dy, dtheta = motion
+    c, s = math.cos(theta), math.sin(theta)
+    return (x + c * dx - s * dy, y + s * dx + c * dy,
+            math.atan2(math.sin(theta + dtheta), math.cos(theta + dtheta)))
+
+
+class ScanOdometry:
+    # pose of the scanner integrated from scan to scan matches, and its
+    # velocity from the last match
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.pose = (0.0, 0.0, 0.0)
+        self.velocity = (0.0, 0.0, 0.0)     # in the scanner frame
+        self.stamp = None
+        self.failed = 0
+
+    def update(self, ranges, stamp):
+        match = self.matcher.match(ranges)
+        if self.stamp is not None:
+            dt = stamp - self.stamp
+            if not match.converged:
+                self.failed += 1
+            self.pose = compose(self.pose, match[:3])
+            if dt > 0:
+                self.velocity = (match.dx / dt, match.dy / dt, match.dtheta / dt)
+        self.stamp = stamp
+        return match
+
+
+def render_scan(pose, beams=360, walls=ROOM, range_max=3.5, noise=0.0, seed=0):
+    # synthetic LaserScan ranges (angle_min 0, full turn) of a scanner at
+    # pose (x, y, theta) among wall segments; inf where nothing is in range
+    rng = np.random.default_rng(seed)
+    x, y, theta = pose
+    angles = theta + 2.0 * math.pi * np.arange(beams) / beams
+    d = np.stack([np.cos(angles), np.sin(angles)], axis=1)[:, None, :]
+    a = np.array([w[0] for w in walls], dtype=np.float64)[None]
+    e = np.array([w[1] for w in walls], dtype=np.float64)[None] - a
+    o = a - (x, y)
+    cross = d[..., 0] * e[..., 1] - d[..., 1] * e[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (o[..., 0] * e[..., 1] - o[..., 1] * e[..., 0]) / cross
+        u = (o[..., 0] * d[..., 1] - o[..., 1] * d[..., 0]) / cross
+    hit = (np.abs(cross) > 1e-12) & (t > 0) & (u >= 0) & (u <= 1)
+    ranges = np.where(hit, t, np.inf).min(axis=1)
+    if noise:
+        ranges = ranges + rng.normal(0.0, noise, beams)
+    ranges[ranges > range_max] = np.inf
+    return ranges
@@ -23,7 +23,9 @@ setup(
     tests_require=['pytest'],
     entry_points={
         'console_scripts': [
-            'lidar = lidar_pkg.lidar:main'
+            'lidar = lidar_pkg.lidar:main',
+            'scan_odom = lidar_pkg.scan_odom:main',
+            'scan_relay = lidar_pkg.scan_relay:main'
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,67 @@
+import time
+
+from lidar_pkg.scan_qos import create_scan_subscription, scan_qos
+from lidar_pkg.scan_qos import SCAN_QOS_MODES
+import pytest
+import rclpy
+from rclpy.duration import Duration
+from rclpy.executors import SingleThreadedExecutor
+from rclpy.node import Node
+from rclpy.parameter import Parameter
+from sensor_msgs.msg import LaserScan
+
+
+@pytest.fixture
+def ros_context():
+    rclpy.init()
+    yield
+    rclpy.shutdown()
+
+
+def publish_until_received(mode, received, count=5, stamp_offset=0.0):
+    # run a local /scan publisher and the subscriber in the same process
+    sub_node = Node('scan_qos_sub', parameter_overrides=[
+        Parameter('qos_mode', Parameter.Type.STRING, mode),
+        Parameter('scan_age_report_period', Parameter.Type.DOUBLE, 0.0)])
+    _, monitor = create_scan_subscription(sub_node, received.append)
+    pub_node = Node('scan_qos_pub')
+    publisher = pub_node.create_publisher(LaserScan, '/scan', scan_qos(mode))
+    executor = SingleThreadedExecutor()
+    executor.add_node(sub_node)
+    executor.add_node(pub_node)
+
+    deadline = time.monotonic() + 10.0
+    while len(received) < count and time.monotonic() < deadline:
+        msg = LaserScan()
+        stamp = pub_node.get_clock().now() - Duration(seconds=stamp_offset)
+        msg.header.stamp = stamp.to_msg()
+        msg.ranges = [1.0] * 360
+        publisher.publish(msg)
+        executor.spin_once(timeout_sec=0.05)
+
+    executor.shutdown()
+    sub_node.destroy_node()
+    pub_node.destroy_node()
+    return monitor
+
+
+@pytest.mark.parametrize('mode', sorted(SCAN_QOS_MODES))
+def test_scan_age_from_local_publisher(ros_context, mode):
+    received = []
+    monitor = publish_until_received(mode, received)
+    assert received, 'no scans received with qos_mode %s' % mode
+    assert monitor.count == len(received)
+    assert 0.0 <= monitor.min_age <= monitor.mean_age <= monitor.max_age
+    assert monitor.max_age < 1.0
+
+
+def test_stale_stamp_shows_up_as_scan_age(ros_context):
+    received = []
+    monitor = publish_until_received('logging', received, stamp_offset=2.0)
+    assert received
+    assert monitor.min_age >= 2.0
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        scan_qos('fastest')
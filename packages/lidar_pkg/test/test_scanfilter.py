@@ -0,0 +1,73 @@
+import math
+
+from lidar_pkg.scanfilter import laserscan_bytes, ScanFilter
+import numpy as np
+import pytest
+
+
+def wall_scan(beams=360, distance=1.0):
+    return np.full(beams, distance)
+
+
+def test_spikes_and_invalid_ranges_are_cleaned():
+    scan = wall_scan()
+    scan[[10, 50]] = [3.0, 0.2]            # single-beam spikes
+    scan[[20, 21]] = [np.inf, np.nan]
+    scan[30] = 0.01                        # below range_min
+    f = ScanFilter(360, median=3, temporal=1, decimation=1)
+    out = f.filter(scan)
+    assert out.dtype == np.float32 and out.shape == (360,)
+    assert np.all(out == pytest.approx(1.0))
+
+
+def test_objects_survive_and_decimation_keeps_the_nearest():
+    scan = wall_scan()
+    scan[100:103] = 0.5                    # 3 beams wide
+    f = ScanFilter(360, decimation=4)
+    for _ in range(3):
+        out = f.filter(scan)
+    assert out.shape == (90,)
+    assert out[25] == pytest.approx(0.5)   # beams 100..103
+    assert out[24] == pytest.approx(1.0) and out[26] == pytest.approx(1.0)
+    assert f.angle_increment == pytest.approx(math.radians(4))
+    assert f.angle_min == pytest.approx(math.radians(1.5))
+
+
+def test_no_reading_is_inf_and_median_wraps_around():
+    scan = wall_scan()
+    scan[:12] = np.inf
+    scan[-1] = 0.7
+    f = ScanFilter(360, median=3, temporal=1, decimation=4)
+    out = f.filter(scan)
+    assert np.isinf(out[1])                # beams 4..7: nothing valid
+    assert out[0] == pytest.approx(0.7)    # beam 0 = median(0.7, inf, inf) of valid
+    assert out[-1] == pytest.approx(0.7)
+
+
+def test_temporal_median_needs_a_reading_to_persist():
+    f = ScanFilter(360, median=1, temporal=3, decimation=1)
+    f.filter(wall_scan())
+    f.filter(wall_scan())
+    flash = wall_scan()
+    flash[40] = 0.3
+    assert f.filter(flash)[40] == pytest.approx(1.0)
+    assert f.filter(flash)[40] == pytest.approx(0.3)
+
+
+def test_buffers_are_reused():
+    f = ScanFilter(1440)
+    first = f.filter(wall_scan(1440))
+    assert f.filter(wall_scan(1440, 2.0)) is first
+
+
+def test_bad_parameters():
+    with pytest.raises(ValueError):
+        ScanFilter(360, median=4)
+    with pytest.raises(ValueError):
+        ScanFilter(360, decimation=0)
+
+
+def test_message_size():
+    # TurtleBot3 LDS: 360 ranges and 360 intensities
+    assert laserscan_bytes(360, 360) == 2944
+    assert laserscan_bytes(90) == 424
@@ -0,0 +1,72 @@
+import math
+
+from lidar_pkg.scanmatch import compose, render_scan, ScanMatcher, ScanOdometry
+import numpy as np
+import pytest
+
+
+def circle(k, step=0.04, radius=0.6):
+    # poses along a circle through the ROOM, `step` metres apart
+    a = k * step / radius
+    return (radius * math.cos(a), radius * math.sin(a), a + math.pi / 2)
+
+
+def relative(a, b):
+    # motion from pose a to pose b, in the frame of a
+    c, s = math.cos(a[2]), math.sin(a[2])
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    return (c * dx + s * dy, -s * dx + c * dy, b[2] - a[2])
+
+
+@pytest.mark.parametrize('beams', [360, 1440])
+def test_known_motion_is_recovered(beams):
+    matcher = ScanMatcher(beams)
+    start = (0.3, -0.2, 0.5)
+    matcher.match(render_scan(start, beams, noise=0.005, seed=0))
+    for motion in [(0.05, 0.0, 0.0), (0.04, 0.01, 0.1), (0.0, 0.0, -0.2), (0.08, -0.02, 0.05)]:
+        end = compose(start, motion)
+        match = matcher.match(render_scan(end, beams, noise=0.005, seed=1), guess=(0, 0, 0))
+        assert match.converged
+        assert match.dx == pytest.approx(motion[0], abs=0.005)
+        assert match.dy == pytest.approx(motion[1], abs=0.005)
+        assert match.dtheta == pytest.approx(motion[2], abs=math.radians(0.3))
+        matcher.set_reference(render_scan(start, beams, noise=0.005, seed=0))
+
+
+def test_odometry_follows_a_circle_and_reuses_its_buffers():
+    odometry = ScanOdometry(ScanMatcher(360))
+    buffers = [id(v) for v in vars(odometry.matcher).values() if isinstance(v, np.ndarray)]
+    for k in range(60):
+        odometry.update(render_scan(circle(k), noise=0.01, seed=k), k * 0.2)
+    truth = relative(circle(0), circle(59))
+    assert odometry.pose[0] == pytest.approx(truth[0], abs=0.05)
+    assert odometry.pose[1] == pytest.approx(truth[1], abs=0.05)
+    turn = math.atan2(math.sin(odometry.pose[2] - truth[2]), math.cos(odometry.pose[2] - truth[2]))
+    assert turn == pytest.approx(0.0, abs=math.radians(2))
+    assert odometry.velocity[0] == pytest.approx(0.04 / 0.2, abs=0.02)
+    assert odometry.failed == 0
+    after = [id(v) for v in vars(odometry.matcher).values() if isinstance(v, np.ndarray)]
+    assert sorted(after) == sorted(buffers)
+
+
+def test_empty_scan_keeps_the_last_motion():
+    matcher = ScanMatcher(360)
+    matcher.match(render_scan(circle(0)))
+    moved = matcher.match(render_scan(circle(1)))
+    blind = matcher.match(np.full(360, np.inf))
+    assert not blind.converged and blind.pairs == 0
+    assert blind[:3] == pytest.approx(moved[:3])
+
+
+def half_scan(pose):
+    # a 180 degree scanner, 1 degree beams from -90 to 90 degrees
+    return np.roll(render_scan(pose, 720), 180)[:362:2]
+
+
+def test_partial_scan_does_not_wrap():
+    matcher = ScanMatcher(181, -math.pi / 2, math.pi / 180)
+    assert not matcher.wraps
+    matcher.match(half_scan((0.0, 0.0, 0.0)))
+    match = matcher.match(half_scan((0.05, 0.0, 0.02)), guess=(0, 0, 0))
+    assert match.dx == pytest.approx(0.05, abs=0.005)
+    assert match.dtheta == pytest.approx(0.02, abs=math.radians(0.3))
@@ -0,0 +1,11 @@
+from launch import LaunchDescription
+from launch_ros.actions import Node
+
+
+def generate_launch_description():
+    return LaunchDescription([
+        Node(
+            package='linefollow_pkg',
+            executable='linefollow',
+            output='screen'),
+    ])
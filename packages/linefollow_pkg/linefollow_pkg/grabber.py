@@ -0,0 +1,90 @@
+# Low-latency camera grabber: a thread reads the stream as fast as it comes
+# and keeps only the newest frame, so whoever processes frames always gets
+# the current one instead of working through OpenCV's and the socket's
+# backlog. Frames the consumer was too slow for are counted as dropped.
+# A failed or timed-out read reopens the stream: at once the first time,
+# then with exponential backoff.
+import os
+import threading
+import time
+
+import cv2
+
+
+def robot_url():
+    # mjpg-streamer on the TurtleBot of this ROS_DOMAIN_ID, as in turtleCam.py
+    return 'http://10.2.172.' + os.getenv('ROS_DOMAIN_ID', '0') + ':8080/?action=stream'
+
+
+def open_stream(url, timeout=2.0):
+    params = []
+    if hasattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC'):
+        ms = int(timeout * 1000)
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, ms]
+    cap = cv2.VideoCapture(url, cv2.CAP_ANY, params)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class LatestFrameGrabber:
+
+    def __init__(self, url, timeout=2.0, backoff=0.5, max_backoff=4.0, log=print):
+        self.url = url
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.log = log
+        self.seq = 0
+        self.frame = None
+        self.stamp = 0.0          # time.monotonic() when the frame arrived
+        self.dropped = 0
+        self.reopens = 0
+        self._taken = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.is_set():
+            cap = open_stream(self.url, self.timeout)
+            while cap.isOpened() and not self._stop.is_set():
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                delay = 0.0
+                with self._cond:
+                    if self.seq > self._taken:
+                        self.dropped += 1
+                    self.seq += 1
+                    self.frame = frame
+                    self.stamp = time.monotonic()
+                    self._cond.notify_all()
+            cap.release()
+            if self._stop.is_set():
+                return
+            self.reopens += 1
+            self.log('camera stream lost, reopening in %.1f s' % delay)
+            self._stop.wait(delay)
+            delay = min(self.max_backoff, max(self.backoff, delay * 2))
+
+    def next(self, timeout=1.0):
+        # (seq, arrival time, frame) of a frame not returned before, or None
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > self._taken or self._stop.is_set(), timeout)
+            if self.seq <= self._taken:
+                return None
+            self._taken = self.seq
+            return self.seq, self.stamp, self.frame
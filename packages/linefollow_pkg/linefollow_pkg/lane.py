@@ -0,0 +1,160 @@
+# Floor line / lane detection and steering, kept free of ROS imports so the
+# node, the tests and the offline benchmark share it.
+#
+# Only the bottom `roi` part of the frame is looked at, resized to a fixed
+# SMALL grid, so the cost per frame hardly depends on the camera resolution
+# (only the resize does; `stride` skips pixels of big frames before it). On
+# that grid the line pixels are found with Otsu's threshold, every row gets
+# the column centroid of its line pixels and a straight line x = a*y + b is
+# fitted through the centroids (least squares, all NumPy):
+#   offset  where the line crosses the bottom edge, -1 (left) .. 1 (right)
+#   angle   its direction in radians, positive when it bends to the right
+# With two lane markings in view the centroid of both rows is the lane
+# centre, so the same fit follows a lane (as long as both stay in view).
+import math
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+
+SMALL = (160, 48)      # width, height of the detection grid
+MIN_CONTRAST = 40      # gray levels between line and floor
+MIN_ROWS = 6           # rows with line pixels needed for a fit
+MAX_FILL = 0.5         # a 'line' covering more of a row than this is the floor
+
+Detection = namedtuple('Detection', ['found', 'offset', 'angle', 'rows'])
+LOST = Detection(False, 0.0, 0.0, 0)
+
+
+class LineDetector:
+
+    def __init__(self, line='dark', roi=0.4, size=SMALL, min_contrast=MIN_CONTRAST, stride=1):
+        # line: 'dark' (tape on a light floor) or 'light'
+        if line not in ('dark', 'light'):
+            raise ValueError('line must be "dark" or "light", got "%s"' % line)
+        self.line = line
+        self.roi = roi
+        self.size = size
+        self.min_contrast = min_contrast
+        self.stride = stride
+        width, height = size
+        self._cols = np.arange(width, dtype=np.float32)
+        self._rows = np.arange(height, dtype=np.float32)
+
+    def detect(self, frame):
+        h, w = frame.shape[:2]
+        top = int(h * (1.0 - self.roi))
+        roi = frame[top::self.stride, ::self.stride]
+        small = cv2.resize(roi, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        mode = cv2.THRESH_BINARY_INV if self.line == 'dark' else cv2.THRESH_BINARY
+        _, mask = cv2.threshold(small, 0, 1, mode | cv2.THRESH_OTSU)
+        line = mask.astype(bool)
+        if not line.any() or line.all():
+            return LOST
+        contrast = abs(float(small[line].mean()) - float(small[~line].mean()))
+        if contrast < self.min_contrast:
+            return LOST
+        counts = mask.sum(axis=1, dtype=np.float32)
+        valid = (counts > 0) & (counts <= MAX_FILL * self.size[0])
+        if np.count_nonzero(valid) < MIN_ROWS:
+            return LOST
+        centroids = (mask[valid] @ self._cols) / counts[valid]
+        a, b = np.polyfit(self._rows[valid], centroids, 1)
+        width, height = self.size
+        bottom = a * (height - 1) + b
+        offset = (bottom - (width - 1) / 2) / ((width - 1) / 2)
+        # a is in grid pixels; undo the different x and y scale of the resize
+        sx, sy = w / width, (h - top) / height
+        angle = math.atan(-a * sx / sy)
+        offset = float(np.clip(offset, -1.0, 1.0))
+        return Detection(True, offset, angle, int(np.count_nonzero(valid)))
+
+
+class Steering:
+
+    def __init__(self, speed=0.1, kp=1.2, ka=0.8, max_turn=1.5, lost_timeout=0.5):
+        self.speed = speed
+        self.kp = kp
+        self.ka = ka
+        self.max_turn = max_turn
+        self.lost_timeout = lost_timeout
+        self.last_seen = None
+        self.last = (0.0, 0.0)
+
+    def update(self, detection, now):
+        # (linear.x, angular.z) for one detection at time `now` (seconds)
+        if not detection.found:
+            if self.last_seen is None or now - self.last_seen > self.lost_timeout:
+                self.last = (0.0, 0.0)
+            else:
+                # keep turning the way we were, slowly, to find it again
+                self.last = (self.speed * 0.3, self.last[1])
+            return self.last
+        self.last_seen = now
+        # line to the right (offset > 0) or bending right: turn right (negative z)
+        turn = -(self.kp * detection.offset + self.ka * detection.angle)
+        turn = max(-self.max_turn, min(self.max_turn, turn))
+        speed = self.speed * max(0.3, 1.0 - abs(detection.offset))
+        self.last = (speed, turn)
+        return self.last
+
+
+class StrideControl:
+    # Keeps the detector's time per frame under `budget` seconds by changing
+    # its stride, on the p95 of the last `window` frames so a single slow
+    # frame (the first one, a GC pause, a reconnect) changes nothing. Up
+    # when the p95 is over budget; down when the p95 scaled to one stride
+    # less (the pixels grow with stride squared) would still be under
+    # `low` times the budget. Every change starts a new window.
+
+    def __init__(self, budget, stride=1, max_stride=8, window=20, low=0.7):
+        self.budget = budget
+        self.stride = stride
+        self.max_stride = max_stride
+        self.low = low
+        self.times = deque(maxlen=window)
+        self.last_p95 = None
+
+    def p95(self):
+        times = sorted(self.times)
+        return times[int((len(times) - 1) * 0.95)]
+
+    def update(self, seconds):
+        # add one frame time; returns the new stride when it changed, else None
+        self.times.append(seconds)
+        if len(self.times) < self.times.maxlen:
+            return None
+        p95 = self.last_p95 = self.p95()
+        stride = self.stride
+        if p95 > self.budget and stride < self.max_stride:
+            stride += 1
+        elif stride > 1 and p95 * (stride / (stride - 1)) ** 2 < self.low * self.budget:
+            stride -= 1
+        else:
+            return None
+        self.stride = stride
+        self.times.clear()
+        return stride
+
+
+def render_line(offset, angle, width=640, height=480, roi=0.4, thickness=0.06, lane=False,
+                noise=0, seed=0):
+    # synthetic camera frame (BGR) of a dark line on a light floor whose
+    # bottom crossing and direction are `offset` and `angle` as LineDetector
+    # reports them; lane=True draws two markings around that centre instead
+    rng = np.random.default_rng(seed)
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = np.linspace(170, 210, height, dtype=np.uint8)[:, None, None]
+    top = int(height * (1.0 - roi))
+    x0 = (offset + 1.0) * (width - 1) / 2
+    dx = math.tan(angle) * (height - 1 - top)
+    half = 0.25 * width if lane else 0.0
+    for shift in ((-half, half) if lane else (0.0,)):
+        bottom = (int(round(x0 + shift)), height - 1)
+        far = (int(round(x0 + shift + dx * height / (height - top))), 0)
+        cv2.line(frame, bottom, far, (40, 40, 40), max(1, int(thickness * width)))
+    if noise:
+        frame = cv2.add(frame, rng.integers(0, noise, frame.shape, dtype=np.uint8))
+    return frame
@@ -0,0 +1,124 @@
+import threading
+import time
+
+# import the ROS2 python libraries
+import rclpy
+from rclpy.node import Node
+# import the Twist module from geometry_msgs interface
+from geometry_msgs.msg import Twist
+
+from linefollow_pkg.grabber import LatestFrameGrabber, robot_url
+from linefollow_pkg.lane import LineDetector, Steering, StrideControl
+
+
+class LineFollow(Node):
+    # Follows a floor line (or lane) seen by the TurtleBot camera: every new
+    # frame is detected and answered with one cmd_vel, from a worker thread
+    # that always takes the newest frame (frames it was too slow for are
+    # skipped, never queued). When processing takes longer than
+    # frame_budget_ms (p95 over the last frames) the detector skips more
+    # pixels (stride), and goes back to fewer once frames are well under
+    # budget again, so the time per frame stays bounded without giving up
+    # resolution for good; without frames the robot is stopped.
+    #
+    #   ros2 run linefollow_pkg linefollow --ros-args -p line:=light -p speed:=0.08
+
+    def __init__(self):
+        super().__init__('linefollow')
+        self.declare_parameter('stream_url', robot_url())
+        self.declare_parameter('line', 'dark')
+        self.declare_parameter('roi', 0.4)
+        self.declare_parameter('speed', 0.1)
+        self.declare_parameter('kp', 1.2)
+        self.declare_parameter('ka', 0.8)
+        self.declare_parameter('frame_budget_ms', 20.0)
+        self.declare_parameter('report_period', 5.0)
+        param = self.get_parameter
+        self.detector = LineDetector(param('line').value, param('roi').value)
+        self.steering = Steering(param('speed').value, param('kp').value, param('ka').value)
+        self.stride_control = StrideControl(param('frame_budget_ms').value / 1000.0)
+        self.report_period = param('report_period').value
+        # create the publisher object
+        self.publisher_ = self.create_publisher(Twist, 'cmd_vel', 10)
+        self.cmd = Twist()
+        self.grabber = LatestFrameGrabber(param('stream_url').value,
+                                          log=self.get_logger().warn).start()
+        self.processing = []
+        self.ages = []
+        self.lost = 0
+        self._stop = threading.Event()
+        self.worker = threading.Thread(target=self.follow, daemon=True)
+        self.worker.start()
+
+    def follow(self):
+        report_at = time.monotonic() + self.report_period
+        while not self._stop.is_set() and rclpy.ok():
+            item = self.grabber.next(timeout=self.steering.lost_timeout)
+            now = time.monotonic()
+            if item is None:
+                # no frames: stop rather than drive blind
+                self.publish(0.0, 0.0)
+                continue
+            _, stamp, frame = item
+            start = time.perf_counter()
+            detection = self.detector.detect(frame)
+            linear, angular = self.steering.update(detection, now)
+            self.publish(linear, angular)
+            spent = time.perf_counter() - start
+            self.processing.append(spent)
+            self.ages.append(time.monotonic() - stamp)
+            self.lost += not detection.found
+            stride = self.stride_control.update(spent)
+            if stride is not None:
+                self.detector.stride = stride
+                self.get_logger().info('frame p95 was %.1f ms, detector stride now %d'
+                                       % (self.stride_control.last_p95 * 1e3, stride))
+            if now >= report_at:
+                self.report(now - report_at + self.report_period)
+                report_at = now + self.report_period
+
+    def publish(self, linear, angular):
+        self.cmd.linear.x = linear
+        self.cmd.angular.z = angular
+        # Publishing the cmd_vel values to a Topic
+        self.publisher_.publish(self.cmd)
+
+    def report(self, elapsed):
+        if not self.processing:
+            return
+        ms = sorted(s * 1e3 for s in self.processing)
+        ages = sorted(a * 1e3 for a in self.ages)
+        self.get_logger().info(
+            '%.1f fps, processing median %.2f ms p95 %.2f ms, frame age p95 %.0f ms, '
+            'line lost in %d frames, %d frames skipped, %d reconnects'
+            % (len(ms) / elapsed, ms[len(ms) // 2], ms[int(len(ms) * 0.95)],
+               ages[int(len(ages) * 0.95)], self.lost, self.grabber.dropped,
+               self.grabber.reopens))
+        self.processing, self.ages, self.lost = [], [], 0
+
+    def shutdown(self):
+        self._stop.set()
+        self.worker.join(timeout=2.0)
+        self.grabber.stop()
+        self.publish(0.0, 0.0)
+
+
+def main(args=None):
+    # initialize the ROS communication
+    rclpy.init(args=args)
+    # declare the node constructor
+    linefollow = LineFollow()
+    try:
+        # pause the program execution, waits for a request to kill the node (ctrl+c)
+        rclpy.spin(linefollow)
+    except KeyboardInterrupt:
+        pass
+    # stop the robot, then explicity destroy the node
+    linefollow.shutdown()
+    linefollow.destroy_node()
+    # shutdown the ROS communication
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
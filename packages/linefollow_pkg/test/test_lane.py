@@ -0,0 +1,66 @@
+from linefollow_pkg.lane import LineDetector, render_line, Steering, StrideControl
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('offset,angle', [(0.0, 0.0), (0.5, 0.0), (-0.6, 0.2), (0.3, -0.4)])
+def test_line_offset_and_angle(offset, angle):
+    detection = LineDetector().detect(render_line(offset, angle, noise=20))
+    assert detection.found
+    assert detection.offset == pytest.approx(offset, abs=0.03)
+    assert detection.angle == pytest.approx(angle, abs=0.05)
+
+
+def test_lane_centre_between_markings():
+    detection = LineDetector().detect(render_line(0.1, 0.1, lane=True))
+    assert detection.found
+    assert detection.offset == pytest.approx(0.1, abs=0.03)
+
+
+def test_light_line_and_big_frames_with_stride():
+    frame = 255 - render_line(-0.3, 0.0, width=1280, height=960)
+    detection = LineDetector(line='light', stride=4).detect(frame)
+    assert detection.found
+    assert detection.offset == pytest.approx(-0.3, abs=0.03)
+
+
+@pytest.mark.parametrize('frame', [
+    np.full((480, 640, 3), 180, np.uint8),
+    np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8),
+])
+def test_no_line(frame):
+    assert not LineDetector().detect(frame).found
+
+
+def test_steering_turns_towards_the_line_and_stops_when_lost():
+    steering = Steering(speed=0.1, lost_timeout=0.5)
+    detector = LineDetector()
+    linear, angular = steering.update(detector.detect(render_line(0.5, 0.0)), 0.0)
+    assert angular < 0 and 0 < linear < 0.1
+    linear, angular = steering.update(detector.detect(render_line(-0.5, 0.0)), 0.1)
+    assert angular > 0
+    lost = detector.detect(np.full((480, 640, 3), 180, np.uint8))
+    assert steering.update(lost, 0.3)[1] == angular
+    assert steering.update(lost, 1.0) == (0.0, 0.0)
+
+
+def test_bad_line_colour():
+    with pytest.raises(ValueError):
+        LineDetector(line='red')
+
+
+def test_stride_goes_back_down_after_slow_frames():
+    control = StrideControl(0.020)
+    # one slow frame (first frame, GC pause) changes nothing
+    assert [control.update(t) for t in [0.1] + [0.005] * 19] == [None] * 20
+    assert control.stride == 1
+    # a slow stretch raises it, frames at 3 ms lower it again
+    stride = None
+    while stride is None:
+        stride = control.update(0.030)
+    assert stride == 2
+    changes = [control.update(0.003) for _ in range(20)]
+    assert changes[-1] == 1
+    # 9 ms at stride 2 would be about 36 ms at stride 1: it stays
+    control.stride = 2
+    assert [control.update(0.009) for _ in range(30)] == [None] * 30
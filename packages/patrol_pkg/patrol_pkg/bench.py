@@ -0,0 +1,86 @@
+import statistics
+import subprocess
+import sys
+import time
+
+import rclpy
+from rclpy.utilities import remove_ros_args
+
+from patrol_pkg.client import PatrolClient
+
+# Round trip time of a patrol command (command published -> matching event
+# received), measured three ways against a running patrol node:
+#   client: one 'ping' per message over the persistent PatrolClient
+#   batch:  'ping' commands sent in batches of BATCH_SIZE per message
+#   shell:  the patrol-send-command.sh way, `ros2 topic pub --once` per command
+#
+# usage: patrol_bench [count] [shell_count]
+
+BATCH_SIZE = 10
+
+
+def summary(name, samples):
+    if not samples:
+        return '%-7s no samples' % name
+    ms = sorted(s * 1e3 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(0.95 * len(ms)))]
+    return '%-7s n=%-4d min %8.2f ms  median %8.2f ms  p95 %8.2f ms  max %8.2f ms' % (
+        name, len(ms), ms[0], statistics.median(ms), p95, ms[-1])
+
+
+def bench_client(client, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        if client.request('ping') is not None:
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_batch(client, count):
+    # per-command time when commands share one message
+    samples = []
+    for _ in range(max(1, count // BATCH_SIZE)):
+        start = time.perf_counter()
+        ids = client.send(*['ping'] * BATCH_SIZE)
+        if all(client.wait(command_id) is not None for command_id in ids):
+            samples.append((time.perf_counter() - start) / BATCH_SIZE)
+    return samples
+
+
+def bench_shell(client, count):
+    samples = []
+    for n in range(count):
+        command_id = 'shell-%d' % n
+        client.expect(command_id)
+        start = time.perf_counter()
+        subprocess.run(
+            ['ros2', 'topic', 'pub', '--once', '/patrolCommands',
+             'example_interfaces/msg/String', 'data: "#%s ping"' % command_id],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        if client.wait(command_id, timeout=10.0) is not None:
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(args=None):
+    rclpy.init(args=args)
+    argv = remove_ros_args(sys.argv)[1:]
+    count = int(argv[0]) if len(argv) > 0 else 200
+    shell_count = int(argv[1]) if len(argv) > 1 else 5
+    client = PatrolClient()
+    try:
+        if not client.wait_for_patrol():
+            print('No patrol node found, start it with: ros2 run patrol_pkg patrol')
+            return
+        client.request('ping')  # warm up discovery and the first message
+        print(summary('client', bench_client(client, count)))
+        print(summary('batch', bench_batch(client, count)))
+        print(summary('shell', bench_shell(client, shell_count)))
+    finally:
+        client.close()
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
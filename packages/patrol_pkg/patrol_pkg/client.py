@@ -0,0 +1,133 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+import rclpy
+# import the ROS2 python libraries
+from rclpy.executors import SingleThreadedExecutor
+from rclpy.node import Node
+from rclpy.utilities import remove_ros_args
+from example_interfaces.msg import String
+
+from patrol_pkg.commands import split_batch
+from patrol_pkg.patrol import COMMAND_QOS
+
+
+class PatrolClient(Node):
+    # Persistent connection to the patrol node: the node, publisher and
+    # subscriber stay open, so a command costs one publish instead of a full
+    # `ros2 topic pub` start-up.
+
+    def __init__(self, on_event=None):
+        super().__init__('patrol_client_%d' % os.getpid())
+        self.on_event = on_event
+        self.publisher_ = self.create_publisher(String, '/patrolCommands', COMMAND_QOS)
+        self.subscriber = self.create_subscription(
+            String, '/patrolEvents', self.event_callback, COMMAND_QOS)
+        # command ids are unique per client so acks of other clients are ignored
+        self.ids = ('%d-%d' % (os.getpid(), n) for n in itertools.count(1))
+        self.waiting = {}
+        self.condition = threading.Condition()
+        # spin in the background so events arrive while the caller waits
+        self.executor = SingleThreadedExecutor()
+        self.executor.add_node(self)
+        self.spin_thread = threading.Thread(target=self.executor.spin, daemon=True)
+        self.spin_thread.start()
+
+    def wait_for_patrol(self, timeout=10.0):
+        # wait until the patrol node is subscribed, earlier commands would get lost
+        deadline = time.monotonic() + timeout
+        while self.publisher_.get_subscription_count() == 0:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def expect(self, command_id):
+        # register an id before sending so a fast answer is not missed
+        with self.condition:
+            self.waiting.setdefault(command_id, [])
+
+    def send(self, *commands, track=True):
+        # send all commands as one batch message, returns their ids
+        # (track=False when nobody will wait() for the answers)
+        ids, parts = [], []
+        for command in commands:
+            for part in split_batch(command):
+                if not part.startswith('#'):
+                    part = '#%s %s' % (next(self.ids), part)
+                command_id = part.split()[0][1:]
+                if track:
+                    self.expect(command_id)
+                ids.append(command_id)
+                parts.append(part)
+        if parts:
+            msg = String()
+            msg.data = '; '.join(parts)
+            self.publisher_.publish(msg)
+        return ids
+
+    def wait(self, command_id, timeout=2.0):
+        # first event answering the command, None on timeout
+        with self.condition:
+            self.condition.wait_for(lambda: self.waiting.get(command_id), timeout)
+            events = self.waiting.pop(command_id, None)
+        return events[0] if events else None
+
+    def request(self, command, timeout=2.0):
+        # send one command and wait for its acknowledgement
+        command_id, = self.send(command)
+        return self.wait(command_id, timeout)
+
+    def event_callback(self, msg):
+        try:
+            event = json.loads(msg.data)
+        except ValueError:
+            event = {'event': 'raw', 'data': msg.data}
+        with self.condition:
+            if event.get('id') in self.waiting:
+                self.waiting[event['id']].append(event)
+                self.condition.notify_all()
+        if self.on_event:
+            self.on_event(event)
+
+    def close(self):
+        self.executor.shutdown()
+        self.destroy_node()
+
+
+def print_event(event):
+    print(json.dumps(event))
+
+
+def main(args=None):
+    # usage:
+    #   patrol_client                  interactive prompt, one batch per line
+    #   patrol_client "add 1 2; start" send one batch and print the acks
+    rclpy.init(args=args)
+    argv = remove_ros_args(sys.argv)[1:]
+    client = PatrolClient(on_event=None if argv else print_event)
+    if not client.wait_for_patrol():
+        print('No patrol node found on /patrolCommands')
+    try:
+        if argv:
+            for command_id in client.send(' '.join(argv)):
+                print_event(client.wait(command_id) or {'id': command_id, 'event': 'timeout'})
+        else:
+            while True:
+                line = input('patrol> ')
+                if line.strip() in ('quit', 'exit'):
+                    break
+                client.send(line, track=False)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        client.close()
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
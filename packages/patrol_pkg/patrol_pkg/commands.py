@@ -0,0 +1,153 @@
+# Patrol command language and waypoint queue, kept free of ROS imports so the
+# logic can be reused by the node, the client and the tests.
+#
+# One /patrolCommands message may hold a batch of commands separated by ';'
+# or newlines. Every command can carry an id ('#<id> <verb> <args>') which is
+# echoed in the events it produces, so a client can match acknowledgements:
+#   add <x> <y> [yaw]   append a waypoint (map frame, meters / radians)
+#   start | stop        start or pause patrolling
+#   next                skip the current waypoint
+#   clear               drop all waypoints and stop
+#   loop on|off         re-queue reached waypoints to patrol forever
+#   status              report queue and state
+#   ping [token]        answer with a pong event (round trip measurement)
+from collections import deque, namedtuple
+
+Command = namedtuple('Command', ['id', 'verb', 'args'])
+
+VERBS = ('add', 'start', 'stop', 'next', 'clear', 'loop', 'status', 'ping')
+
+
+class PatrolCommandError(ValueError):
+    pass
+
+
+def parse_command(text):
+    # parse one command, raises PatrolCommandError for bad input
+    words = text.split()
+    if not words:
+        raise PatrolCommandError('empty command')
+    command_id = None
+    if words[0].startswith('#'):
+        command_id = words.pop(0)[1:]
+        if not words:
+            raise PatrolCommandError('command #%s has no verb' % command_id)
+    verb = words[0].lower()
+    args = words[1:]
+    if verb not in VERBS:
+        raise PatrolCommandError('unknown command "%s"' % verb)
+    if verb == 'add':
+        if len(args) not in (2, 3):
+            raise PatrolCommandError('usage: add <x> <y> [yaw]')
+        try:
+            args = [float(a) for a in args]
+        except ValueError:
+            raise PatrolCommandError('add needs numbers, got %s' % args)
+    if verb == 'loop' and args not in (['on'], ['off']):
+        raise PatrolCommandError('usage: loop on|off')
+    return Command(command_id, verb, args)
+
+
+def split_batch(text):
+    # split a message into the separate command strings of the batch
+    return [part.strip() for part in text.replace('\n', ';').split(';')
+            if part.strip()]
+
+
+class PatrolState:
+
+    def __init__(self):
+        # waypoints still to visit, the first one is the current goal
+        self.waypoints = deque()
+        self.active = False
+        self.loop = False
+        # the waypoint advance() last dropped, until the robot leaves it
+        self.departing = None
+
+    @property
+    def current(self):
+        # the waypoint the robot should drive to, None when idle
+        if self.active and self.waypoints:
+            return self.waypoints[0]
+        return None
+
+    def handle_text(self, text):
+        # run every command of a batch, errors only affect their own command
+        events = []
+        for part in split_batch(text):
+            try:
+                command = parse_command(part)
+            except PatrolCommandError as e:
+                command_id = part.split()[0][1:] if part.startswith('#') else None
+                events.append({'event': 'error', 'id': command_id,
+                               'command': part, 'error': str(e)})
+                continue
+            events.extend(self.handle(command))
+        return events
+
+    def handle(self, command):
+        verb, args = command.verb, command.args
+        event = {'event': verb, 'id': command.id}
+        if verb == 'add':
+            waypoint = tuple(args) if len(args) == 3 else (args[0], args[1], 0.0)
+            self.waypoints.append(waypoint)
+            event.update(event='waypoint_added', waypoint=waypoint,
+                         queued=len(self.waypoints))
+        elif verb == 'start':
+            self.active = True
+            event.update(event='started', goal=self.current)
+        elif verb == 'stop':
+            self.active = False
+            event.update(event='stopped')
+        elif verb == 'next':
+            events = self.advance('skipped') or [{'event': 'skipped', 'waypoint': None}]
+            return [dict(e, id=command.id) for e in events]
+        elif verb == 'clear':
+            self.waypoints.clear()
+            self.active = False
+            self.departing = None
+            event.update(event='cleared')
+        elif verb == 'loop':
+            self.loop = args[0] == 'on'
+            event.update(event='loop', loop=self.loop)
+        elif verb == 'status':
+            event.update(self.status())
+            event['event'] = 'status'
+        elif verb == 'ping':
+            event.update(event='pong', token=args[0] if args else None)
+        return [event]
+
+    def check_arrival(self, distance, tolerance):
+        # called with the distance to the current goal on every odometry
+        # message. A waypoint that was just reached and is the goal again (a
+        # single looped waypoint, or skipped while standing on it) only
+        # counts after the robot has left its tolerance radius once.
+        goal = self.current
+        if goal is None:
+            return []
+        if distance > tolerance:
+            if goal == self.departing:
+                self.departing = None
+            return []
+        if goal == self.departing:
+            return []
+        return self.advance()
+
+    def advance(self, reason='waypoint_reached'):
+        # the current waypoint is done: drop it (or re-queue it when looping)
+        if not self.waypoints:
+            return []
+        waypoint = self.waypoints.popleft()
+        self.departing = waypoint
+        if self.loop:
+            self.waypoints.append(waypoint)
+        events = [{'event': reason, 'id': None, 'waypoint': waypoint,
+                   'queued': len(self.waypoints)}]
+        if not self.waypoints:
+            self.active = False
+            events.append({'event': 'patrol_finished', 'id': None})
+        return events
+
+    def status(self):
+        return {'active': self.active, 'loop': self.loop,
+                'goal': self.current, 'waypoints': list(self.waypoints)}
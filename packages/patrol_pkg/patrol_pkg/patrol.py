@@ -0,0 +1,110 @@
+import json
+import math
+
+import rclpy
+# import the ROS2 python libraries
+from rclpy.node import Node
+from rclpy.qos import QoSProfile, ReliabilityPolicy
+# commands and events are plain strings (same type as patrol-send-command.sh)
+from example_interfaces.msg import String
+# goals are sent to Nav2 as PoseStamped on /goal_pose
+from geometry_msgs.msg import PoseStamped
+# odometry tells us when a waypoint is reached
+from nav_msgs.msg import Odometry
+
+from patrol_pkg.commands import PatrolState
+
+# commands must not get lost, events are kept for slow listeners
+COMMAND_QOS = QoSProfile(depth=50, reliability=ReliabilityPolicy.RELIABLE)
+
+
+class Patrol(Node):
+
+    def __init__(self):
+        # Here you have the class constructor
+        super().__init__('patrol')
+        # distance in meters at which a waypoint counts as reached
+        self.declare_parameter('goal_tolerance', 0.25)
+        # frame of the waypoints sent to Nav2
+        self.declare_parameter('frame_id', 'map')
+        self.goal_tolerance = self.get_parameter('goal_tolerance').value
+        self.frame_id = self.get_parameter('frame_id').value
+        # waypoint queue and patrol state
+        self.state = PatrolState()
+        self.event_seq = 0
+        self.sent_goal = None
+        # create the publisher and subscriber objects
+        self.event_publisher = self.create_publisher(String, '/patrolEvents', COMMAND_QOS)
+        self.goal_publisher = self.create_publisher(PoseStamped, '/goal_pose', 10)
+        self.command_subscriber = self.create_subscription(
+            String, '/patrolCommands', self.command_callback, COMMAND_QOS)
+        self.odom_subscriber = self.create_subscription(
+            Odometry, '/odom', self.odom_callback, 10)
+        self.get_logger().info('Patrol node ready')
+
+    def command_callback(self, msg):
+        # a message can hold a whole batch of commands, handle them at once
+        events = self.state.handle_text(msg.data)
+        self.publish_events(events)
+        # a skip may leave the same goal (single looped waypoint): send it again
+        self.update_goal(force=any(e['event'] == 'skipped' for e in events))
+
+    def odom_callback(self, msg):
+        goal = self.state.current
+        if goal is None:
+            return
+        position = msg.pose.pose.position
+        # odom and map frame are assumed to line up (no tf lookup here)
+        distance = math.hypot(goal[0] - position.x, goal[1] - position.y)
+        events = self.state.check_arrival(distance, self.goal_tolerance)
+        if events:
+            self.publish_events(events)
+            # always resend: when looping over one waypoint the goal stays the same
+            self.update_goal(force=True)
+
+    def update_goal(self, force=False):
+        # send the current waypoint to Nav2 when it changed (or when forced)
+        goal = self.state.current
+        if goal == self.sent_goal and not force:
+            return
+        self.sent_goal = goal
+        if goal is None:
+            return
+        pose = PoseStamped()
+        pose.header.frame_id = self.frame_id
+        pose.header.stamp = self.get_clock().now().to_msg()
+        pose.pose.position.x = float(goal[0])
+        pose.pose.position.y = float(goal[1])
+        pose.pose.orientation.z = math.sin(goal[2] / 2.0)
+        pose.pose.orientation.w = math.cos(goal[2] / 2.0)
+        self.goal_publisher.publish(pose)
+
+    def publish_events(self, events):
+        # every event is one JSON object with a sequence number and time stamp
+        stamp = self.get_clock().now().nanoseconds / 1e9
+        for event in events:
+            self.event_seq += 1
+            event['seq'] = self.event_seq
+            event['stamp'] = stamp
+            msg = String()
+            msg.data = json.dumps(event)
+            self.event_publisher.publish(msg)
+            if event['event'] == 'error':
+                self.get_logger().warn(event['error'])
+
+
+def main(args=None):
+    # initialize the ROS communication
+    rclpy.init(args=args)
+    # declare the node constructor
+    patrol = Patrol()
+    # pause the program execution, waits for a request to kill the node (ctrl+c)
+    rclpy.spin(patrol)
+    # Explicity destroy the node
+    patrol.destroy_node()
+    # shutdown the ROS communication
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+from setuptools import setup
+import os
+from glob import glob
+
+package_name = 'patrol_pkg'
+
+setup(
+    name=package_name,
+    version='0.0.0',
+    packages=[package_name],
+    data_files=[
+        ('share/ament_index/resource_index/packages',
+            ['resource/' + package_name]),
+        ('share/' + package_name, ['package.xml']),
+        (os.path.join('share', package_name), glob('launch/*.launch.py'))
+    ],
+    install_requires=['setuptools'],
+    zip_safe=True,
+    maintainer='somebody very awesome',
+    maintainer_email='user@user.com',
+    description='Patrol node with a waypoint queue and a persistent command client',
+    license='TODO: License declaration',
+    tests_require=['pytest'],
+    entry_points={
+        'console_scripts': [
+            'patrol = patrol_pkg.patrol:main',
+            'patrol_client = patrol_pkg.client:main',
+            'patrol_bench = patrol_pkg.bench:main'
+        ],
+    },
+)
@@ -0,0 +1,59 @@
+from patrol_pkg.commands import parse_command, PatrolCommandError, PatrolState
+import pytest
+
+
+def test_batch_is_handled_in_order():
+    state = PatrolState()
+    events = state.handle_text('#1 add 1 2; #2 add 3 4 1.57\n#3 start')
+    assert [e['event'] for e in events] == ['waypoint_added', 'waypoint_added', 'started']
+    assert [e['id'] for e in events] == ['1', '2', '3']
+    assert state.current == (1.0, 2.0, 0.0)
+
+
+def test_advance_and_loop():
+    state = PatrolState()
+    state.handle_text('add 0 0; add 1 0; loop on; start')
+    state.advance()
+    assert state.current == (1.0, 0.0, 0.0)
+    state.advance()
+    assert state.current == (0.0, 0.0, 0.0)
+    state.handle_text('loop off')
+    events = state.advance() + state.advance()
+    assert events[-1]['event'] == 'patrol_finished'
+    assert state.current is None
+
+
+def test_single_waypoint_loop_counts_once_per_visit():
+    state = PatrolState()
+    state.handle_text('add 1 1; loop on; start')
+    events = state.check_arrival(0.1, 0.25)
+    assert [e['event'] for e in events] == ['waypoint_reached']
+    assert state.current == (1.0, 1.0, 0.0)
+    # still standing on it: no more events at odometry rate
+    assert state.check_arrival(0.1, 0.25) == []
+    assert state.check_arrival(0.2, 0.25) == []
+    # driven away and back: the next visit counts again
+    assert state.check_arrival(0.8, 0.25) == []
+    assert len(state.check_arrival(0.1, 0.25)) == 1
+
+
+def test_next_waypoint_inside_tolerance_counts_at_once():
+    state = PatrolState()
+    state.handle_text('add 0 0; add 0.1 0; start')
+    assert state.check_arrival(0.05, 0.25)[0]['waypoint'] == (0.0, 0.0, 0.0)
+    events = state.check_arrival(0.05, 0.25)
+    assert events[0]['waypoint'] == (0.1, 0.0, 0.0)
+    assert events[-1]['event'] == 'patrol_finished'
+
+
+def test_bad_command_only_fails_itself():
+    state = PatrolState()
+    events = state.handle_text('#a add x y; #b ping t1')
+    assert events[0]['event'] == 'error' and events[0]['id'] == 'a'
+    assert events[1] == {'event': 'pong', 'id': 'b', 'token': 't1'}
+
+
+@pytest.mark.parametrize('text', ['', 'fly', 'add 1', 'loop maybe', '#7'])
+def test_parse_errors(text):
+    with pytest.raises(PatrolCommandError):
+        parse_command(text)
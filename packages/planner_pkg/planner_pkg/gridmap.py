@@ -0,0 +1,215 @@
+# Nav2 map files (the map_saver .yaml + .pgm of save-map.sh) as NumPy grids,
+# kept free of ROS imports so the node, the tests and the benchmark share it.
+#
+# The .pgm is memory-mapped, not read: a 4000x4000 map costs nothing until
+# its cells are used. From it GridMap.prepare() derives, once per map and
+# robot size:
+#   dist    distance of every cell to the nearest obstacle (cells, float32)
+#   cost    a Nav2-style inflated costmap (uint8): LETHAL on obstacles,
+#           INSCRIBED within the robot radius, then decaying to 0 at the
+#           inflation radius
+#   labels  4-connected components of the cells the robot fits in (the
+#           cells an 8-direction path without corner cutting can reach), so
+#           an unreachable goal is refused without searching
+#   jump tables for the JPS search (search.py)
+# and caches them as .npy files under cache_dir, keyed by the map contents
+# and the parameters; the next start memory-maps them back in milliseconds.
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+LETHAL = 254
+INSCRIBED = 253
+UNKNOWN = 255
+CACHE_VERSION = 1
+
+
+class MapError(ValueError):
+    pass
+
+
+def read_map_yaml(path):
+    # the map_saver yaml is flat 'key: value' lines
+    try:
+        import yaml
+        with open(path) as f:
+            data = yaml.safe_load(f)
+    except ImportError:
+        data = {}
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.strip():
+                    data[key.strip()] = value.strip()
+        data['origin'] = json.loads(data.get('origin', '[0, 0, 0]'))
+    for key in ('image', 'resolution'):
+        if key not in data:
+            raise MapError('%s: no "%s"' % (path, key))
+    return data
+
+
+def read_pgm(path):
+    # binary (P5) 8-bit PGM as a read-only memory map
+    with open(path, 'rb') as f:
+        header = f.read(512)
+    fields, pos = [], 0
+    while len(fields) < 4:
+        while pos < len(header) and header[pos:pos + 1].isspace():
+            pos += 1
+        if header[pos:pos + 1] == b'#':
+            pos = header.index(b'\n', pos) + 1
+            continue
+        end = pos
+        while end < len(header) and not header[end:end + 1].isspace():
+            end += 1
+        fields.append(header[pos:end])
+        pos = end
+    if fields[0] != b'P5' or int(fields[3]) > 255:
+        raise MapError('%s: only 8-bit binary PGM (P5) maps are supported' % path)
+    width, height = int(fields[1]), int(fields[2])
+    return np.memmap(path, np.uint8, 'r', offset=pos + 1, shape=(height, width))
+
+
+def write_map(yaml_path, image, resolution=0.05, origin=(0.0, 0.0, 0.0)):
+    # save a uint8 grid as map_saver does (254 free, 0 occupied, 205 unknown;
+    # free_thresh 0.196 keeps 205 unknown when it is loaded back)
+    pgm_path = os.path.splitext(yaml_path)[0] + '.pgm'
+    with open(pgm_path, 'wb') as f:
+        f.write(b'P5\n# CREATOR: planner_pkg\n%d %d\n255\n' % (image.shape[1], image.shape[0]))
+        f.write(np.ascontiguousarray(image, np.uint8).tobytes())
+    with open(yaml_path, 'w') as f:
+        f.write('image: %s\nmode: trinary\nresolution: %g\norigin: %s\nnegate: 0\n'
+                'occupied_thresh: 0.65\nfree_thresh: 0.196\n'
+                % (os.path.basename(pgm_path), resolution, json.dumps(list(origin))))
+    return yaml_path
+
+
+class GridMap:
+
+    def __init__(self, image, resolution, origin=(0.0, 0.0, 0.0), negate=0,
+                 occupied_thresh=0.65, free_thresh=0.25, source=None):
+        # image: map_saver pixel values, row 0 is the top (largest y)
+        self.image = image
+        self.resolution = float(resolution)
+        self.origin = tuple(float(v) for v in origin[:2])
+        self.negate = int(negate)
+        self.occupied_thresh = float(occupied_thresh)
+        self.free_thresh = float(free_thresh)
+        self.source = source
+        self.height, self.width = image.shape
+        self.dist = self.cost = self.labels = None
+        self.tables = None
+
+    @classmethod
+    def load(cls, yaml_path):
+        data = read_map_yaml(yaml_path)
+        image_path = os.path.join(os.path.dirname(os.path.abspath(yaml_path)), data['image'])
+        if image_path.endswith('.pgm'):
+            image = read_pgm(image_path)
+        else:
+            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise MapError('cannot read %s' % image_path)
+        return cls(image, data['resolution'], data.get('origin', (0.0, 0.0, 0.0)),
+                   data.get('negate', 0), data.get('occupied_thresh', 0.65),
+                   data.get('free_thresh', 0.25), source=image_path)
+
+    def occupancy(self):
+        # (occupied, unknown) boolean grids, map_server's trinary interpretation
+        p = self.image.astype(np.float32) * (1.0 / 255.0)
+        if not self.negate:
+            p = 1.0 - p
+        occupied = p > self.occupied_thresh
+        unknown = ~occupied & (p >= self.free_thresh)
+        return occupied, unknown
+
+    # ---- coordinates ----
+
+    def to_cell(self, x, y):
+        col = int((x - self.origin[0]) / self.resolution)
+        row = self.height - 1 - int((y - self.origin[1]) / self.resolution)
+        return row, col
+
+    def to_world(self, row, col):
+        return (self.origin[0] + (col + 0.5) * self.resolution,
+                self.origin[1] + (self.height - 1 - row + 0.5) * self.resolution)
+
+    def inside(self, row, col):
+        return 0 <= row < self.height and 0 <= col < self.width
+
+    # ---- precomputation ----
+
+    def cache_key(self, robot_radius, inflation_radius, allow_unknown):
+        digest = hashlib.sha1(np.ascontiguousarray(self.image).data)
+        digest.update(json.dumps([CACHE_VERSION, self.resolution, self.negate,
+                                  self.occupied_thresh, self.free_thresh, robot_radius,
+                                  inflation_radius, bool(allow_unknown)]).encode())
+        return digest.hexdigest()[:20]
+
+    def prepare(self, robot_radius=0.105, inflation_radius=0.3, allow_unknown=False,
+                cache_dir=None):
+        # compute (or load from cache_dir) dist, cost, labels and the jump
+        # tables; returns True when they came from the cache
+        from planner_pkg.search import JumpTables
+        names = ['dist', 'cost', 'labels'] + list(JumpTables.ARRAYS)
+        folder = None
+        if cache_dir:
+            folder = os.path.join(cache_dir, self.cache_key(robot_radius, inflation_radius,
+                                                            allow_unknown))
+            if all(os.path.exists(os.path.join(folder, n + '.npy')) for n in names):
+                arrays = {n: np.load(os.path.join(folder, n + '.npy'), mmap_mode='r')
+                          for n in names}
+                self._set(arrays)
+                return True
+        arrays = self._compute(robot_radius, inflation_radius, allow_unknown)
+        arrays.update(JumpTables.build(arrays['cost'] < INSCRIBED))
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            for name, array in arrays.items():
+                # write then rename, so a crash never leaves half a cache
+                tmp = os.path.join(folder, name + '.tmp.npy')
+                np.save(tmp, array)
+                os.replace(tmp, os.path.join(folder, name + '.npy'))
+        self._set(arrays)
+        return False
+
+    def _compute(self, robot_radius, inflation_radius, allow_unknown):
+        occupied, unknown = self.occupancy()
+        blocked = occupied if allow_unknown else occupied | unknown
+        # distance (in cells) of every cell to the nearest blocked cell
+        dist = cv2.distanceTransform(np.where(blocked, 0, 255).astype(np.uint8),
+                                     cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        inscribed = robot_radius / self.resolution
+        inflation = max(inflation_radius / self.resolution, inscribed)
+        scale = 3.0 / max(inflation - inscribed, 1e-6)   # cost ~5% of max at the edge
+        cost = np.where(dist <= inflation,
+                        252.0 * np.exp(-scale * np.maximum(dist - inscribed, 0.0)), 0.0)
+        cost = cost.astype(np.uint8)
+        cost[dist <= inscribed] = INSCRIBED
+        if not allow_unknown:
+            cost[unknown] = UNKNOWN
+        cost[occupied] = LETHAL
+        _, labels = cv2.connectedComponents((cost < INSCRIBED).astype(np.uint8), connectivity=4)
+        return {'dist': dist, 'cost': cost, 'labels': labels.astype(np.int32)}
+
+    def _set(self, arrays):
+        from planner_pkg.search import JumpTables
+        self.dist, self.cost, self.labels = arrays['dist'], arrays['cost'], arrays['labels']
+        self.tables = JumpTables(arrays)
+
+    def nearest_free(self, row, col, radius_cells=10):
+        # the cell the robot fits in closest to (row, col), for a start or
+        # goal inside the inflation; None if there is none within the radius
+        if self.inside(row, col) and self.cost[row, col] < INSCRIBED:
+            return row, col
+        r0, r1 = max(0, row - radius_cells), min(self.height, row + radius_cells + 1)
+        c0, c1 = max(0, col - radius_cells), min(self.width, col + radius_cells + 1)
+        window = np.asarray(self.cost[r0:r1, c0:c1]) < INSCRIBED
+        if not window.any():
+            return None
+        rows, cols = np.nonzero(window)
+        k = np.argmin((rows + r0 - row) ** 2 + (cols + c0 - col) ** 2)
+        return int(rows[k] + r0), int(cols[k] + c0)
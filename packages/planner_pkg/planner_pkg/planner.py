@@ -0,0 +1,129 @@
+import math
+import os
+import time
+
+# import the ROS2 python libraries
+import rclpy
+from rclpy.node import Node
+# goals come from RViz's "2D Goal Pose", the start from AMCL or "2D Pose Estimate"
+from geometry_msgs.msg import PoseStamped, PoseWithCovarianceStamped
+from nav_msgs.msg import Path
+
+from planner_pkg.gridmap import GridMap, MapError
+from planner_pkg.search import PlanError, astar, densify, jps, path_length
+
+
+def default_map():
+    # the map of save-map.sh / launch-navigation.sh
+    return os.path.expanduser('~/mapGazeboTurtlebot' + os.getenv('ROS_DOMAIN_ID', '0') + '.yaml')
+
+
+class Planner(Node):
+    # Plans on a saved Nav2 map without the Nav2 stack: the map is loaded
+    # (memory-mapped) and prepared once at start-up, or taken from the cache
+    # of an earlier start; then every goal_pose is answered with a
+    # nav_msgs/Path from the last known robot pose.
+    #
+    #   ros2 run planner_pkg planner --ros-args -p algorithm:=astar
+
+    def __init__(self):
+        super().__init__('planner')
+        self.declare_parameter('map', default_map())
+        self.declare_parameter('robot_radius', 0.105)      # TurtleBot3 burger
+        self.declare_parameter('inflation_radius', 0.3)
+        self.declare_parameter('allow_unknown', False)
+        self.declare_parameter('algorithm', 'jps')         # jps or astar
+        self.declare_parameter('cache_dir', os.path.expanduser('~/.cache/planner_pkg'))
+        param = self.get_parameter
+        self.algorithm = param('algorithm').value
+        if self.algorithm not in ('jps', 'astar'):
+            raise ValueError('algorithm must be jps or astar, not %r' % self.algorithm)
+        start = time.perf_counter()
+        try:
+            self.grid = GridMap.load(param('map').value)
+        except (OSError, MapError) as e:
+            raise SystemExit('cannot load map: %s' % e)
+        cached = self.grid.prepare(param('robot_radius').value, param('inflation_radius').value,
+                                   param('allow_unknown').value, param('cache_dir').value or None)
+        self.get_logger().info('map %dx%d %s in %.0f ms' % (
+            self.grid.width, self.grid.height, 'loaded from cache' if cached else 'prepared',
+            (time.perf_counter() - start) * 1e3))
+        self.pose = None
+        # create the publisher and subscriber objects
+        self.path_publisher = self.create_publisher(Path, 'plan', 10)
+        self.create_subscription(PoseStamped, 'goal_pose', self.goal_callback, 10)
+        self.create_subscription(PoseWithCovarianceStamped, 'amcl_pose', self.pose_callback, 10)
+        self.create_subscription(PoseWithCovarianceStamped, 'initialpose', self.pose_callback, 10)
+
+    def pose_callback(self, msg):
+        position = msg.pose.pose.position
+        self.pose = (position.x, position.y)
+
+    def goal_callback(self, msg):
+        if self.pose is None:
+            self.get_logger().warn('no robot pose yet (amcl_pose or initialpose), goal ignored')
+            return
+        grid = self.grid
+        # a pose inside the inflation (e.g. a robot against a wall) plans from
+        # the nearest cell the robot fits in
+        start = grid.nearest_free(*grid.to_cell(*self.pose))
+        goal = grid.nearest_free(*grid.to_cell(msg.pose.position.x, msg.pose.position.y))
+        if start is None or goal is None:
+            which = 'start' if start is None else 'goal'
+            self.get_logger().warn('%s is not near free space' % which)
+            return
+        begin = time.perf_counter()
+        try:
+            if self.algorithm == 'jps':
+                path = jps(grid, start, goal)
+            else:
+                path = astar(grid, start, goal)
+        except PlanError as e:
+            self.get_logger().warn(str(e))
+            return
+        spent = (time.perf_counter() - begin) * 1e3
+        if path is None:
+            self.get_logger().warn('goal is not reachable (%.1f ms)' % spent)
+            return
+        self.get_logger().info('%s path of %.2f m in %.1f ms' % (
+            self.algorithm, path_length(path) * grid.resolution, spent))
+        self.path_publisher.publish(self.to_msg(densify(path), msg))
+
+    def to_msg(self, cells, goal):
+        out = Path()
+        out.header.frame_id = 'map'
+        out.header.stamp = self.get_clock().now().to_msg()
+        points = [self.grid.to_world(r, c) for r, c in cells]
+        for n, (x, y) in enumerate(points):
+            pose = PoseStamped()
+            pose.header = out.header
+            pose.pose.position.x, pose.pose.position.y = x, y
+            # face along the path, the goal orientation at the end
+            if n + 1 < len(points):
+                yaw = math.atan2(points[n + 1][1] - y, points[n + 1][0] - x)
+                pose.pose.orientation.z = math.sin(yaw / 2.0)
+                pose.pose.orientation.w = math.cos(yaw / 2.0)
+            else:
+                pose.pose.orientation = goal.pose.orientation
+            out.poses.append(pose)
+        return out
+
+
+def main(args=None):
+    # initialize the ROS communication
+    rclpy.init(args=args)
+    # declare the node constructor
+    planner = Planner()
+    try:
+        # pause the program execution, waits for a request to kill the node (ctrl+c)
+        rclpy.spin(planner)
+    except KeyboardInterrupt:
+        pass
+    # Explicity destroy the node
+    planner.destroy_node()
+    # shutdown the ROS communication
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
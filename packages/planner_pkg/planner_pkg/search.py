@@ -0,0 +1,316 @@
+# Path search on a GridMap: jump point search (JPS) for fast shortest paths
+# through the cells the robot fits in, and A* over the inflated costmap when
+# keeping away from walls matters more than speed.
+#
+# Both move in 8 directions without cutting corners: a diagonal step needs
+# both cells beside it free. JPS only puts 'jump points' (where the best
+# path may turn) on its open list, and finds them without walking the grid
+# cell by cell in Python: JumpTables holds, per row and per column, the
+# sorted positions where a straight scan has to stop (the first blocked cell
+# of every run, and the cells with a forced neighbour), so a straight jump
+# of any length is one bisect in the stops of its line. A diagonal jump
+# would run such scans from every cell it passes, so the length of every
+# diagonal jump (from each cell, in each of the 4 directions) is computed
+# in advance too; only crossing the goal's row or column is checked per
+# query. The tables index a grid with a one cell blocked border, which keeps
+# every scan inside its own row.
+import bisect
+import heapq
+import math
+
+import numpy as np
+
+SQRT2 = math.sqrt(2.0)
+DIAGONALS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)] + DIAGONALS
+
+
+class PlanError(ValueError):
+    pass
+
+
+def _line_tables(walk):
+    # where scans along the rows of `walk` (padded bool grid) stop:
+    #   stop_fwd  first blocked cell of every run (scanning +1) and cells
+    #             with a forced neighbour when entered from the left
+    #   stop_back last blocked cell of every run (scanning -1), forced cells
+    #             when entered from the right
+    # (the blocked and forced positions go in one table each: a scan stops
+    # at whichever comes first and tells them apart by `walk`)
+    w = walk
+    left, right = np.zeros_like(w), np.zeros_like(w)
+    left[:, 1:], right[:, :-1] = w[:, :-1], w[:, 1:]
+    up, down = np.zeros_like(w), np.zeros_like(w)
+    up[1:], down[:-1] = w[:-1], w[1:]
+    up_left, up_right = np.zeros_like(w), np.zeros_like(w)
+    up_left[1:, 1:], up_right[1:, :-1] = w[:-1, :-1], w[:-1, 1:]
+    down_left, down_right = np.zeros_like(w), np.zeros_like(w)
+    down_left[:-1, 1:], down_right[:-1, :-1] = w[1:, :-1], w[1:, 1:]
+    # moving +1 into a cell: forced if a side neighbour is free but the one
+    # diagonally behind it is not (an obstacle just ended beside the path)
+    forced_fwd = w & ((up & ~up_left) | (down & ~down_left))
+    forced_back = w & ((up & ~up_right) | (down & ~down_right))
+    return (~w & left) | forced_fwd, (~w & right) | forced_back
+
+
+def _finds_jump_point(stop, walk):
+    # per cell: does a +1 scan along its row stop on a free cell (a jump
+    # point) rather than on a wall
+    width = walk.shape[1]
+    first = np.where(stop, np.arange(width, dtype=np.int32), np.int32(width - 1))
+    first = np.minimum.accumulate(first[:, ::-1], axis=1)[:, ::-1]   # first stop >= col
+    after = np.full_like(first, width - 1)
+    after[:, :-1] = first[:, 1:]
+    return np.take_along_axis(walk, after, axis=1)
+
+
+def _diagonal_table(walk, jump_point, dr, dc):
+    # steps of a diagonal jump from every cell in direction (dr, dc): k > 0
+    # to the k-th cell where a straight scan finds a jump point, or -k when
+    # the diagonal is blocked after k steps. Filled row by row from the end
+    # the diagonal runs to.
+    w = walk
+    table = np.zeros(w.shape, np.int16)
+    rows = range(w.shape[0] - 2, 0, -1) if dr > 0 else range(1, w.shape[0] - 1)
+    src, dst = (slice(1, None), slice(None, -1)) if dc > 0 else (slice(None, -1), slice(1, None))
+    for r in rows:
+        n = r + dr
+        step = w[r, src] & w[n, dst] & w[n, src]
+        ahead = table[n, src]
+        table[r, dst] = np.where(step, np.where(jump_point[n, src], 1,
+                                                np.where(ahead > 0, ahead + 1, ahead - 1)), 0)
+    return table
+
+
+class JumpTables:
+
+    ARRAYS = ('walk', 'diag', 'row_fwd', 'row_back', 'col_fwd', 'col_back')
+
+    def __init__(self, arrays):
+        self.walk, self.diag = arrays['walk'], arrays['diag']
+        self.row_fwd, self.row_back = arrays['row_fwd'], arrays['row_back']
+        self.col_fwd, self.col_back = arrays['col_fwd'], arrays['col_back']
+        self.rows, self.cols = self.walk.shape   # padded
+        # per table: a memoryview (bisect on it is an order of magnitude
+        # faster than np.searchsorted on a single value, and keeps a cached
+        # table memory-mapped) and where each line starts in it
+        self._lines = {}
+        for horizontal, count, width in ((True, self.rows, self.cols),
+                                         (False, self.cols, self.rows)):
+            for forward in (True, False):
+                table = arrays[('row_' if horizontal else 'col_') + ('fwd' if forward else 'back')]
+                starts = np.searchsorted(table, np.arange(count + 1) * width).tolist()
+                self._lines[horizontal, forward] = memoryview(table), starts, width
+
+    @staticmethod
+    def build(free):
+        walk = np.zeros((free.shape[0] + 2, free.shape[1] + 2), bool)
+        walk[1:-1, 1:-1] = free
+        walk_t = np.ascontiguousarray(walk.T)
+        row_fwd, row_back = _line_tables(walk)
+        col_fwd, col_back = _line_tables(walk_t)
+        # does a straight scan from a cell find a jump point, per direction
+        finds = {
+            (0, 1): _finds_jump_point(row_fwd, walk),
+            (0, -1): _finds_jump_point(row_back[:, ::-1], walk[:, ::-1])[:, ::-1],
+            (1, 0): _finds_jump_point(col_fwd, walk_t).T,
+            (-1, 0): _finds_jump_point(col_back[:, ::-1], walk_t[:, ::-1])[:, ::-1].T,
+        }
+        diag = np.stack([_diagonal_table(walk, finds[0, dc] | finds[dr, 0], dr, dc)
+                         for dr, dc in DIAGONALS])
+        return {'walk': walk, 'diag': diag,
+                'row_fwd': np.flatnonzero(row_fwd).astype(np.int32),
+                'row_back': np.flatnonzero(row_back).astype(np.int32),
+                'col_fwd': np.flatnonzero(col_fwd).astype(np.int32),
+                'col_back': np.flatnonzero(col_back).astype(np.int32)}
+
+    def scan(self, line, pos, step, goal_line, goal_pos, horizontal):
+        # straight jump from (line, pos) along a row (horizontal) or column;
+        # the position of the next jump point, or None when the scan hits a
+        # wall first. Padded coordinates.
+        table, starts, width = self._lines[horizontal, step > 0]
+        base = line * width
+        if step > 0:
+            stop = table[bisect.bisect_right(table, base + pos, starts[line],
+                                             starts[line + 1])] - base
+            if goal_line == line and pos < goal_pos <= stop:
+                return goal_pos
+        else:
+            stop = table[bisect.bisect_left(table, base + pos, starts[line],
+                                            starts[line + 1]) - 1] - base
+            if goal_line == line and stop <= goal_pos < pos:
+                return goal_pos
+        walk = self.walk
+        free = walk[line, stop] if horizontal else walk[stop, line]
+        return stop if free else None
+
+    def jump(self, r, c, dr, dc, goal):
+        # jump from (r, c) in direction (dr, dc): the next jump point or None
+        if dr == 0:
+            stop = self.scan(r, c, dc, goal[0], goal[1], True)
+            return None if stop is None else (r, stop)
+        if dc == 0:
+            stop = self.scan(c, r, dr, goal[1], goal[0], False)
+            return None if stop is None else (stop, c)
+        # diagonal: the precomputed jump, unless the diagonal crosses the
+        # goal's row or column first and a scan from there reaches the goal
+        k = int(self.diag[DIAGONALS.index((dr, dc)), r, c])
+        gr, gc = goal
+        for t in sorted({(gr - r) * dr, (gc - c) * dc}):
+            if 0 < t <= abs(k):
+                y, x = r + t * dr, c + t * dc
+                if ((y, x) == goal or self.scan(y, x, dc, gr, gc, True) is not None
+                        or self.scan(x, y, dr, gc, gr, False) is not None):
+                    return y, x
+        return (r + k * dr, c + k * dc) if k > 0 else None
+
+    def neighbours(self, r, c, parent):
+        # directions worth jumping in from (r, c) reached from parent (pruned)
+        walk = self.walk
+        if parent is None:
+            return [(dr, dc) for dr, dc in DIRECTIONS
+                    if walk[r + dr, c + dc] and (dr == 0 or dc == 0
+                                                 or (walk[r + dr, c] and walk[r, c + dc]))]
+        dr = (r > parent[0]) - (r < parent[0])
+        dc = (c > parent[1]) - (c < parent[1])
+        out = []
+        if dr and dc:
+            side_r, side_c = walk[r + dr, c], walk[r, c + dc]
+            if side_r:
+                out.append((dr, 0))
+            if side_c:
+                out.append((0, dc))
+            if side_r and side_c and walk[r + dr, c + dc]:
+                out.append((dr, dc))
+        elif dc:
+            ahead, top, bottom = walk[r, c + dc], walk[r - 1, c], walk[r + 1, c]
+            if ahead:
+                out.append((0, dc))
+                if top and walk[r - 1, c + dc]:
+                    out.append((-1, dc))
+                if bottom and walk[r + 1, c + dc]:
+                    out.append((1, dc))
+            if top:
+                out.append((-1, 0))
+            if bottom:
+                out.append((1, 0))
+        else:
+            ahead, left, right = walk[r + dr, c], walk[r, c - 1], walk[r, c + 1]
+            if ahead:
+                out.append((dr, 0))
+                if left and walk[r + dr, c - 1]:
+                    out.append((dr, -1))
+                if right and walk[r + dr, c + 1]:
+                    out.append((dr, 1))
+            if left:
+                out.append((0, -1))
+            if right:
+                out.append((0, 1))
+        return out
+
+
+def octile(a, b):
+    dr, dc = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dr, dc) + (SQRT2 - 1.0) * min(dr, dc)
+
+
+def _check(grid, start, goal):
+    start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+    for name, (r, c) in (('start', start), ('goal', goal)):
+        if not grid.inside(r, c):
+            raise PlanError('%s %s is outside the map' % (name, (r, c)))
+        if grid.labels[r, c] == 0:
+            raise PlanError('%s %s is not free (obstacle, unknown or too close to one)'
+                            % (name, (r, c)))
+    if grid.labels[start] != grid.labels[goal]:
+        return None
+    return start, goal
+
+
+def jps(grid, start, goal):
+    # shortest path (list of (row, col) jump points, start and goal included)
+    # between two cells of a prepared GridMap; None if the goal is unreachable
+    cells = _check(grid, start, goal)
+    if cells is None:
+        return None
+    start, goal = cells
+    tables = grid.tables
+    s, g = (start[0] + 1, start[1] + 1), (goal[0] + 1, goal[1] + 1)
+    if s == g:
+        return [start]
+    open_ = [(octile(s, g), 0.0, s)]
+    cost = {s: 0.0}
+    parent = {s: None}
+    while open_:
+        _, d, node = heapq.heappop(open_)
+        if node == g:
+            path = []
+            while node is not None:
+                path.append((node[0] - 1, node[1] - 1))
+                node = parent[node]
+            return path[::-1]
+        if d > cost[node]:
+            continue
+        for dr, dc in tables.neighbours(node[0], node[1], parent[node]):
+            point = tables.jump(node[0], node[1], dr, dc, g)
+            if point is None:
+                continue
+            nd = d + octile(node, point)
+            if nd < cost.get(point, math.inf):
+                cost[point] = nd
+                parent[point] = node
+                heapq.heappush(open_, (nd + octile(point, g), nd, point))
+    return None
+
+
+def astar(grid, start, goal, cost_weight=2.0):
+    # cheapest 8-connected path over the costmap: a step costs its length
+    # times 1 + cost_weight * cost/252, so it keeps clear of walls where it
+    # can. Every cell is expanded in Python: meant for small maps.
+    cells = _check(grid, start, goal)
+    if cells is None:
+        return None
+    start, goal = cells
+    walk = grid.tables.walk
+    penalty = 1.0 + cost_weight * np.minimum(np.asarray(grid.cost, np.float32), 252.0) / 252.0
+    s, g = (start[0] + 1, start[1] + 1), (goal[0] + 1, goal[1] + 1)
+    open_ = [(octile(s, g), 0.0, s)]
+    cost = {s: 0.0}
+    parent = {s: None}
+    while open_:
+        _, d, node = heapq.heappop(open_)
+        if node == g:
+            path = []
+            while node is not None:
+                path.append((node[0] - 1, node[1] - 1))
+                node = parent[node]
+            return path[::-1]
+        if d > cost[node]:
+            continue
+        r, c = node
+        for dr, dc in DIRECTIONS:
+            nr, nc = r + dr, c + dc
+            if not walk[nr, nc] or (dr and dc and not (walk[r + dr, c] and walk[r, c + dc])):
+                continue
+            step = (SQRT2 if dr and dc else 1.0) * penalty[nr - 1, nc - 1]
+            nd = d + step
+            if nd < cost.get((nr, nc), math.inf):
+                cost[(nr, nc)] = nd
+                parent[(nr, nc)] = node
+                heapq.heappush(open_, (nd + octile((nr, nc), g), nd, (nr, nc)))
+    return None
+
+
+def path_length(path):
+    return sum(octile(a, b) for a, b in zip(path, path[1:]))
+
+
+def densify(path):
+    # every cell along a path of jump points (they lie on straight or
+    # diagonal lines), for controllers that want a dense path
+    out = [path[0]]
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        n = max(abs(r1 - r0), abs(c1 - c0))
+        dr, dc = (r1 > r0) - (r1 < r0), (c1 > c0) - (c1 < c0)
+        out.extend((r0 + dr * k, c0 + dc * k) for k in range(1, n + 1))
+    return out
@@ -0,0 +1,87 @@
+from planner_pkg.gridmap import GridMap, INSCRIBED, LETHAL, UNKNOWN, write_map
+from planner_pkg.search import PlanError, astar, densify, jps, path_length
+import numpy as np
+import pytest
+
+
+def room_map(tmp_path, size=60):
+    # a walled room split by a wall with one door, an unknown corner and a
+    # closed-off cell block
+    image = np.full((size, size), 254, np.uint8)
+    image[[0, -1], :] = image[:, [0, -1]] = 0
+    image[:, size // 2] = 0
+    image[size - 12:size - 8, size // 2] = 254          # the door
+    image[1:8, 1:8] = 205
+    image[40:50, 5:15] = 0
+    image[43:47, 8:12] = 254                            # enclosed
+    return write_map(str(tmp_path / 'room.yaml'), image, resolution=0.05, origin=(-1.0, -2.0, 0))
+
+
+def test_load_and_costmap(tmp_path):
+    grid = GridMap.load(room_map(tmp_path))
+    assert (grid.width, grid.height) == (60, 60)
+    assert isinstance(grid.image, np.memmap)
+    assert not grid.prepare(robot_radius=0.1, inflation_radius=0.3)
+    assert grid.cost[0, 0] == LETHAL and grid.cost[3, 3] == UNKNOWN
+    assert grid.cost[10, 29] == INSCRIBED                  # 1 cell from the wall
+    assert 0 < grid.cost[10, 26] < INSCRIBED and grid.cost[10, 15] == 0
+    assert grid.dist[10, 27] == pytest.approx(3.0)
+
+
+def test_world_and_cell_round_trip(tmp_path):
+    grid = GridMap.load(room_map(tmp_path))
+    x, y = grid.to_world(10, 20)
+    assert grid.to_cell(x, y) == (10, 20)
+    assert grid.to_cell(-1.0 + 0.01, -2.0 + 0.01) == (59, 0)    # origin is bottom left
+
+
+def test_jps_matches_astar_and_goes_through_the_door(tmp_path):
+    grid = GridMap.load(room_map(tmp_path))
+    grid.prepare(robot_radius=0.05, inflation_radius=0.05)
+    path = jps(grid, (15, 15), (15, 45))
+    reference = astar(grid, (15, 15), (15, 45), cost_weight=0.0)
+    assert path[0] == (15, 15) and path[-1] == (15, 45)
+    assert path_length(path) == pytest.approx(path_length(reference))
+    cells = densify(path)
+    assert any(col == 30 for _, col in cells)
+    assert all(grid.cost[r, c] < INSCRIBED for r, c in cells)
+
+
+def test_jps_matches_astar_on_random_maps():
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        image = np.where(rng.random((40, 40)) < 0.25, 0, 254).astype(np.uint8)
+        grid = GridMap(image, 0.05)
+        grid.prepare(robot_radius=0.0, inflation_radius=0.0)
+        free = np.argwhere(grid.labels > 0)
+        for _ in range(10):
+            a, b = free[rng.integers(len(free))], free[rng.integers(len(free))]
+            path, reference = jps(grid, a, b), astar(grid, a, b, cost_weight=0.0)
+            assert (path is None) == (reference is None)
+            if path is not None:
+                assert path_length(path) == pytest.approx(path_length(reference))
+
+
+def test_unreachable_and_blocked_goals(tmp_path):
+    grid = GridMap.load(room_map(tmp_path))
+    grid.prepare(robot_radius=0.05, inflation_radius=0.05)
+    assert jps(grid, (15, 15), (45, 10)) is None
+    assert astar(grid, (15, 15), (45, 10)) is None
+    with pytest.raises(PlanError):
+        jps(grid, (15, 15), (0, 0))
+    with pytest.raises(PlanError):
+        jps(grid, (15, 15), (15, 99))
+    assert grid.nearest_free(0, 15) == (2, 15)
+
+
+def test_costmap_is_cached(tmp_path):
+    path = room_map(tmp_path)
+    grid = GridMap.load(path)
+    assert not grid.prepare(cache_dir=str(tmp_path / 'cache'))
+    again = GridMap.load(path)
+    assert again.prepare(cache_dir=str(tmp_path / 'cache'))
+    assert isinstance(again.cost, np.memmap)
+    assert np.array_equal(again.cost, grid.cost)
+    assert jps(again, (15, 15), (15, 45)) == jps(grid, (15, 15), (15, 45))
+    # other parameters are another cache entry
+    assert not GridMap.load(path).prepare(robot_radius=0.2, cache_dir=str(tmp_path / 'cache'))
@@ -3,9 +3,8 @@ import rclpy
 from rclpy.node import Node
 # import the Twist module from geometry_msgs interface
 from geometry_msgs.msg import Twist
-# import the LaserScan module from sensor_msgs interface
-from sensor_msgs.msg import LaserScan
-from rclpy.qos import ReliabilityPolicy, QoSProfile
+# import the /scan subscription helper with selectable QoS and scan-age monitor
+from lidar_pkg.scan_qos import create_scan_subscription
 
 class Subpub(Node):
 
@@ -16,7 +15,8 @@ class Subpub(Node):
         # create the publisher object
         self.publisher_ = self.create_publisher(Twist, 'cmd_vel', 10)
         # create the subscriber object
-        self.subscriber = self.create_subscription(LaserScan, '/scan', self.laser_callback, QoSProfile(depth=10, reliability=ReliabilityPolicy.RELIABLE))
+        # qos_mode parameter: control (default), best_effort or logging
+        self.subscriber, self.scan_age = create_scan_subscription(self, self.laser_callback, default_mode='control')
         # define the timer period for 0.5 seconds
         self.timer_period = 0.5
         # define the variable to save the received info
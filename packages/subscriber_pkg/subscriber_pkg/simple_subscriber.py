@@ -1,10 +1,9 @@
 import rclpy
 # import the ROS2 python libraries
 from rclpy.node import Node
-# import the LaserScan module from sensor_msgs interface
-from sensor_msgs.msg import LaserScan
-# import Quality of Service library, to set the correct profile and reliability to read sensor data.
-from rclpy.qos import ReliabilityPolicy, QoSProfile
+# import the /scan subscription helper, it sets the Quality of Service profile
+# from the qos_mode parameter and measures the age of every received scan.
+from lidar_pkg.scan_qos import create_scan_subscription
 
 
 class SimpleSubscriber(Node):
@@ -15,14 +14,13 @@ class SimpleSubscriber(Node):
         # the parameter you pass is the node name
         super().__init__('simple_subscriber')
         # create the subscriber object
-        # in this case, the subscriptor will be subscribed on /scan topic with a queue size of 10 messages.
-        # use the LaserScan module for /scan topic
+        # in this case, the subscriptor will be subscribed on /scan topic.
+        # this node prints every scan, so it defaults to the reliable 'logging' mode.
         # send the received info to the listener_callback method.
-        self.subscriber = self.create_subscription(
-            LaserScan,
-            '/scan',
+        self.subscriber, self.scan_age = create_scan_subscription(
+            self,
             self.listener_callback,
-            QoSProfile(depth=10, reliability=ReliabilityPolicy.RELIABLE))  # is the most used to read LaserScan data and some sensor data.
+            default_mode='logging')
 
     def listener_callback(self, msg):
         # print the log info in the terminal
@@ -0,0 +1,7 @@
+if [ "$#" -gt 0 ]; then
+    echo "Setting ROS_DOMAIN_ID to $1"
+    export ROS_DOMAIN_ID=$1
+fi
+
+source ./install/setup.bash
+ros2 run patrol_pkg patrol_client
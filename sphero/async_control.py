@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# asyncio front end for the Sphero control stack: many toys, one event loop.
+#
+# spherov2 only has blocking calls (its BLE adapter waits on a private event
+# loop per toy), so AsyncSpheroAPI is a thin adapter around SpheroEduAPI:
+# - every command is a coroutine. The commands of one toy go through one lane
+#   (an asyncio.Lock) and reach the robot in order; different toys run
+#   concurrently.
+# - on the robot the blocking call runs on one worker thread per toy, never
+#   on the event loop. On the simulator there is no thread at all: the toy
+#   collects the BLE latency (SimToy.defer_latency) and the coroutine awaits
+#   it on the clock.
+# - every command has a timeout (asyncio.TimeoutError); control_loop counts
+#   timeouts and dropped links as errors and keeps driving.
+# - cancelling a task drops the commands it has not sent yet. A command in
+#   flight still completes on the robot, and the toy's next command waits
+#   for it.
+# - sensor getters read the streamed values (no BLE) and stay plain methods.
+#
+#   async def main(toys):
+#       async with contextlib.AsyncExitStack() as stack:
+#           apis = [await stack.enter_async_context(AsyncSpheroAPI(t)) for t in toys]
+#           await run_fleet(apis, step, period=0.05, seconds=60)
+#
+#   SPHERO_SIM=1 python async_control.py --toys 10 --seconds 20
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import math
+
+from backend import SpheroEduAPI, scanner, clock as backend_clock
+# fixed-size lateness histogram: a fleet loop may run for hours
+from tracing import Histogram
+
+# read from the sensor stream, no BLE round trip
+SENSORS = ('get_acceleration', 'get_velocity', 'get_location', 'get_distance', 'get_speed',
+           'get_heading', 'get_orientation', 'get_main_led', 'get_front_led', 'get_back_led')
+
+# Python 3.11+: a timeout without wait_for's extra task per command
+_timeout = getattr(asyncio, 'timeout', None)
+
+# late: tracing.Histogram of how far each tick ended after its deadline (s)
+LoopStats = collections.namedtuple('LoopStats', 'name ticks late overruns errors')
+
+
+class AsyncSpheroAPI:
+
+    def __init__(self, toy, timeout=1.0, clock=None):
+        self.toy = toy
+        self.timeout = timeout
+        # simulated toys carry their own clock
+        self.clock = clock or getattr(toy, 'clock', None) or backend_clock
+        self._api = SpheroEduAPI(toy)
+        self._lane = asyncio.Lock()
+        # the simulator defers its latency to us; a real toy gets a worker thread
+        self._native = hasattr(toy, 'defer_latency')
+        if self._native:
+            toy.defer_latency = True
+            self._executor = None
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix=toy.name)
+
+    async def __aenter__(self):
+        # connecting takes seconds on BLE: no command timeout
+        await self._call('__enter__', (), None)
+        return self
+
+    async def __aexit__(self, *args):
+        try:
+            await self._call('__exit__', (None, None, None), None)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name in SENSORS or not callable(attr):
+            return attr
+
+        async def command(*args, timeout=None):
+            return await self._call(name, args, self.timeout if timeout is None else timeout)
+        command.__name__ = name
+        return command
+
+    async def roll(self, heading, speed, duration):
+        # SpheroEduAPI.roll sleeps on the calling thread; here the wait is awaited
+        await self.set_heading(heading)
+        await self.set_speed(speed)
+        await self.clock.asleep(duration)
+        await self.stop_roll()
+
+    async def _call(self, name, args, timeout):
+        # timeout None: wait as long as it takes
+        async with self._lane:
+            if timeout is None:
+                return await self._invoke(name, args)
+            if _timeout is not None:
+                async with _timeout(timeout):
+                    return await self._invoke(name, args)
+            return await asyncio.wait_for(self._invoke(name, args), timeout)
+
+    async def _invoke(self, name, args):
+        fn = getattr(self._api, name)
+        if not self._native:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        try:
+            result = fn(*args)
+        finally:
+            # the round trip (or the dead link's timeout) the simulator skipped
+            await self.clock.asleep(self.toy.take_delay())
+        return result
+
+
+async def control_loop(api, step, period=0.05, seconds=None, stop=None, clock=None):
+    """await step(api, tick) every period on absolute deadlines; a tick that is
+    a whole period late skips the missed ones. Returns LoopStats."""
+    clock = clock or api.clock
+    start = deadline = clock.perf_counter()
+    late, overruns, errors, tick = Histogram(), 0, 0, 0
+    while not (stop is not None and stop.is_set()):
+        if seconds is not None and deadline - start >= seconds:
+            break
+        try:
+            await step(api, tick)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            errors += 1
+            print(f"{api.toy.name}: {type(e).__name__} {e}")
+        tick += 1
+        deadline += period
+        now = clock.perf_counter()
+        if now - deadline > period:
+            overruns += 1
+            deadline = now
+        elif now < deadline:
+            await clock.asleep(deadline - now)
+        late.add(max(0.0, clock.perf_counter() - deadline))
+    return LoopStats(api.toy.name, tick, late, overruns, errors)
+
+
+async def sensor_loop(api, callback, period=0.1, stop=None):
+    """callback(name, velocity, location) every period until cancelled or stop is set."""
+    while not (stop is not None and stop.is_set()):
+        callback(api.toy.name, api.get_velocity(), api.get_location())
+        await api.clock.asleep(period)
+
+
+async def run_fleet(apis, step, period=0.05, seconds=None, stop=None):
+    """Drive all apis concurrently; a toy that fails does not stop the others.
+    Returns one LoopStats (or the exception) per api."""
+    return await asyncio.gather(*(control_loop(api, step, period, seconds, stop) for api in apis),
+                                return_exceptions=True)
+
+
+async def circle_step(api, tick):
+    # demo: every toy drives a slow circle, heading and speed each tick
+    await api.set_heading((tick * 5) % 360)
+    await api.set_speed(60)
+
+
+async def _demo(names, period, seconds):
+    toys = [scanner.find_toy(toy_name=name) for name in names]
+    async with contextlib.AsyncExitStack() as stack:
+        apis = [await stack.enter_async_context(AsyncSpheroAPI(toy)) for toy in toys]
+        speeds = {}
+
+        def on_sample(name, velocity, location):
+            speeds[name] = math.hypot(velocity['x'], velocity['y'])
+        sensors = [asyncio.ensure_future(sensor_loop(api, on_sample)) for api in apis]
+        try:
+            results = await run_fleet(apis, circle_step, period, seconds)
+        finally:
+            for task in sensors:
+                task.cancel()
+            for api in apis:
+                await api.stop_roll()
+    for r in results:
+        if isinstance(r, Exception):
+            print(f"failed: {r!r}")
+            continue
+        print(f"{r.name}: {r.ticks} ticks, p95 late {r.late.percentile(0.95) * 1e3:.1f} ms, "
+              f"{r.overruns} overruns, {r.errors} errors, {speeds.get(r.name, 0):.0f} cm/s")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sphero BOLT — drive several toys from one asyncio loop")
+    p.add_argument("names", nargs="*", help="toy names (default: the first --toys the scanner finds)")
+    p.add_argument("--toys", type=int, default=2)
+    p.add_argument("--period", type=float, default=0.1)
+    p.add_argument("--seconds", type=float, default=10.0)
+    args = p.parse_args()
+    names = args.names or [t.name for t in scanner.find_toys()][:args.toys]
+    asyncio.run(_demo(names, args.period, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Picks the Sphero stack for the scripts in this folder:
+# - default: the real spherov2 BLE stack and the time module
+# - SPHERO_SIM=1: the headless simulator (simulator.py) and its virtual clock,
+#   e.g.  SPHERO_SIM=1 SPHERO_SIM_SPEEDUP=100 python race.py --name SB-9DD8
+#
+# Scripts import scanner / SpheroEduAPI / EventType / Power from here and use
+# clock.time(), clock.perf_counter() and clock.sleep() instead of the time
+# module, so a simulated run can go faster than real time. Background threads
+# that only watch the robot use clock.wait() (see simulator.VirtualClock).
+import asyncio
+import os
+import time
+
+
+class RealClock:
+    # the time module plus wait(), which is a plain sleep on real time
+    perf_counter = staticmethod(time.perf_counter)
+    monotonic = staticmethod(time.monotonic)
+    sleep = staticmethod(time.sleep)
+    wait = staticmethod(time.sleep)
+    asleep = staticmethod(asyncio.sleep)  # for coroutines, see async_control.py
+    time = staticmethod(time.time)  # last: hides the module in this class body
+
+
+SIMULATED = os.getenv('SPHERO_SIM', '') not in ('', '0')
+
+if SIMULATED:
+    # pygame still gets initialised by the scripts; keep it off the screen
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import simulator
+    from simulator import scanner, SpheroEduAPI, Power, SimJoystick, EventType
+    clock = simulator.default_clock
+else:
+    from spherov2 import scanner
+    from spherov2.sphero_edu import SpheroEduAPI, EventType
+    from spherov2.commands.power import Power
+    SimJoystick = None
+    clock = RealClock()
@@ -0,0 +1,234 @@
+# One battery service per toy instead of each script polling
+# Power.get_battery_voltage on its control path.
+#
+# BatteryMonitor reads the voltage on a background thread every `period`
+# seconds, smooths it with an EWMA (motor load makes single readings sag),
+# fits the discharge slope over the last `window` seconds and publishes an
+# immutable BatteryStatus. Readers only take the current `status` reference:
+# no lock, no BLE, nothing that can stall a control loop. Consumers that need
+# to act on the robot (front LED colour) compare status.state with the last
+# one they applied and do the BLE call on their own thread.
+#
+# When the smoothed voltage reaches CRITICAL_V, on_critical(status) is called
+# once, so a controller can stop its loop and park the robot instead of
+# exiting the process from the middle of a BLE session. It is armed again
+# when the voltage is back above CRITICAL_V + REARM_V (recharged or swapped
+# ball in a long-running process).
+#
+# battery_monitor() shares one monitor per toy name and counts its users;
+# every user calls release() when its session ends, and the last one stops
+# the polling thread.
+#
+# A supervised controller (supervisor.py) gets the monitor in on_connect,
+# once the toy is connected, and calls resume() there: that reads the battery
+# straight away, so a critical battery stops the controller before it drives.
+# pause() from on_disconnect stops the reads until the next resume(), instead
+# of timing out on a dead link every period.
+#
+#   monitor = battery_monitor(toy, on_critical=controller.on_battery_critical, paused=True)
+#   monitor.resume(toy)       # in on_connect
+#   ...
+#   s = monitor.status        # s.voltage, s.state, s.minutes_left
+#   ...
+#   monitor.release()
+import collections
+import threading
+
+from spherov2.types import Color
+
+from backend import Power, clock as backend_clock
+from tracing import tracer
+
+CRITICAL_V = 3.5
+REARM_V = 0.1
+# (lowest smoothed voltage, state, front LED colour); below the last: critical
+LEVELS = [
+    (4.1, "green", Color(0, 255, 0)),
+    (3.9, "yellow", Color(255, 255, 0)),
+    (3.7, "orange", Color(255, 100, 0)),
+    (CRITICAL_V, "red", Color(255, 0, 0)),
+]
+CRITICAL_COLOR = Color(255, 0, 0)
+
+BatteryStatus = collections.namedtuple(
+    "BatteryStatus", "voltage raw state minutes_left slope samples stamp")
+UNKNOWN = BatteryStatus(None, None, "unknown", None, None, 0, None)
+
+
+def battery_state(voltage):
+    if voltage is None:
+        return "unknown"
+    for low, state, _ in LEVELS:
+        if voltage > low:
+            return state
+    return "critical"
+
+
+def state_color(state):
+    for _, name, color in LEVELS:
+        if name == state:
+            return color
+    return CRITICAL_COLOR
+
+
+def discharge_slope(points):
+    """Least squares volts per second of [(t, volts), ...], None if too short."""
+    n = len(points)
+    if n < 3:
+        return None
+    mt = sum(t for t, _ in points) / n
+    mv = sum(v for _, v in points) / n
+    var = sum((t - mt) ** 2 for t, _ in points)
+    if var <= 0:
+        return None
+    return sum((t - mt) * (v - mv) for t, v in points) / var
+
+
+class BatteryMonitor:
+
+    def __init__(self, toy, period=30.0, alpha=0.3, window=900.0, critical=CRITICAL_V,
+                 rearm=REARM_V, on_critical=None, read=None, clock=None, log=print, paused=False):
+        self.toy = toy
+        self.period = period
+        self.alpha = alpha
+        self.window = window
+        self.critical = critical
+        self.rearm = rearm
+        self.on_critical = on_critical
+        self.read = read or Power.get_battery_voltage
+        # simulated toys carry their own clock
+        self.clock = clock or getattr(toy, "clock", None) or backend_clock
+        self.log = log
+        self.status = UNKNOWN
+        self.reads = 0
+        self.errors = 0
+        self._history = collections.deque()
+        self._lock = threading.Lock()
+        self._critical_sent = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.users = 0
+        # no reads while the link is down, see pause()/resume()
+        self.paused = paused
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, join=True):
+        # without join the thread ends after its current wait, without reading again
+        self._stop.set()
+        if join and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def release(self):
+        """One user of a shared monitor is done; the last one stops it."""
+        with _monitors_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            name = getattr(self.toy, "name", str(self.toy))
+            if _monitors.get(name) is self:
+                del _monitors[name]
+        self.stop(join=False)
+
+    def pause(self):
+        # the link is gone: the polling thread skips its reads until resume()
+        self.paused = True
+
+    def resume(self, toy=None):
+        """(Re)connected: read toy (or the current one) now and poll again; returns the status."""
+        if toy is not None:
+            self.rebind(toy)
+        self.paused = False
+        return self.sample()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.paused:
+                self.sample()
+            self.clock.wait(self.period)
+
+    def sample(self):
+        """One BLE read, folded into the published status; returns the status."""
+        try:
+            with tracer.span('battery'):
+                raw = float(self.read(self.toy))
+        except Exception as e:
+            self.errors += 1
+            self.log(f"Battery read error ({getattr(self.toy, 'name', '?')}): {e}")
+            return self.status
+        with self._lock:
+            status = self._fold(raw)
+        if status.voltage <= self.critical and not self._critical_sent:
+            self._critical_sent = True
+            if self.on_critical is not None:
+                self.on_critical(status)
+        elif status.voltage > self.critical + self.rearm:
+            self._critical_sent = False
+        return status
+
+    def _fold(self, raw):
+        self.reads += 1
+        now = self.clock.perf_counter()
+        previous = self.status.voltage
+        voltage = raw if previous is None else previous + self.alpha * (raw - previous)
+        history = self._history
+        history.append((now, voltage))
+        while history and now - history[0][0] > self.window:
+            history.popleft()
+        slope = discharge_slope(history)
+        minutes = None
+        if slope is not None and slope < 0:
+            minutes = max(0.0, (voltage - self.critical) / -slope / 60.0)
+        status = BatteryStatus(voltage, raw, battery_state(voltage), minutes, slope,
+                               self.status.samples + 1, now)
+        self.status = status  # one reference swap: readers never see half an update
+        return status
+
+    def rebind(self, toy):
+        # the supervisor rescanned: read the new toy object from now on
+        self.toy = toy
+
+    def describe(self):
+        s = self.status
+        if s.voltage is None:
+            return "battery unknown"
+        text = f"{s.voltage:.2f} V {s.state}"
+        if s.minutes_left is not None:
+            text += f", ~{s.minutes_left:.0f} min left"
+        return text
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def battery_monitor(toy, **kwargs):
+    """The shared, started monitor of a toy (one per toy name in this process).
+
+    Every call counts as a user until release().
+
+    A new on_critical replaces the one of an existing monitor, and is called
+    straight away if the battery is already critical. A new toy object with
+    the same name (after a rescan) replaces the one the monitor reads.
+    paused only applies to a new monitor; resume() starts the reads."""
+    name = getattr(toy, "name", str(toy))
+    on_critical = kwargs.get("on_critical")
+    with _monitors_lock:
+        monitor = _monitors.get(name)
+        if monitor is None:
+            monitor = _monitors[name] = BatteryMonitor(toy, **kwargs)
+        else:
+            if monitor.toy is not toy:
+                monitor.rebind(toy)
+            if on_critical is not None:
+                monitor.on_critical = on_critical
+                status = monitor.status
+                if status.voltage is not None and status.voltage <= monitor.critical:
+                    on_critical(status)
+        monitor.users += 1
+    return monitor.start()
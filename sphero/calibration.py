@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Speed calibration for race.py: speed command -> cm/s, including ramp losses.
+#
+# For every test speed the toy drives the same ramp/cruise/brake profile as
+# race.gentle_roll for a short and a longer duration (back and forth, so it
+# stays on the table). The locator gives the distance of each run; since only
+# the cruise part grows with the duration, distance = cmps * seconds - loss,
+# and a straight line fit gives both numbers. The velocity sensor is sampled
+# during the runs as a cross check.
+#
+# Results are stored per toy and per surface in speed_calibration.json:
+#   python calibration.py --name SB-9DD8 --surface parquet
+# race.py picks the fitted model up automatically (see --surface there).
+import argparse
+import datetime
+import json
+import math
+import os
+import threading
+
+from backend import clock
+
+CALIBRATION_FILE = "speed_calibration.json"
+CALIBRATION_SPEEDS = (30, 50, 70, 100, 150, 200)
+CALIBRATION_DURATIONS = (1.2, 2.4)
+
+
+class SpeedModel:
+    """Piecewise linear speed -> (cm/s, ramp loss cm) from calibration points."""
+
+    def __init__(self, points):
+        # points: [(speed, cmps, ramp_loss_cm), ...]
+        self.points = sorted(points)
+        if not self.points:
+            raise ValueError("SpeedModel needs at least one calibration point")
+
+    def _interpolate(self, speed, column):
+        pts = self.points
+        if len(pts) == 1:
+            return pts[0][column]
+        # linear inside the calibrated range, extend the nearest segment outside
+        for lo, hi in zip(pts, pts[1:]):
+            if speed <= hi[0] or hi is pts[-1]:
+                f = (speed - lo[0]) / (hi[0] - lo[0])
+                return lo[column] + f * (hi[column] - lo[column])
+
+    def cmps(self, speed):
+        return max(1.0, self._interpolate(speed, 1))
+
+    def ramp_loss(self, speed):
+        return max(0.0, self._interpolate(speed, 2))
+
+    def seconds_for_distance(self, dist_cm, speed):
+        return max(0.0, (dist_cm + self.ramp_loss(speed)) / self.cmps(speed))
+
+    def to_dict(self):
+        return {"speeds": [p[0] for p in self.points],
+                "cmps": [p[1] for p in self.points],
+                "ramp_loss_cm": [p[2] for p in self.points]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(list(zip(data["speeds"], data["cmps"], data["ramp_loss_cm"])))
+
+
+def fit_line(durations, distances):
+    """Least squares distance = cmps * duration - loss, returns (cmps, loss)."""
+    n = len(durations)
+    if n < 2:
+        raise ValueError("need runs with at least two durations")
+    mt = sum(durations) / n
+    md = sum(distances) / n
+    var = sum((t - mt) ** 2 for t in durations)
+    cmps = sum((t - mt) * (d - md) for t, d in zip(durations, distances)) / var
+    return cmps, cmps * mt - md
+
+
+class VelocitySampler:
+    """Polls api.get_velocity() in the background during a test run."""
+
+    def __init__(self, api, period=0.05):
+        self.api = api
+        self.period = period
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            v = self.api.get_velocity()
+            if v is not None:
+                self.samples.append(math.hypot(v["x"], v["y"]))
+            clock.wait(self.period)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+    def plateau(self):
+        # mean of the upper half of the samples: the cruise velocity
+        top = sorted(self.samples)[len(self.samples) // 2:]
+        return sum(top) / len(top) if top else 0.0
+
+
+def distance_moved(start, end):
+    return math.hypot(end["x"] - start["x"], end["y"] - start["y"])
+
+
+def calibrate(api, drive, speeds=CALIBRATION_SPEEDS, durations=CALIBRATION_DURATIONS,
+              heading=0, settle=0.6, log=print):
+    """Drive test runs with drive(api, heading, speed, seconds) and fit a SpeedModel."""
+    points = []
+    direction = 0
+    for speed in speeds:
+        runs = []
+        plateaus = []
+        for seconds in durations:
+            clock.sleep(settle)  # start each run standing still
+            start = api.get_location()
+            with VelocitySampler(api) as sampler:
+                drive(api, (heading + direction) % 360, speed, seconds)
+                clock.sleep(settle)
+            runs.append(distance_moved(start, api.get_location()))
+            plateaus.append(sampler.plateau())
+            direction = 180 - direction  # come back on the next run
+        cmps, loss = fit_line(durations, runs)
+        log(f"speed {speed:3d}: {cmps:6.1f} cm/s, ramp loss {loss:5.1f} cm "
+            f"(velocity sensor {max(plateaus):6.1f} cm/s)")
+        points.append((speed, cmps, loss))
+    return SpeedModel(points)
+
+
+def _load_all(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def load_model(toy_name, surface, path=CALIBRATION_FILE):
+    entry = _load_all(path).get(toy_name, {}).get(surface)
+    return SpeedModel.from_dict(entry) if entry else None
+
+
+def save_model(model, toy_name, surface, path=CALIBRATION_FILE):
+    data = _load_all(path)
+    entry = model.to_dict()
+    entry["date"] = datetime.datetime.now().isoformat(timespec="seconds")
+    data.setdefault(toy_name, {})[surface] = entry
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    from race import find_toy, gentle_roll
+    from backend import SpheroEduAPI
+
+    p = argparse.ArgumentParser(description="Sphero BOLT — speed calibration for race.py")
+    p.add_argument("--name", required=True, help="toy name or MAC (ex: SB-9DD8)")
+    p.add_argument("--surface", default="default", help="floor the calibration is valid for")
+    p.add_argument("--speeds", default=",".join(str(s) for s in CALIBRATION_SPEEDS),
+                   help="speeds to test, comma separated")
+    p.add_argument("--file", default=CALIBRATION_FILE, help="calibration file")
+    args = p.parse_args()
+
+    toy = find_toy(args.name)
+    if toy is None:
+        print(f"NO BOLT '{args.name}'")
+        return
+    speeds = [int(s) for s in args.speeds.split(",") if s.strip()]
+    with SpheroEduAPI(toy) as api:
+        api.set_stabilization(True)
+        model = calibrate(api, gentle_roll, speeds)
+    save_model(model, toy.name, args.surface, args.file)
+    print(f"Saved calibration for {toy.name} on '{args.surface}' to {args.file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# Course files for race.py, compiled once into cached command plans.
+#
+# A course is a YAML or JSON file with either waypoints (cm, x to the right,
+# y down like on parcour.png; heading 0 = right, 90 = down, as in race.py):
+#
+#   name: ring
+#   waypoints: [[0, 0], [200, 0], [200, 200], ...]
+#   area: [500, 300]          # optional: the table the course has to fit on
+#
+# or explicit segments: `segments: [{cm: 200, heading: 0}, ...]`.
+#
+# compile_plan() turns a course into the exact (heading, speed, seconds)
+# phases race.py sends for a given speed and speed model. Plans are stored in
+# course_cache/ under a key made of the course geometry hash, the speed and
+# the calibration, so starting a run only loads a JSON file:
+#   python course.py compile courses/ring.yaml --speed 70 --name SB-9DD8 --surface parquet
+#   python race.py --name SB-9DD8 --course courses/ring.yaml --surface parquet
+# A course can be traced by clicking on a photo of the track:
+#   python course.py trace parcour.png courses/new.yaml --scale 0.45
+import argparse
+import hashlib
+import json
+import math
+import os
+
+from race import BRAKE, RAMP, segment_phases, seconds_for_distance
+
+COURSE_CACHE_DIR = "course_cache"
+PLAN_VERSION = 1
+MIN_SEGMENT_CM = 1.0
+
+
+class CourseError(ValueError):
+    """A course file that cannot be driven."""
+
+
+class Course:
+    """Validated course: (heading, cm) segments plus an optional table size."""
+
+    def __init__(self, name, segments, area=None, source=None):
+        self.name = name
+        self.segments = segments
+        self.area = area
+        self.source = source
+
+    @property
+    def length_cm(self):
+        return sum(cm for _, cm in self.segments)
+
+    def geometry_hash(self):
+        # only what changes the commands: renaming or reformatting a file keeps its plans
+        canonical = json.dumps([[h, round(cm, 3)] for h, cm in self.segments])
+        return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+    def waypoints(self, start=(0.0, 0.0)):
+        x, y = start
+        points = [(x, y)]
+        for heading, cm in self.segments:
+            x += cm * math.cos(math.radians(heading))
+            y += cm * math.sin(math.radians(heading))
+            points.append((x, y))
+        return points
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise CourseError(f"{what}: expected a number, got {value!r}")
+    return float(value)
+
+
+def segments_from_waypoints(waypoints):
+    if not isinstance(waypoints, list) or len(waypoints) < 2:
+        raise CourseError("a course needs at least two waypoints")
+    points = []
+    for i, p in enumerate(waypoints):
+        if not isinstance(p, (list, tuple)) or len(p) != 2:
+            raise CourseError(f"waypoint {i}: expected [x, y], got {p!r}")
+        points.append((_number(p[0], f"waypoint {i} x"), _number(p[1], f"waypoint {i} y")))
+    segments = []
+    for i, ((x0, y0), (x1, y1)) in enumerate(zip(points, points[1:])):
+        cm = math.hypot(x1 - x0, y1 - y0)
+        if cm < MIN_SEGMENT_CM:
+            raise CourseError(f"waypoints {i} and {i + 1} are {cm:.2f} cm apart")
+        heading = round(math.degrees(math.atan2(y1 - y0, x1 - x0))) % 360
+        segments.append((heading, cm))
+    return segments
+
+
+def merge_straight(segments):
+    """Join consecutive segments with the same heading (traced courses have many)."""
+    merged = []
+    for heading, cm in segments:
+        if merged and merged[-1][0] == heading:
+            merged[-1] = (heading, merged[-1][1] + cm)
+        else:
+            merged.append((heading, cm))
+    return merged
+
+
+def course_from_dict(data, name="course", source=None):
+    if not isinstance(data, dict):
+        raise CourseError("a course file must contain a mapping")
+    name = str(data.get("name", name))
+    if ("waypoints" in data) == ("segments" in data):
+        raise CourseError(f"{name}: define either 'waypoints' or 'segments'")
+    if "waypoints" in data:
+        segments = segments_from_waypoints(data["waypoints"])
+    else:
+        raw = data["segments"]
+        if not isinstance(raw, list) or not raw:
+            raise CourseError(f"{name}: 'segments' must be a non-empty list")
+        segments = []
+        for i, s in enumerate(raw):
+            if not isinstance(s, dict) or set(s) != {"cm", "heading"}:
+                raise CourseError(f"segment {i}: expected {{cm, heading}}, got {s!r}")
+            cm = _number(s["cm"], f"segment {i} cm")
+            if cm < MIN_SEGMENT_CM:
+                raise CourseError(f"segment {i}: {cm:.2f} cm is too short")
+            segments.append((round(_number(s["heading"], f"segment {i} heading")) % 360, cm))
+    course = Course(name, merge_straight(segments), source=source)
+    if "area" in data:
+        area = data["area"]
+        if not isinstance(area, (list, tuple)) or len(area) != 2:
+            raise CourseError(f"{name}: 'area' must be [width, height] in cm")
+        course.area = (_number(area[0], "area width"), _number(area[1], "area height"))
+        xs, ys = zip(*course.waypoints())
+        width, height = max(xs) - min(xs), max(ys) - min(ys)
+        if width > course.area[0] or height > course.area[1]:
+            raise CourseError(f"{name}: course is {width:.0f}x{height:.0f} cm, "
+                              f"area is {course.area[0]:.0f}x{course.area[1]:.0f} cm")
+    return course
+
+
+def course_from_segments(segments_cm, headings, name="race.py"):
+    """The SEGMENTS_CM / HEADINGS constants of race.py as a course."""
+    if len(segments_cm) != len(headings):
+        raise CourseError(f"{len(segments_cm)} distances for {len(headings)} headings")
+    return course_from_dict({"name": name, "segments": [{"cm": d, "heading": h}
+                                                        for d, h in zip(segments_cm, headings)]})
+
+
+def load_course(path):
+    with open(path, "r") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise CourseError(f"{path}: PyYAML is needed for YAML courses (pip install pyyaml)")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    return course_from_dict(data, os.path.splitext(os.path.basename(path))[0], path)
+
+
+def save_course(course, path):
+    points = [[round(x, 1), round(y, 1)] for x, y in course.waypoints()]
+    data = {"name": course.name, "waypoints": points}
+    if course.area:
+        data["area"] = list(course.area)
+    with open(path, "w") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            yaml.safe_dump(data, f, default_flow_style=None, sort_keys=False)
+        else:
+            json.dump(data, f, indent=2)
+
+
+class CommandPlan:
+    """Per segment: heading, distance and the (heading, speed, seconds) phases to send."""
+
+    def __init__(self, key, course, speed, segments, warnings=()):
+        self.key = key
+        self.course = course
+        self.speed = speed
+        self.segments = segments
+        self.warnings = list(warnings)
+
+    @property
+    def seconds(self):
+        return sum(d for _, _, phases in self.segments for _, _, d in phases)
+
+    def to_dict(self):
+        return {"version": PLAN_VERSION, "key": self.key, "course": self.course, "speed": self.speed,
+                "warnings": self.warnings,
+                "segments": [{"heading": h, "cm": cm, "phases": [list(p) for p in phases]}
+                             for h, cm, phases in self.segments]}
+
+    @classmethod
+    def from_dict(cls, data):
+        segments = [(s["heading"], s["cm"], [tuple(p) for p in s["phases"]]) for s in data["segments"]]
+        return cls(data["key"], data["course"], data["speed"], segments, data.get("warnings", ()))
+
+
+def calibration_id(model=None, cmps=None):
+    # what the distance -> time conversion depends on; the save date is left out
+    if model is not None:
+        return model.to_dict()
+    return {"cmps": float(cmps)}
+
+
+def plan_key(course, speed_pct, model=None, cmps=None):
+    data = {"course": course.geometry_hash(), "speed": speed_pct, "calibration": calibration_id(model, cmps),
+            "ramp": RAMP, "brake": BRAKE, "version": PLAN_VERSION}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:20]
+
+
+def compile_plan(course, speed_pct, model=None, cmps=None):
+    if not 10 <= speed_pct <= 100:
+        raise CourseError(f"speed {speed_pct} outside 10-100")
+    if model is None and cmps is None:
+        raise CourseError("compile_plan needs a speed model or a constant cm/s")
+    segments, warnings = [], []
+    for i, (heading, cm) in enumerate(course.segments):
+        secs = seconds_for_distance(cm, cmps, model, speed_pct)
+        if secs < 2 * RAMP:
+            # the ramps alone are longer than the segment: it will be overshot
+            warnings.append(f"segment {i} ({cm:.0f} cm @ {heading}°) is shorter than the ramps "
+                            f"at speed {speed_pct}")
+        segments.append((heading, cm, segment_phases(heading, speed_pct, secs)))
+    return CommandPlan(plan_key(course, speed_pct, model, cmps), course.name, speed_pct, segments, warnings)
+
+
+def plan_path(key, cache_dir=COURSE_CACHE_DIR):
+    return os.path.join(cache_dir, key + ".json")
+
+
+def load_plan(course, speed_pct, model=None, cmps=None, cache_dir=COURSE_CACHE_DIR):
+    """Cached plan for this course, speed and calibration; compiled and stored on a miss.
+
+    Returns (plan, cached)."""
+    path = plan_path(plan_key(course, speed_pct, model, cmps), cache_dir)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") == PLAN_VERSION:
+            return CommandPlan.from_dict(data), True
+    except (OSError, ValueError, KeyError):
+        pass
+    plan = compile_plan(course, speed_pct, model, cmps)
+    save_plan(plan, cache_dir)
+    return plan, False
+
+
+def save_plan(plan, cache_dir=COURSE_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = plan_path(plan.key, cache_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(plan.to_dict(), f)
+    os.replace(tmp, path)  # a run started meanwhile never reads half a plan
+    return path
+
+
+def trace(image_path, scale):
+    """Click waypoints on a photo of the track; returns them in cm.
+
+    Left click adds a point, right click removes the last one, Enter/q ends."""
+    import cv2
+
+    image = cv2.imread(image_path)
+    if image is None:
+        raise CourseError(f"cannot read {image_path}")
+    points = []
+
+    def on_mouse(event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            points.append((x, y))
+        elif event == cv2.EVENT_RBUTTONDOWN and points:
+            points.pop()
+
+    cv2.namedWindow("trace")
+    cv2.setMouseCallback("trace", on_mouse)
+    while True:
+        view = image.copy()
+        for a, b in zip(points, points[1:]):
+            cv2.line(view, a, b, (0, 255, 255), 2)
+        for p in points:
+            cv2.circle(view, p, 5, (0, 0, 255), -1)
+        cv2.imshow("trace", view)
+        if cv2.waitKey(30) & 0xFF in (13, 10, ord("q")):
+            break
+    cv2.destroyAllWindows()
+    x0, y0 = points[0] if points else (0, 0)
+    return [[(x - x0) * scale, (y - y0) * scale] for x, y in points]
+
+
+def main():
+    from calibration import load_model
+
+    p = argparse.ArgumentParser(description="Sphero BOLT — course files for race.py")
+    sub = p.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("check", help="validate a course and print its segments")
+    c.add_argument("course")
+    c = sub.add_parser("compile", help="precompile the command plan of a course")
+    c.add_argument("course")
+    c.add_argument("--speed", type=int, default=70)
+    c.add_argument("--name", help="toy whose speed calibration is used")
+    c.add_argument("--surface", default="default")
+    c.add_argument("--cmps", type=float, help="constant cm/s instead of the calibration")
+    c = sub.add_parser("trace", help="click waypoints on a photo of the track")
+    c.add_argument("image")
+    c.add_argument("output", help="course file to write (.yaml or .json)")
+    c.add_argument("--scale", type=float, required=True, help="cm per pixel")
+    args = p.parse_args()
+
+    try:
+        if args.command == "trace":
+            course = course_from_dict({"name": os.path.splitext(os.path.basename(args.output))[0],
+                                       "waypoints": trace(args.image, args.scale)})
+            save_course(course, args.output)
+            print(f"{args.output}: {len(course.segments)} segments, {course.length_cm:.0f} cm")
+            return
+        course = load_course(args.course)
+        if args.command == "check":
+            for heading, cm in course.segments:
+                print(f"{cm:7.1f} cm @ {heading:3d}°")
+            print(f"{course.name}: {len(course.segments)} segments, {course.length_cm:.0f} cm, "
+                  f"hash {course.geometry_hash()}")
+            return
+        model = load_model(args.name, args.surface) if args.name and args.cmps is None else None
+        if model is None and args.cmps is None:
+            raise CourseError(f"no calibration for {args.name} on '{args.surface}', give --cmps")
+        plan, cached = load_plan(course, args.speed, model, args.cmps)
+        for warning in plan.warnings:
+            print(f"⚠️  {warning}")
+        print(f"{course.name} @ {args.speed}: {plan.seconds:.2f} s planned, "
+              f"{'already cached' if cached else 'compiled'} as {plan_path(plan.key)}")
+    except CourseError as e:
+        raise SystemExit(f"Course error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Joystick response curves, compiled into lookup tables.
+#
+# A curve maps the stick position to (heading offset, throttle): the offset
+# in degrees from "forward" (the stick angle, optionally snapped to the nearest
+# multiple of `snap`), the throttle 0..1 that scales the preset speed, or None
+# inside the deadzone. Deadzone shapes:
+#   radial  nothing within `deadzone` of the centre, throttle = distance
+#           (the original driveWithJoystick behaviour)
+#   scaled  radial, but the throttle starts from 0 at the deadzone edge
+#   axial   each axis ignored under `deadzone`: easier straight lines
+# `expo` blends in a cubic for finer control at low speed.
+#
+# The curve is evaluated once per quantized stick position (steps + 1 values
+# per axis, pygame gives 16 bits) into a flat table, so the control loop does
+# two roundings and one list index per tick instead of hypot/atan2/degrees
+# and the deadzone branch. The default 'linear' profile is the original math
+# and skips the table (table=False): the quantization would move the
+# deadzone edge and the heading by up to 1.5 degrees, and the plain radial
+# curve is as cheap to compute as to look up.
+# Tables are cached per profile; swapping a player's curve is assigning a
+# different ResponseCurve, safe while the loop runs.
+#
+#   curve = curves.curve('expo')
+#   mapped = curve.map(X, Y)          # None or (heading offset, throttle)
+#
+#   python curves.py expo             # throttle and heading along the stick
+import argparse
+import functools
+import math
+
+RADIAL, SCALED, AXIAL = 'radial', 'scaled', 'axial'
+STEPS = 256
+
+PROFILES = {
+    'linear': dict(deadzone=0.2, table=False),
+    'expo': dict(deadzone=0.12, shape=SCALED, expo=0.6),
+    'precise': dict(deadzone=0.1, shape=SCALED, expo=0.9),
+    'snap': dict(deadzone=0.2, shape=AXIAL, snap=45.0, snap_window=12.0),
+}
+DEFAULT_PROFILE = 'linear'
+
+
+class ResponseCurve:
+
+    def __init__(self, name='custom', deadzone=0.2, shape=RADIAL, expo=0.0, snap=0.0, snap_window=0.0,
+                 steps=STEPS, table=True):
+        if shape not in (RADIAL, SCALED, AXIAL):
+            raise ValueError(f"unknown deadzone shape {shape!r}")
+        if not 0.0 <= deadzone < 1.0 or not 0.0 <= expo <= 1.0 or steps % 2:
+            raise ValueError("deadzone must be in [0, 1), expo in [0, 1] and steps even")
+        self.name = name
+        self.deadzone = deadzone
+        self.shape = shape
+        self.expo = expo
+        self.snap = snap
+        self.snap_window = snap_window
+        self.steps = steps
+        self._half = steps / 2.0
+        self._size = steps + 1
+        if table:
+            self.table = [self.evaluate(self.axis(i), self.axis(j))
+                          for i in range(self._size) for j in range(self._size)]
+            self.map = self._lookup()
+        else:
+            self.table = None
+            self.map = self._direct() if shape == RADIAL and not expo and not snap else self.evaluate
+
+    def axis(self, index):
+        return index / self._half - 1.0
+
+    def evaluate(self, x, y):
+        """The curve itself, for any axis values: None or (heading offset, throttle)."""
+        dz = self.deadzone
+        if self.shape == AXIAL:
+            x = 0.0 if abs(x) < dz else x
+            y = 0.0 if abs(y) < dz else y
+        dx, dy = x, -y  # forward is negative Y in pygame
+        mag = math.hypot(dx, dy)
+        if self.shape == AXIAL:
+            if mag == 0.0:
+                return None
+        elif mag <= dz:
+            return None
+        offset = math.degrees(math.atan2(dx, dy))
+        if self.snap:
+            nearest = round(offset / self.snap) * self.snap
+            if abs(offset - nearest) <= self.snap_window:
+                offset = nearest
+        if self.shape == SCALED:
+            mag = (mag - dz) / (1.0 - dz)
+        throttle = min(1.0, mag)
+        if self.expo:
+            throttle = (1.0 - self.expo) * throttle + self.expo * throttle ** 3
+        return offset, throttle
+
+    def _direct(self):
+        # map(x, y) of a plain radial curve without a table: the old
+        # driveWithJoystick math, same operations in the same order
+        dz, hypot, atan2, degrees = self.deadzone, math.hypot, math.atan2, math.degrees
+
+        def direct(x, y):
+            dx, dy = x, -y
+            mag = hypot(dx, dy)
+            if mag > dz:
+                return degrees(atan2(dx, dy)), min(1.0, mag)
+            return None
+        return direct
+
+    def _lookup(self):
+        # map(x, y): table entry of the nearest quantized stick position. A
+        # closure over locals: no attribute lookups in the control loop.
+        table, half, size = self.table, self._half, self._size
+
+        def lookup(x, y):
+            if -1.0 <= x <= 1.0 and -1.0 <= y <= 1.0:
+                return table[int((x + 1.0) * half + 0.5) * size + int((y + 1.0) * half + 0.5)]
+            return lookup(max(-1.0, min(1.0, x)), max(-1.0, min(1.0, y)))
+        return lookup
+
+
+@functools.lru_cache(maxsize=None)
+def curve(name=DEFAULT_PROFILE):
+    """The compiled curve of a profile in PROFILES (built once per process)."""
+    try:
+        return ResponseCurve(name, **PROFILES[name])
+    except KeyError:
+        raise ValueError(f"unknown response curve {name!r} (one of {', '.join(PROFILES)})") from None
+
+
+def next_profile(name):
+    names = list(PROFILES)
+    return names[(names.index(name) + 1) % len(names)] if name in names else DEFAULT_PROFILE
+
+
+def _show(mapped):
+    return "   —        " if mapped is None else f"{mapped[0]:5.1f}° {mapped[1]:5.2f}"
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sphero BOLT — joystick response curves")
+    p.add_argument("profile", nargs="?", default=DEFAULT_PROFILE, choices=list(PROFILES))
+    c = curve(p.parse_args().profile)
+    print(f"{c.name}: {PROFILES[c.name]}")
+    print("stick  forward  diagonal (heading, throttle)")
+    for i in range(0, 11):
+        a = i / 10.0
+        print(f"{a:5.1f}  {_show(c.map(0.0, -a))}  {_show(c.map(a * 0.6, -a * 0.8))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 import pygame
-import time
 import sys
-from spherov2 import scanner
 from spherov2.types import Color
-from spherov2.sphero_edu import SpheroEduAPI
-from spherov2.commands.power import Power
-import math
+# echte Sphero of simulator (SPHERO_SIM=1), zie backend.py
+from backend import scanner, SpheroEduAPI, SimJoystick, clock
+# latency tracing, alleen actief met SPHERO_TRACE=1
+from tracing import tracer
+# botsingen en hellingen als events i.p.v. polling, zie events.py
+from events import EventBus, EventSource, COLLISION, TILT, LEVEL
+from supervisor import ConnectionSupervisor
+from battery import battery_monitor, state_color
+# LED-toestand: alleen veranderingen gaan over BLE, zie lights.py
+from lights import Lights
+# rondes, boosters en scores voor meerdere spelers, zie game.py
+import game
+# stick -> (heading, throttle) als opzoektabel, zie curves.py
+import curves
 
 '''
 SB-9DD8 1
@@ -31,7 +40,7 @@ buttons = {
 
 
 class SpheroController:
-    def __init__(self, joystick, color, ball_number):
+    def __init__(self, joystick, color, ball_number, game=None, curve=curves.DEFAULT_PROFILE):
         self.toy = None
         self.speed = 50
         self.heading = 0
@@ -39,28 +48,39 @@ class SpheroController:
         self.is_running = True
         self.calibration_mode = False
         self.joystick = joystick
-        self.last_command_time = time.time()
+        self.last_command_time = clock.time()
         self.heading_reset_interval = 1
-        self.last_heading_reset_time = time.time()
-        self.threshold_accel_mag = 0.05
+        self.last_heading_reset_time = clock.time()
         self.collision_occurred = False
+        self.collisions = 0
+        self.tilts = 0
+        self.on_hill = False
         self.color = color  # Store the color parameter
         self.previous_button = 1
         self.number = ball_number  # Assign the ball number
-        self.gameStartTime = time.time()
+        self.gameStartTime = clock.time()
         self.gameOn = False
         self.boosterCounter = 0
         self.calibrated = False
-        self.deadzone = 0.2
-        self.hillCounter = 0
+        # response curve: deadzone, expo en snapping zitten in de tabel; live te wisselen met SELECT
+        self.curve = curves.curve(curve)
+        self.prev_btn_select = 0
         self.prev_btn_L1 = 0
         self.prev_btn_R1 = 0
+        self.prev_btn_R2 = 0
+        # game engine (game.py): bepaalt gameOn, boosters en speed cap
+        self.game = game
+        self.directive = None
         try:
             self.has_hat = self.joystick.get_numhats() > 0
         except Exception:
             self.has_hat = False
         self.hat_prev = (0, 0)
         self.snap_turn_degrees = 90
+        self.battery = None
+        self.battery_shown = None
+        self.stop_reason = None
+        self.lights = Lights()
 
         
 
@@ -108,10 +128,10 @@ class SpheroController:
 
     def enter_calibration_mode(self, api, X):
         api.set_speed(0)
-        self.gameStartTime = time.time()
+        self.gameStartTime = clock.time()
         self.calibration_mode = True
         self.gameOn = False
-        api.set_front_led(Color(255, 0, 0))
+        self.lights.set_front_led(Color(255, 0, 0))
 
         self.base_heading = api.get_heading()
 
@@ -129,8 +149,11 @@ class SpheroController:
         self.calibration_mode = False
         self.gameOn = True
         self.boosterCounter = 0
-        self.gameStartTime = time.time()
-        api.set_front_led(Color(0, 255, 0))
+        self.gameStartTime = clock.time()
+        self.lights.set_front_led(Color(0, 255, 0))
+        if self.game is not None:
+            # de engine start de ronde als iedereen klaar is
+            self.game.post(game.READY, self.number)
 
     LED_PATTERNS = {
         1: '1',
@@ -143,145 +166,257 @@ class SpheroController:
     def set_number(self, number):
         self.number = int(number)
 
-    def display_number(self, api):
+    def display_number(self):
+        # alleen de gewenste toestand: flush() stuurt het nummer als het veranderd is
         number_char = self.LED_PATTERNS.get(self.number)
         if number_char:
-            api.set_matrix_character(number_char, self.color)
+            self.lights.set_matrix_character(number_char, self.color)
         else:
             print(f"Error in matrix '{self.number}'")
 
-    def print_battery_level(self, api):
-        battery_voltage = Power.get_battery_voltage(self.toy)
-        print(f"Battery status of {self.number}: {battery_voltage} V ")
-        if (battery_voltage > 4.1):
-            api.set_front_led(Color(r=0, g=255, b=0))
-        if battery_voltage < 4.1 and battery_voltage > 3.9:
-            api.set_front_led(Color(r=255, g=255, b=0))
-        if battery_voltage < 3.9:
-            api.set_front_led(Color(r=255, g=100, b=0))
-        if battery_voltage < 3.7:
-            api.set_front_led(Color(r=255, g=0, b=0))
-        if battery_voltage < 3.5:
-            exit("Battery")
+    # Event handlers: draaien in de control loop via self.events.dispatch()
+    def on_collision(self, event):
+        if self.gameOn:
+            self.collision_occurred = True
+            self.collisions += 1
+            print(f"Player {self.number} collision ({self.collisions})")
+            if self.game is not None:
+                self.game.post(game.COLLISION, self.number)
+
+    def on_tilt(self, event):
+        self.on_hill = True
+        self.tilts += 1
+        if self.game is not None:
+            self.game.post(game.TILT, self.number, angle=event.data['angle'])
+        if self.gameOn:
+            print(f"Player {self.number} going wild ({event.data['angle']:.0f}°)")
+
+    def on_level(self, event):
+        self.on_hill = False
+        if self.game is not None:
+            self.game.post(game.LEVEL, self.number)
+
+    # Game: de engine tikt op haar eigen thread, hier alleen de directive toepassen
+    def apply_directive(self, api):
+        d = self.game.directive(self.number)
+        previous, self.directive = self.directive, d
+        self.gameOn = d.game_on
+        self.boosterCounter = d.boosters_left
+        if previous is None or d.phase != previous.phase:
+            if d.phase == game.RUNNING:
+                print(f"Player {self.number}: round {d.round} started")
+            elif d.phase == game.BREAK:
+                print(f"Player {self.number}: round {d.round} over, score {d.score}")
+        # achter-LED: blauw = booster, rood = straf; lights stuurt alleen een verandering
+        if d.boost:
+            self.lights.set_back_led(Color(0, 0, 255))
+        elif d.speed_cap < game.FULL_SPEED and d.game_on:
+            self.lights.set_back_led(Color(255, 0, 0))
+        else:
+            self.lights.set_back_led(Color(0, 0, 0))
+
+    def capped(self, speed):
+        if self.directive is None:
+            return speed
+        return min(speed, self.directive.speed_cap)
+
+    # Batterij: battery.py leest op de achtergrond, de loop kijkt alleen naar de status
+    def show_battery(self):
+        status = self.battery.status
+        if status.state != self.battery_shown and status.voltage is not None:
+            print(f"Battery status of {self.number}: {self.battery.describe()}")
+            # kleur van de state, knippert bij rood/kritiek
+            self.lights.battery(status.state)
+            self.battery_shown = status.state
+
+    def on_battery_critical(self, status):
+        # draait in de battery thread: de loop stopt zelf en parkeert de bal
+        print(f"Battery of {self.number} critical ({status.voltage:.2f} V), stopping")
+        self.stop_reason = "battery"
+        self.is_running = False
+
+    def on_connect(self, api, reconnected):
+        # na een rescan is de toy een nieuw object: events en batterij volgen de supervisor
+        self.toy = self.supervisor.toy
+        if self.battery is None:
+            # pas nu de bal verbonden is: anders gaat de eerste meting naar een dode link
+            self.battery = battery_monitor(self.toy, on_critical=self.on_battery_critical, paused=True)
+        # meteen meten: een kritieke batterij stopt de controller voor hij rijdt
+        self.battery.resume(self.toy)
+        if not reconnected:
+            self.set_number(self.number)
+            self.display_number()
+            self.enter_calibration_mode(api, 0)
+            self.exit_calibration_mode(api)
+        else:
+            self.restore_state(api)
+        # nieuwe sessie: de LEDs van de bal zijn onbekend, alles opnieuw sturen
+        self.lights.resend()
+        self.lights.flush(api, force=True)
+
+    def restore_state(self, api):
+        # na een reconnect: nummer + kleur van de speed preset, LEDs en heading terugzetten
+        api.set_stabilization(True)
+        self.display_number()
+        self.lights.set_front_led(Color(0, 255, 0) if self.gameOn else Color(255, 0, 0))
+        api.set_heading(int(self.base_heading) % 360)
+        api.set_speed(0)
+        self.battery_shown = None
+        print(f"Player {self.number} reconnected (speed {self.speed}, heading {int(self.base_heading) % 360})")
 
     def control_toy(self):
         try:
-            with self.connect_toy() as api:
-                last_battery_print_time = time.time()
-                self.set_number(self.number)
-                self.display_number(api)
-                self.enter_calibration_mode(api, 0)
-                self.exit_calibration_mode(api)
-
-                while self.is_running:
-                    pygame.event.pump()
-                    if not self.gameOn:
-                        self.gameStartTime = time.time()                        
-                    current_time2 = time.time()
-                    gameTime = current_time2 - self.gameStartTime    
-
-                    if current_time2 - last_battery_print_time >= 30:
-                        self.print_battery_level(api)
-                        last_battery_print_time = current_time2
-                                                            
-                    if self.gameOn:
-                        acceleration_data = api.get_acceleration()
-                        if acceleration_data is not None:
-                            x_acc = acceleration_data['x']
-                            z_acc = acceleration_data['z']
-                            angle = math.degrees(math.atan2(x_acc, z_acc))
-
-                            if abs(angle) >= 30:
-                                self.hillCounter += 1
-                                if self.hillCounter > 10:
-                                    seconds = (current_time2 - self.gameStartTime)
-                                    print(f"Player {self.number} going wild")
-                            else:
-                                self.hillCounter = 0
-                        else:
-                            print("Acceleration data is not available.")
-                    
-                    X = self.joystick.get_axis(0)
-                    Y = self.joystick.get_axis(1)
-                    #for i in range(self.joystick.get_numbuttons()):
-                    #    button = self.joystick.get_button(i)
-                    #    print(f"Button {i}: {button}")
-
-
-                    if (self.joystick.get_button(buttons['1']) == 1):
-                        self.speed = 50
-                        self.color=Color(r=255, g=200, b=0)
-                        self.display_number(api)
-                    if (self.joystick.get_button(buttons['2']) == 1):
-                        self.speed =70
-                        self.color = Color(r=255, g=100, b=0)
-                        self.display_number(api)
-
-                    if (self.joystick.get_button(buttons['3']) == 1):
-                        self.speed = 100
-                        self.color = Color(r=255, g=50, b=0)
-                        self.display_number(api)
-
-                    if (self.joystick.get_button(buttons['4']) == 1):
-                        self.speed = 255
-                        self.color = Color(r=255, g=0, b=0)
-                        self.display_number(api)
-                    # Analoge besturing: richting = hoek van joystick tov vooruit; snelheid schaalt met magnitude
-                    dx = X
-                    dy = -Y  # naar voren is negatieve Y in pygame
-                    mag = math.hypot(dx, dy)
-
-                    if mag > self.deadzone:
-                        heading_offset = math.degrees(math.atan2(dx, dy))
-                        heading = (self.base_heading + heading_offset) % 360
-                        base_speed = self.speed
-                        # Turbo bij ingedrukte R2
-                        if self.joystick.get_button(buttons['R2']) == 1:
-                            base_speed = 255
-                        speed_cmd = int(base_speed * min(1.0, mag))
-                        self.move(api, heading, speed_cmd)
-                    else:
-                        api.set_speed(0)
-
-                    # Snap-turns: 1x 90° bij druk op R1/L1 of D-pad rechts/links
-                    btn_L1 = self.joystick.get_button(buttons['L1'])
-                    btn_R1 = self.joystick.get_button(buttons['R1'])
-                    if btn_R1 == 1 and self.prev_btn_R1 == 0:
-                        self.move(api, (self.base_heading + self.snap_turn_degrees) % 360, self.speed)
-                    if btn_L1 == 1 and self.prev_btn_L1 == 0:
-                        self.move(api, (self.base_heading - self.snap_turn_degrees) % 360, self.speed)
-                    self.prev_btn_R1 = btn_R1
-                    self.prev_btn_L1 = btn_L1
-
-                    if self.has_hat:
-                        try:
-                            hat = self.joystick.get_hat(0)
-                        except Exception:
-                            hat = (0, 0)
-                        if hat != self.hat_prev:
-                            if hat == (1, 0):
-                                self.move(api, (self.base_heading + self.snap_turn_degrees) % 360, self.speed)
-                            elif hat == (-1, 0):
-                                self.move(api, (self.base_heading - self.snap_turn_degrees) % 360, self.speed)
-                        self.hat_prev = hat
-
+            self.run_supervised()
         finally:
             pygame.quit()
 
-def main(toy_name=None, joystickID=0, playerID=1):
+    def run_supervised(self):
+        # BLE-verbinding bewaakt: bij linkverlies reconnect met backoff, zie supervisor.py
+        self.supervisor = ConnectionSupervisor(self.toy, on_connect=self.on_connect,
+                                               on_disconnect=self.on_disconnect)
+        # één batterijmonitor voor de hele sessie (gestart in on_connect), gestopt als de controller stopt
+        self.battery = None
+        try:
+            self.supervisor.run(self.drive)
+        finally:
+            if self.battery is not None:
+                self.battery.release()
+
+    def on_disconnect(self):
+        # link weg: geen batterijmetingen tot de volgende on_connect
+        if self.battery is not None:
+            self.battery.pause()
+
+    def drive(self, api):
+        self.events = EventBus()
+        self.events.subscribe(COLLISION, self.on_collision)
+        self.events.subscribe(TILT, self.on_tilt)
+        self.events.subscribe(LEVEL, self.on_level)
+        event_source = EventSource(api, self.toy, self.events).start()
+        try:
+            api = tracer.wrap(api)
+
+            while self.is_running:
+                t_loop = tracer.now()
+                pygame.event.pump()
+                if not self.gameOn:
+                    self.gameStartTime = clock.time()                        
+                current_time2 = clock.time()
+                gameTime = current_time2 - self.gameStartTime    
+
+                self.show_battery()
+                self.events.dispatch()
+                if self.game is not None:
+                    self.apply_directive(api)
+
+                t_input = tracer.now()
+                X = self.joystick.get_axis(0)
+                Y = self.joystick.get_axis(1)
+                t_decision = tracer.stage('input', t_input)
+                #for i in range(self.joystick.get_numbuttons()):
+                #    button = self.joystick.get_button(i)
+                #    print(f"Button {i}: {button}")
+
+
+                if (self.joystick.get_button(buttons['1']) == 1):
+                    self.speed = 50
+                    self.color=Color(r=255, g=200, b=0)
+                    self.display_number()
+                if (self.joystick.get_button(buttons['2']) == 1):
+                    self.speed =70
+                    self.color = Color(r=255, g=100, b=0)
+                    self.display_number()
+
+                if (self.joystick.get_button(buttons['3']) == 1):
+                    self.speed = 100
+                    self.color = Color(r=255, g=50, b=0)
+                    self.display_number()
+
+                if (self.joystick.get_button(buttons['4']) == 1):
+                    self.speed = 255
+                    self.color = Color(r=255, g=0, b=0)
+                    self.display_number()
+                # Analoge besturing: richting = hoek van joystick tov vooruit; snelheid volgt de curve
+                mapped = self.curve.map(X, Y)
+
+                if mapped is not None:
+                    heading_offset, throttle = mapped
+                    heading = (self.base_heading + heading_offset) % 360
+                    base_speed = self.speed
+                    # Turbo bij ingedrukte R2 (in een game alleen met een actieve booster)
+                    if self.joystick.get_button(buttons['R2']) == 1 and (self.directive is None or self.directive.boost):
+                        base_speed = 255
+                    speed_cmd = self.capped(int(base_speed * throttle))
+                    tracer.stage('decision', t_decision)
+                    self.move(api, heading, speed_cmd)
+                else:
+                    tracer.stage('decision', t_decision)
+                    api.set_speed(0)
+                tracer.stage('stick_to_motor', t_input)
+
+                # SELECT: volgende response curve
+                btn_select = self.joystick.get_button(buttons['SELECT'])
+                if btn_select == 1 and self.prev_btn_select == 0:
+                    self.curve = curves.curve(curves.next_profile(self.curve.name))
+                    print(f"Player {self.number}: response curve {self.curve.name}")
+                self.prev_btn_select = btn_select
+
+                # Booster aanvragen bij een nieuwe druk op R2; de engine beslist
+                btn_R2 = self.joystick.get_button(buttons['R2'])
+                if self.game is not None and btn_R2 == 1 and self.prev_btn_R2 == 0:
+                    self.game.post(game.BOOST, self.number)
+                self.prev_btn_R2 = btn_R2
+
+                # Snap-turns: 1x 90° bij druk op R1/L1 of D-pad rechts/links
+                btn_L1 = self.joystick.get_button(buttons['L1'])
+                btn_R1 = self.joystick.get_button(buttons['R1'])
+                if btn_R1 == 1 and self.prev_btn_R1 == 0:
+                    self.move(api, (self.base_heading + self.snap_turn_degrees) % 360, self.capped(self.speed))
+                if btn_L1 == 1 and self.prev_btn_L1 == 0:
+                    self.move(api, (self.base_heading - self.snap_turn_degrees) % 360, self.capped(self.speed))
+                self.prev_btn_R1 = btn_R1
+                self.prev_btn_L1 = btn_L1
+
+                if self.has_hat:
+                    try:
+                        hat = self.joystick.get_hat(0)
+                    except Exception:
+                        hat = (0, 0)
+                    if hat != self.hat_prev:
+                        if hat == (1, 0):
+                            self.move(api, (self.base_heading + self.snap_turn_degrees) % 360, self.capped(self.speed))
+                        elif hat == (-1, 0):
+                            self.move(api, (self.base_heading - self.snap_turn_degrees) % 360, self.capped(self.speed))
+                    self.hat_prev = hat
+                # LEDs: alleen wat veranderd is, begrensd in writes per seconde
+                self.lights.flush(api)
+                tracer.stage('loop', t_loop)
+            if self.stop_reason == "battery":
+                # netjes parkeren i.p.v. exit() midden in de BLE-sessie
+                api.set_speed(0)
+                self.lights.set_main_led(state_color("critical"))
+                self.lights.flush(api, force=True)
+        finally:
+            event_source.stop()
+
+def main(toy_name=None, joystickID=0, playerID=1, curve=curves.DEFAULT_PROFILE):
     pygame.init()
     pygame.joystick.init()
 
-    num_joysticks = pygame.joystick.get_count()
-    if num_joysticks == 0:
-        print("No joysticks found.")
-        return
+    if SimJoystick is not None:
+        # simulator: gescripte joystick in plaats van een echte
+        joystick = SimJoystick()
+    else:
+        num_joysticks = pygame.joystick.get_count()
+        if num_joysticks == 0:
+            print("No joysticks found.")
+            return
 
-    joystick = pygame.joystick.Joystick(joystickID)
+        joystick = pygame.joystick.Joystick(joystickID)
     joystick.init()
 
     sphero_color = Color(255, 0, 0)
-    sphero_controller = SpheroController(joystick, sphero_color, playerID)
+    sphero_controller = SpheroController(joystick, sphero_color, playerID, curve=curve)
 
     if toy_name is None:
         exit("No toy name provided")
@@ -294,12 +429,13 @@ def main(toy_name=None, joystickID=0, playerID=1):
 
 if __name__ == "__main__":
     if len(sys.argv) < 4:
-        print("Usage: python script.py <toy_name> <joystickNumber 0-1> <player 1-5>")
+        print("Usage: python script.py <toy_name> <joystickNumber 0-1> <player 1-5> [curve]")
         sys.exit(1)
     
     toy_name = sys.argv[1]
     joystick = int(sys.argv[2])
     playerid = int(sys.argv[3])
+    curve = sys.argv[4] if len(sys.argv) > 4 else curves.DEFAULT_PROFILE
     print(f"Try to connect to: {toy_name} with number {joystick} for player {playerid}")
     
-    main(toy_name, joystick, playerid)
+    main(toy_name, joystick, playerid, curve)
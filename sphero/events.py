@@ -0,0 +1,145 @@
+# Collision and tilt events for the controllers, without polling.
+#
+# The robot reports collisions as BLE notifications and streams its
+# accelerometer; spherov2 hands both over on its own threads. EventSource
+# turns them into Events in a bounded EventBus: posting never blocks and never
+# talks to the robot, so a burst of notifications cannot pile up threads or
+# BLE traffic (what made test.py crash). The controller calls bus.dispatch()
+# once per loop and its handlers run on the controller thread, where they may
+# use the api like the rest of the loop.
+#
+#   bus = EventBus()
+#   bus.subscribe(COLLISION, on_collision)
+#   source = EventSource(api, toy, bus).start()
+#   while running:
+#       bus.dispatch()
+#       ...
+#   source.stop()
+import collections
+import math
+import threading
+
+from backend import EventType, clock
+
+COLLISION = 'collision'
+TILT = 'tilt'      # the floor got steeper than the threshold (hill, ramp, picked up)
+LEVEL = 'level'    # back under the release angle
+
+Event = collections.namedtuple('Event', 'kind time data')
+
+
+class EventBus:
+    """Bounded queue of Events; when full the oldest event is dropped."""
+
+    def __init__(self, maxsize=32, timer=None):
+        self.timer = timer or clock.perf_counter
+        self.handlers = collections.defaultdict(list)
+        self.posted = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue = collections.deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def subscribe(self, kind, handler):
+        self.handlers[kind].append(handler)
+
+    def post(self, kind, **data):
+        # any thread; never blocks
+        event = Event(kind, self.timer(), data)
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self.posted += 1
+
+    def pending(self):
+        return len(self._queue)
+
+    def dispatch(self, limit=None):
+        """Run the handlers of the queued events on this thread; returns how many were handled."""
+        handled = 0
+        while limit is None or handled < limit:
+            with self._lock:
+                if not self._queue:
+                    break
+                event = self._queue.popleft()
+            for handler in self.handlers.get(event.kind, ()):
+                try:
+                    handler(event)
+                except Exception as e:
+                    # one bad handler must not stop the control loop
+                    self.errors += 1
+                    print(f"Event handler error ({event.kind}): {e}")
+            handled += 1
+        return handled
+
+
+class TiltDetector:
+    """Streamed-accelerometer listener posting TILT/LEVEL with hysteresis.
+
+    The angle is the x/z tilt used by the old polling loop; `hold` samples
+    over `threshold` are needed before TILT, LEVEL comes under `release`."""
+
+    def __init__(self, bus, threshold=30.0, release=25.0, hold=3):
+        self.bus = bus
+        self.threshold = threshold
+        self.release = release
+        self.hold = hold
+        self.tilted = False
+        self._over = 0
+        # spherov2 calls sensor listeners on a new thread per sample
+        self._lock = threading.Lock()
+
+    def __call__(self, sensor_data):
+        acc = sensor_data.get('accelerometer')
+        if not acc:
+            return
+        angle = math.degrees(math.atan2(acc['x'], acc['z']))
+        with self._lock:
+            if abs(angle) >= self.threshold:
+                self._over += 1
+                if not self.tilted and self._over >= self.hold:
+                    self.tilted = True
+                    self.bus.post(TILT, angle=angle)
+            else:
+                self._over = 0
+                if self.tilted and abs(angle) < self.release:
+                    self.tilted = False
+                    self.bus.post(LEVEL, angle=angle)
+
+
+class EventSource:
+    """Subscribes the robot's collision notifications and sensor stream to a bus.
+
+    SpheroEduAPI already configures collision detection with the SDK defaults
+    when it connects. collision_detection, if given, replaces them:
+    (method, x_threshold, y_threshold, x_speed, y_speed, dead_time)."""
+
+    def __init__(self, api, toy, bus, tilt=True, collision_detection=None):
+        self.api = api
+        self.toy = toy
+        self.bus = bus
+        self.tilt = TiltDetector(bus) if tilt is True else tilt or None
+        self.collision_detection = collision_detection
+
+    def _on_collision(self, api, *args):
+        self.bus.post(COLLISION)
+
+    def start(self):
+        self.api.register_event(EventType.on_collision, self._on_collision)
+        if self.collision_detection:
+            try:
+                self.toy.configure_collision_detection(*self.collision_detection)
+            except Exception as e:
+                print(f"Collision detection not configured: {e}")
+        if self.tilt is not None and hasattr(self.toy, 'sensor_control'):
+            self.toy.sensor_control.add_sensor_data_listener(self.tilt)
+        return self
+
+    def stop(self):
+        self.api.register_event(EventType.on_collision, None)
+        if self.tilt is not None and hasattr(self.toy, 'sensor_control'):
+            try:
+                self.toy.sensor_control.remove_sensor_data_listener(self.tilt)
+            except (KeyError, ValueError):
+                pass
@@ -1,12 +1,18 @@
 # app.py
-import time, math, threading, json, os
+import math, threading, json, os
 from typing import Optional
 from flask import Flask, request, redirect, url_for, render_template_string, jsonify
 import pygame
-from spherov2 import scanner
 from spherov2.types import Color
-from spherov2.sphero_edu import SpheroEduAPI
-from spherov2.commands.power import Power
+# echte Sphero of simulator (SPHERO_SIM=1), zie backend.py
+from backend import scanner, SpheroEduAPI, SimJoystick, clock
+# latency tracing (SPHERO_TRACE=1), resultaten op /metrics
+from tracing import tracer
+# BLE-verbinding met automatische reconnect (supervisor.py)
+from supervisor import ConnectionSupervisor
+from battery import battery_monitor, state_color
+# LED-toestand: alleen veranderingen gaan over BLE (lights.py)
+from lights import Lights
 
 SETTINGS_FILE = "last_settings.json"
 
@@ -28,12 +34,11 @@ class SpheroController:
         self.calibration_mode=False; self.joystick=joystick
         self.color=color; self.number=int(ball_number)
         self.gameOn=False; self.hillCounter=0
-        self._stop_evt=threading.Event(); self._thread=None; self._api_ctx=None
+        self._stop_evt=threading.Event(); self._thread=None; self.supervisor=None
 
-        # --- Battery state ---
-        self._last_batt_check = 0.0
-        self.battery_voltage: Optional[float] = None
-        self.battery_state: str = "unknown"  # green/yellow/orange/red/critical/unknown
+        # --- Battery: battery.py leest op de achtergrond ---
+        self.battery=None; self._battery_shown=None; self.battery_critical=False
+        self.lights=Lights()
 
     def discover_toy(self,toy_name:str)->bool:
         try:
@@ -51,111 +56,140 @@ class SpheroController:
     def move(self,api,heading,speed):
         api.set_heading(heading%360); api.set_speed(speed)
 
-    def display_number(self,api):
-        try: api.set_matrix_character(str(self.number),self.color)
-        except Exception: api.set_main_led(self.color)
+    def display_number(self):
+        # gewenste toestand; de loop flusht alleen als nummer of kleur veranderd is
+        self.lights.set_matrix_character(str(self.number),self.color)
 
-    # ---------- Battery logic (from second script, adapted for Flask/threading) ----------
-    def _update_battery_led(self, api, voltage: float):
-        """
-        Zet front LED volgens de spanning en update state string.
-        """
-        # Drempels zoals in je voorbeeldscript
-        # >4.1V = groen; 3.9-4.1 = geel; <3.9 = oranje; <3.7 = rood; <3.5 = critical stop
-        try:
-            if voltage > 4.1:
-                api.set_front_led(Color(0, 255, 0)); self.battery_state = "green"
-            elif 3.9 < voltage <= 4.1:
-                api.set_front_led(Color(255, 255, 0)); self.battery_state = "yellow"
-            elif 3.7 < voltage <= 3.9:
-                api.set_front_led(Color(255, 100, 0)); self.battery_state = "orange"
-            elif 3.5 < voltage <= 3.7:
-                api.set_front_led(Color(255, 0, 0)); self.battery_state = "red"
-            else:
-                # <= 3.5V -> critical
-                api.set_front_led(Color(255, 0, 0)); self.battery_state = "critical"
-        except Exception as e:
-            print(f"LED update error: {e}")
+    # ---------- Battery (status van de BatteryMonitor, geen BLE in de loop) ----------
+    @property
+    def battery_status(self):
+        return self.battery.status if self.battery else None
+
+    @property
+    def battery_voltage(self) -> Optional[float]:
+        s=self.battery_status
+        return s.voltage if s else None
 
-    def _check_battery(self, api):
+    @property
+    def battery_state(self) -> str:  # green/yellow/orange/red/critical/unknown
+        s=self.battery_status
+        return s.state if s else "unknown"
+
+    @property
+    def battery_minutes(self) -> Optional[float]:
+        s=self.battery_status
+        return s.minutes_left if s else None
+
+    def _show_battery(self):
         """
-        Vraagt batterijspanning op en past LED/drempels toe. Roept stop aan bij critical.
+        Front LED in de kleur van de batterij-state (knippert bij rood/kritiek).
         """
+        state=self.battery_state
+        if state==self._battery_shown or state=="unknown": return
+        print(f"Battery {self.number}: {self.battery.describe()}")
+        self.lights.battery(state); self._battery_shown=state
+
+    def _on_battery_critical(self, status):
+        # draait in de battery thread: alleen de loop laten stoppen, _drive parkeert de bal
+        print(f"Batterij kritiek ({status.voltage:.2f}V). Controller wordt gestopt.")
+        self.battery_critical=True
+        self._stop_evt.set()
+        if self.supervisor: self.supervisor.stop()
+
+    def _on_connect(self, api, reconnected):
+        # na een rescan is de toy een nieuw object: de batterij leest die van de supervisor
+        self.toy=self.supervisor.toy
+        if not self.battery:
+            # pas nu de bal verbonden is: anders gaat de eerste meting naar een dode link
+            self.battery=battery_monitor(self.toy,on_critical=self._on_battery_critical,paused=True)
+        # meteen meten: een kritieke batterij stopt de controller voor hij rijdt
+        self.battery.resume(self.toy)
+        # Toon speler-nummer op matrix (kleur = speed preset)
+        self.display_number()
+        if reconnected:
+            # heading en stilstand herstellen; speed preset zit in self.speed
+            self.move(api,self.base_heading,0)
+            print(f"Sphero {self.number} opnieuw verbonden")
+        # front LED opnieuw zetten bij (re)connect
+        self._battery_shown=None
+        self._show_battery()
+        # nieuwe sessie: LEDs van de bal onbekend, alles opnieuw sturen
+        self.lights.resend(); self.lights.flush(api,force=True)
+
+    def _loop(self):
+        if not self.toy: return
+        self.supervisor=ConnectionSupervisor(self.toy,on_connect=self._on_connect,on_disconnect=self._on_disconnect)
+        # batterijmonitor leeft zo lang als de controller (gestart in _on_connect), daarna stopt het pollen
+        self.battery=None
         try:
-            voltage = Power.get_battery_voltage(self.toy)
-            self.battery_voltage = float(voltage) if voltage is not None else None
-            if self.battery_voltage is not None:
-                print(f"Battery {self.number}: {self.battery_voltage:.2f} V")
-                self._update_battery_led(api, self.battery_voltage)
-                # Veilig stoppen bij kritieke spanning
-                if self.battery_voltage <= 3.5:
-                    print("Batterij kritiek (<3.5V). Controller wordt gestopt.")
-                    self.stop()
-            else:
-                self.battery_state = "unknown"
+            self.supervisor.run(self._drive)
         except Exception as e:
-            print(f"Battery read error: {e}")
+            print(f"Controller gestopt: {e}")
+        finally:
+            if self.battery: self.battery.release()
 
-    def _loop(self):
-        api=self.connect_toy()
-        if api is None: return
-        self._api_ctx=api
+    def _on_disconnect(self):
+        # link weg: geen batterijmetingen tot de volgende _on_connect
+        if self.battery: self.battery.pause()
+
+    def _drive(self,api):
         try:
-            with api:
-                # Toon speler-nummer op matrix
-                self.display_number(api)
-                # Initiele battery check meteen bij start
-                self._check_battery(api)
-                self._last_batt_check = time.time()
-
-                while not self._stop_evt.is_set():
-                    pygame.event.pump()
-                    X=self.joystick.get_axis(0); Y=self.joystick.get_axis(1)
-
-                    # Snelheid presets + nummerkleur opnieuw tonen
-                    if self.joystick.get_button(buttons['1']):
-                        self.speed, self.color=(50,Color(255,200,0)); self.display_number(api)
-                    if self.joystick.get_button(buttons['2']):
-                        self.speed, self.color=(70,Color(255,100,0)); self.display_number(api)
-                    if self.joystick.get_button(buttons['3']):
-                        self.speed, self.color=(100,Color(255,50,0)); self.display_number(api)
-                    if self.joystick.get_button(buttons['4']):
-                        self.speed, self.color=(200,Color(255,0,0)); self.display_number(api)
-
-                    # Besturing
-                    if Y<-0.7: self.move(api,self.base_heading,self.speed)
-                    elif Y>0.7: self.move(api,self.base_heading+180,self.speed)
-                    elif X>0.7: self.move(api,self.base_heading+22,0)
-                    elif X<-0.7: self.move(api,self.base_heading-22,0)
-                    else: api.set_speed(0)
-
-                    # Heading bijhouden
-                    try: self.base_heading=api.get_heading()
-                    except Exception: pass
-
-                    # Elke 30s batterij-status updaten
-                    now = time.time()
-                    if now - self._last_batt_check >= 30.0:
-                        self._check_battery(api)
-                        self._last_batt_check = now
-
-                    time.sleep(0.01)
+            api=tracer.wrap(api)
+
+            while not self._stop_evt.is_set():
+                t_loop=tracer.now()
+                pygame.event.pump()
+                t_input=tracer.now()
+                X=self.joystick.get_axis(0); Y=self.joystick.get_axis(1)
+                t_decision=tracer.stage('input',t_input)
+
+                # Snelheid presets + nummerkleur opnieuw tonen
+                if self.joystick.get_button(buttons['1']):
+                    self.speed, self.color=(50,Color(255,200,0)); self.display_number()
+                if self.joystick.get_button(buttons['2']):
+                    self.speed, self.color=(70,Color(255,100,0)); self.display_number()
+                if self.joystick.get_button(buttons['3']):
+                    self.speed, self.color=(100,Color(255,50,0)); self.display_number()
+                if self.joystick.get_button(buttons['4']):
+                    self.speed, self.color=(200,Color(255,0,0)); self.display_number()
+
+                # Besturing
+                tracer.stage('decision',t_decision)
+                if Y<-0.7: self.move(api,self.base_heading,self.speed)
+                elif Y>0.7: self.move(api,self.base_heading+180,self.speed)
+                elif X>0.7: self.move(api,self.base_heading+22,0)
+                elif X<-0.7: self.move(api,self.base_heading-22,0)
+                else: api.set_speed(0)
+                tracer.stage('stick_to_motor',t_input)
+
+                # Heading bijhouden
+                try: self.base_heading=api.get_heading()
+                except Exception: pass
+
+                # Batterij LED bij een nieuwe state, LEDs alleen bij een verandering
+                self._show_battery()
+                self.lights.flush(api)
+
+                tracer.stage('loop',t_loop)
+                clock.sleep(0.01)
         finally:
             try:
-                if self._api_ctx: self._api_ctx.set_speed(0)
+                api.set_speed(0)
+                if self.battery_critical:
+                    self.lights.set_main_led(state_color("critical")); self.lights.flush(api,force=True)
             except Exception: pass
-            self._api_ctx=None
 
     def start(self):
         if self._thread and self._thread.is_alive(): return
-        self._stop_evt.clear()
+        self._stop_evt.clear(); self.battery_critical=False
         self._thread=threading.Thread(target=self._loop,daemon=True)
         self._thread.start()
 
     def stop(self):
         self._stop_evt.set()
+        if self.supervisor: self.supervisor.stop()
         try:
-            if self._api_ctx: self._api_ctx.set_speed(0)
+            if self.supervisor and self.supervisor.api: self.supervisor.api.set_speed(0)
         except Exception: pass
         if self._thread and self._thread.is_alive(): self._thread.join(timeout=3)
 
@@ -170,6 +204,8 @@ joystick_obj=None
 def init_pygame_and_joystick(jid:int):
     global joystick_obj
     pygame.init(); pygame.joystick.init()
+    if SimJoystick is not None:
+        joystick_obj=SimJoystick(); return joystick_obj
     if pygame.joystick.get_count()==0: raise RuntimeError("Geen joystick gevonden.")
     joystick_obj=pygame.joystick.Joystick(jid); joystick_obj.init(); return joystick_obj
 
@@ -216,7 +252,8 @@ async function refresh(){
   try{
     let r=await fetch("{{ url_for('status') }}");
     let j=await r.json();
-    const batt = (j.battery_voltage!=null) ? j.battery_voltage.toFixed(2)+" V" : "—";
+    let batt = (j.battery_voltage!=null) ? j.battery_voltage.toFixed(2)+" V" : "—";
+    if (j.battery_minutes!=null) batt += ` (~${Math.round(j.battery_minutes)} min)`;
     const badge = `<span class="badge ${j.battery_state||'unknown'}">${j.battery_state||'unknown'}</span>`;
     document.getElementById('status').innerHTML =
       `running: ${j.running} <br>
@@ -245,8 +282,14 @@ def status():
         # batterij info naar de UI
         "battery_voltage":controller.battery_voltage if controller else None,
         "battery_state":controller.battery_state if controller else "unknown",
+        "battery_minutes":controller.battery_minutes if controller else None,
     })
 
+@app.route("/metrics")
+def metrics():
+    # latency histogrammen per stap (leeg als SPHERO_TRACE niet aan staat)
+    return jsonify(tracer.snapshot())
+
 @app.route("/start",methods=["POST"])
 def start():
     global controller,joystick_obj
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# Timed game rounds for all joystick players, on one central clock.
+#
+# GameEngine ticks on its own thread at a fixed rate and never talks to a
+# robot. Controllers post what happens to their robot (calibrated and ready,
+# collision, tilt, booster button) with post(); that never blocks. The tick
+# turns those inputs and the round clock into GameEvents, appends them to the
+# event log and applies them to the GameState, the only way state changes.
+# After each tick every player gets a new Directive (phase, speed cap,
+# booster, score), published by reference swap like battery.BatteryStatus:
+# the controller reads it once per loop and does the BLE calls on its own
+# thread, so one slow robot never holds up the others or the round clock.
+#
+# Rules: a round starts when every player is ready (3 s countdown, robots
+# held still) and lasts round_seconds. A collision scores COLLISION_POINTS
+# (bumper cars, at most one per COLLISION_DEBOUNCE); staying tilted for
+# HILL_GRACE (off the track, up a hill, picked up) costs HILL_POINTS and caps
+# the speed for PENALTY_SECONDS. Each player has BOOSTERS per round: full
+# speed for BOOST_SECONDS, then BOOST_COOLDOWN before the next one.
+#
+# replay(events) folds a log into the same GameState, e.g. one written with
+# log_path (one JSON event per line):
+#
+#   engine = GameEngine([1, 2, 3], rounds=3, round_seconds=120).start()
+#   controller = SpheroController(joystick, color, 1, game=engine)
+#
+#   python game.py SB-9DD8:0 SB-2BBE:1 --rounds 3 --log game.jsonl
+#   python game.py replay game.jsonl
+import argparse
+import collections
+import json
+import sys
+import threading
+
+from backend import clock as backend_clock
+from events import EventBus
+
+# phases
+LOBBY, COUNTDOWN, RUNNING, BREAK, OVER = 'lobby', 'countdown', 'running', 'break', 'over'
+
+# inputs from the controllers
+READY, COLLISION, TILT, LEVEL, BOOST = 'ready', 'collision', 'tilt', 'level', 'boost'
+
+COUNTDOWN_SECONDS = 3.0
+BREAK_SECONDS = 10.0
+COLLISION_POINTS = 1
+COLLISION_DEBOUNCE = 0.5
+HILL_GRACE = 1.5
+HILL_POINTS = 2
+PENALTY_SECONDS = 3.0
+PENALTY_SPEED = 30
+BOOSTERS = 3
+BOOST_SECONDS = 2.0
+BOOST_COOLDOWN = 8.0
+FULL_SPEED = 255
+
+GameEvent = collections.namedtuple('GameEvent', 'seq t kind player data')
+Directive = collections.namedtuple('Directive', 'phase game_on speed_cap boost boosters_left score round remaining')
+IDLE = Directive(LOBBY, False, FULL_SPEED, False, BOOSTERS, 0, 0, None)
+
+
+class PlayerState:
+
+    def __init__(self, number):
+        self.number = number
+        self.ready = False
+        self.score = 0
+        self.round_scores = []
+        self.collisions = 0
+        self.hills = 0
+        self.boosters_left = BOOSTERS
+        self.boost_until = None
+        self.boost_ready_at = 0.0
+        self.penalty_until = None
+        self.tilted_since = None
+        self.last_collision = None
+        self._round_start_score = 0
+
+
+class GameState:
+    """Everything the game knows, built only by apply(event)."""
+
+    def __init__(self, players=()):
+        self.phase = LOBBY
+        self.round = 0
+        self.phase_since = 0.0
+        self.players = {}
+        for number in players:
+            self.players[number] = PlayerState(number)
+
+    def apply(self, event):
+        t, p = event.t, self.players.get(event.player)
+        kind = event.kind
+        if kind == 'join':
+            self.players.setdefault(event.player, PlayerState(event.player))
+        elif kind == READY:
+            p.ready = True
+        elif kind in (COUNTDOWN, RUNNING, BREAK, OVER):
+            if kind == COUNTDOWN:
+                self.round += 1
+            elif kind == RUNNING:
+                for q in self.players.values():
+                    q.boosters_left = BOOSTERS
+                    q.boost_until = q.penalty_until = None
+                    q.boost_ready_at = t
+                    q._round_start_score = q.score
+            elif kind == BREAK:
+                for q in self.players.values():
+                    q.round_scores.append(q.score - q._round_start_score)
+            self.phase, self.phase_since = kind, t
+        elif kind == COLLISION:
+            p.collisions += 1
+            p.score += COLLISION_POINTS
+            p.last_collision = t
+        elif kind == TILT:
+            p.tilted_since = t
+        elif kind == LEVEL:
+            p.tilted_since = None
+        elif kind == 'hill':
+            p.hills += 1
+            p.score -= HILL_POINTS
+            p.penalty_until = t + PENALTY_SECONDS
+            p.tilted_since = None  # one penalty per tilt
+        elif kind == BOOST:
+            p.boosters_left -= 1
+            p.boost_until = t + BOOST_SECONDS
+            p.boost_ready_at = p.boost_until + BOOST_COOLDOWN
+        else:
+            raise ValueError(f"unknown game event {kind!r}")
+
+    def directive(self, number, now, round_seconds):
+        p = self.players[number]
+        running = self.phase == RUNNING
+        boost = running and p.boost_until is not None and now < p.boost_until
+        if self.phase == COUNTDOWN:
+            cap = 0
+        elif running and p.penalty_until is not None and now < p.penalty_until:
+            cap = PENALTY_SPEED
+        else:
+            cap = FULL_SPEED
+        remaining = max(0.0, self.phase_since + round_seconds - now) if running else None
+        return Directive(self.phase, running, cap, boost, p.boosters_left, p.score, self.round, remaining)
+
+    def standings(self):
+        return sorted(self.players.values(), key=lambda p: (-p.score, p.number))
+
+
+def replay(events, players=()):
+    state = GameState(players)
+    for event in events:
+        state.apply(event)
+    return state
+
+
+def load_log(path):
+    with open(path) as f:
+        return [GameEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+class GameEngine:
+
+    def __init__(self, players, rounds=3, round_seconds=120.0, tick_hz=20.0, countdown=COUNTDOWN_SECONDS,
+                 break_seconds=BREAK_SECONDS, log_path=None, clock=None, log=print):
+        self.rounds = rounds
+        self.round_seconds = round_seconds
+        self.period = 1.0 / tick_hz
+        self.countdown = countdown
+        self.break_seconds = break_seconds
+        self.clock = clock or backend_clock
+        self.log = log
+        self.events = []
+        self.state = GameState()
+        self.ticks = 0
+        self.overruns = 0
+        self.tick_lateness = collections.deque(maxlen=4096)
+        self.inbox = EventBus(maxsize=256, timer=self.clock.perf_counter)
+        for kind in (READY, COLLISION, TILT, LEVEL, BOOST):
+            self.inbox.subscribe(kind, self._on_input)
+        self._file = open(log_path, 'w') if log_path else None
+        self._directives = {}
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        for number in players:
+            self._emit('join', number)
+        self._publish(self.clock.perf_counter())
+
+    # ---- controller side: any thread, never blocks ----
+
+    def post(self, kind, player, **data):
+        self.inbox.post(kind, player=player, **data)
+
+    def directive(self, player):
+        return self._directives.get(player, IDLE)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    # ---- engine thread ----
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        # fixed rate on absolute deadlines; after a stall the missed ticks are
+        # skipped instead of run back to back
+        deadline = self.clock.perf_counter()
+        while not self._stop.is_set() and not self._done.is_set():
+            self.tick()
+            deadline += self.period
+            late = self.clock.perf_counter() - deadline
+            if late > self.period:
+                self.overruns += 1
+                deadline = self.clock.perf_counter()
+            elif late < 0:
+                self.clock.wait(-late)
+            self.tick_lateness.append(max(0.0, self.clock.perf_counter() - deadline))
+
+    def tick(self):
+        """Fold the queued inputs and the clock into events; publish the directives."""
+        self.inbox.dispatch()
+        now = self.clock.perf_counter()
+        state = self.state
+        elapsed = now - state.phase_since
+        if state.phase == LOBBY:
+            if state.players and all(p.ready for p in state.players.values()):
+                self._emit(COUNTDOWN, None, round=state.round + 1)
+        elif state.phase == COUNTDOWN and elapsed >= self.countdown:
+            self._emit(RUNNING, None, round=state.round)
+        elif state.phase == RUNNING:
+            if elapsed >= self.round_seconds:
+                self._emit(BREAK, None, round=state.round)
+                self._announce()
+            else:
+                for p in state.players.values():
+                    if p.tilted_since is not None and now - p.tilted_since >= HILL_GRACE:
+                        self._emit('hill', p.number)
+        elif state.phase == BREAK and elapsed >= self.break_seconds:
+            if state.round < self.rounds:
+                self._emit(COUNTDOWN, None, round=state.round + 1)
+            else:
+                self._emit(OVER, None)
+                self._done.set()
+        self.ticks += 1
+        self._publish(now)
+
+    def _on_input(self, event):
+        # on the engine thread: game rules decide which inputs become events
+        player = self.state.players.get(event.data.get('player'))
+        if player is None:
+            return
+        running = self.state.phase == RUNNING
+        kind = event.kind
+        if kind == READY:
+            if not player.ready:
+                self._emit(READY, player.number)
+        elif kind == TILT:
+            if player.tilted_since is None:
+                self._emit(TILT, player.number, angle=event.data.get('angle'))
+        elif kind == LEVEL:
+            if player.tilted_since is not None:
+                self._emit(LEVEL, player.number)
+        elif not running:
+            return
+        elif kind == COLLISION:
+            if player.last_collision is None or event.time - player.last_collision >= COLLISION_DEBOUNCE:
+                self._emit(COLLISION, player.number)
+        elif kind == BOOST:
+            if player.boosters_left > 0 and event.time >= player.boost_ready_at:
+                self._emit(BOOST, player.number)
+
+    def _emit(self, kind, player, **data):
+        event = GameEvent(len(self.events), self.clock.perf_counter(), kind, player, data)
+        self.state.apply(event)
+        self.events.append(event)
+        if self._file is not None:
+            self._file.write(json.dumps(event._asdict()) + '\n')
+            self._file.flush()
+
+    def _publish(self, now):
+        state = self.state
+        self._directives = {n: state.directive(n, now, self.round_seconds) for n in state.players}
+
+    def _announce(self):
+        line = ', '.join(f"player {p.number}: {p.round_scores[-1]:+d} ({p.score})" for p in self.state.standings())
+        self.log(f"Round {self.state.round} over: {line}")
+
+
+def print_standings(state):
+    print("player  score  collisions  hills  rounds")
+    for p in state.standings():
+        print(f"{p.number:6d} {p.score:6d} {p.collisions:11d} {p.hills:6d}  {p.round_scores}")
+
+
+def play(args):
+    import pygame
+    from spherov2.types import Color
+    from backend import scanner, SimJoystick
+    import driveWithJoystick
+
+    pygame.init()
+    pygame.joystick.init()
+    players = []
+    for number, spec in enumerate(args.players, start=1):
+        name, _, joystick_id = spec.partition(':')
+        if SimJoystick is not None:
+            joystick = SimJoystick()
+        else:
+            joystick = pygame.joystick.Joystick(int(joystick_id or 0))
+        joystick.init()
+        controller = driveWithJoystick.SpheroController(joystick, Color(255, 0, 0), number, curve=args.curve)
+        controller.toy = scanner.find_toy(toy_name=name)
+        players.append(controller)
+
+    engine = GameEngine([c.number for c in players], rounds=args.rounds, round_seconds=args.round_seconds,
+                        tick_hz=args.tick_hz, log_path=args.log)
+    threads = []
+    for controller in players:
+        controller.game = engine
+        threads.append(threading.Thread(target=controller.run_supervised, daemon=True))
+    engine.start()
+    for t in threads:
+        t.start()
+    try:
+        engine.wait()
+    except KeyboardInterrupt:
+        pass
+    for controller in players:
+        controller.is_running = False
+    for t in threads:
+        t.join(timeout=5)
+    engine.stop()
+    pygame.quit()
+    print_standings(engine.state)
+    if engine.overruns:
+        print(f"{engine.overruns} ticks over {engine.period * 1e3:.0f} ms")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'replay':
+        p = argparse.ArgumentParser(description="Sphero BOLT — replay a game log")
+        p.add_argument('command', choices=['replay'])
+        p.add_argument('log', help="JSON lines written with --log")
+        print_standings(replay(load_log(p.parse_args().log)))
+        return
+    p = argparse.ArgumentParser(description="Sphero BOLT — timed game rounds for all players")
+    p.add_argument('players', nargs='+', help="TOY_NAME:JOYSTICK per player, player numbers in this order")
+    p.add_argument('--rounds', type=int, default=3)
+    p.add_argument('--round-seconds', type=float, default=120.0)
+    p.add_argument('--tick-hz', type=float, default=20.0)
+    p.add_argument('--curve', default='linear', help="joystick response curve (curves.PROFILES), SELECT cycles")
+    p.add_argument('--log', default=None, help="write the game events to this JSON lines file")
+    play(p.parse_args())
+
+
+if __name__ == '__main__':
+    main()
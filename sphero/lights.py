@@ -0,0 +1,213 @@
+# Light output for the controllers: one BLE write per change instead of per
+# loop iteration.
+#
+# Every LED call is a BLE round trip (30 ms on the simulator), and the loops
+# used to repeat them: holding a speed button re-sent the matrix number every
+# tick. Lights keeps the state the robot should show, set with the same calls
+# as the api (set_main_led, set_front_led, set_back_led,
+# set_matrix_character, clear_matrix) but without any BLE. flush(api) then
+# writes only the outputs that differ from what was last sent, at most `rate`
+# writes per second (`burst` at once), so later changes replace pending ones
+# instead of queueing behind them.
+#
+# On a BOLT the main LED is the whole matrix: set_main_led and
+# set_matrix_character paint the same display, so they are one output here
+# and the last one set wins.
+#
+# Animations (Blink, Countdown, battery colours) are played on top of that
+# state without blocking: every flush asks them for the frame at the current
+# time. When an animation ends its outputs go back to the set state. After a
+# reconnect the robot has lost its LEDs: resend() makes the next flush write
+# everything again.
+#
+#   lights = Lights()
+#   lights.set_matrix_character('1', color)    # every tick, costs nothing
+#   lights.battery(status.state)               # front LED, blinks when low
+#   lights.flush(api)                          # once per loop iteration
+import collections
+
+from spherov2.types import Color
+
+from backend import clock as backend_clock
+from battery import state_color
+
+OFF = Color(0, 0, 0)
+YELLOW = Color(255, 255, 0)
+
+DISPLAY, FRONT, BACK = 'display', 'front', 'back'
+OUTPUTS = (DISPLAY, FRONT, BACK)
+
+# what the display shows: the main LED colour or a character on the matrix
+Main = collections.namedtuple('Main', 'color')
+Character = collections.namedtuple('Character', 'character color')
+CLEAR = Character(None, None)
+
+# battery states that blink the front LED
+BLINK_STATES = ('red', 'critical')
+
+
+class Blink:
+    """`color` for `on` seconds of every `period`, `off` the rest; `times` blinks or forever."""
+
+    def __init__(self, output, color, period=0.5, on=None, off=OFF, times=None):
+        self.output = output
+        self.color = color
+        self.period = period
+        self.on = period / 2 if on is None else on
+        self.off = off
+        self.times = times
+
+    def frame(self, t):
+        if self.times is not None and t >= self.times * self.period:
+            return None
+        return {self.output: self.color if t % self.period < self.on else self.off}
+
+
+class Countdown:
+    """3, 2, 1 as yellow flashes on the main LED (or the digits on the matrix).
+
+    on_step(n) is called from the flush that shows step n, e.g. to print it."""
+
+    def __init__(self, steps=3, color=YELLOW, on=0.3, off=0.4, matrix=False, on_step=None):
+        self.steps = steps
+        self.color = color
+        self.on = on
+        self.period = on + off
+        self.matrix = matrix
+        self.on_step = on_step
+        self.shown = None
+
+    def frame(self, t):
+        step = int(t // self.period)
+        if step >= self.steps:
+            return None
+        n = self.steps - step
+        if n != self.shown:
+            self.shown = n
+            if self.on_step is not None:
+                self.on_step(n)
+        if t - step * self.period >= self.on:
+            return {DISPLAY: Main(OFF)}
+        if self.matrix:
+            return {DISPLAY: Character(str(n), self.color)}
+        return {DISPLAY: Main(self.color)}
+
+
+class Lights:
+
+    def __init__(self, rate=10.0, burst=3, clock=None):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock or backend_clock
+        self.wanted = {}
+        self.sent = {}
+        self.animations = {}
+        self.requests = 0
+        self.writes = 0
+        self._tokens = burst
+        self._refilled = None
+
+    # The wanted state, same calls as the api; nothing is sent here
+    def set_main_led(self, color):
+        self._want(DISPLAY, Main(color))
+
+    def set_matrix_character(self, character, color):
+        self._want(DISPLAY, Character(character, color))
+
+    def clear_matrix(self):
+        self._want(DISPLAY, CLEAR)
+
+    def set_front_led(self, color):
+        self._want(FRONT, color)
+
+    def set_back_led(self, color):
+        # a number is the brightness of the blue tail light, as in the api
+        self._want(BACK, color)
+
+    def _want(self, output, value):
+        self.requests += 1
+        self.wanted[output] = value
+
+    # Animations
+    def play(self, animation, name=None):
+        """Play `animation` from now, replacing the one with the same name."""
+        self.animations[name or type(animation).__name__] = (animation, self.clock.perf_counter())
+        return animation
+
+    def stop(self, name):
+        self.animations.pop(name, None)
+
+    @property
+    def animating(self):
+        return bool(self.animations)
+
+    def battery(self, state):
+        # battery colour on the front LED, blinking when it is time to charge
+        color = state_color(state)
+        self.set_front_led(color)
+        if state in BLINK_STATES:
+            if 'battery' not in self.animations:
+                self.play(Blink(FRONT, color, period=1.0), 'battery')
+        else:
+            self.stop('battery')
+
+    def frame(self, now=None):
+        """The state to show at `now`: the set state with the animations on top."""
+        now = self.clock.perf_counter() if now is None else now
+        shown = dict(self.wanted)
+        for name, (animation, start) in list(self.animations.items()):
+            frame = animation.frame(now - start)
+            if frame is None:
+                del self.animations[name]
+            else:
+                shown.update(frame)
+        return shown
+
+    # BLE
+    def resend(self):
+        # the robot's LEDs are unknown (new session): the next flush writes all
+        self.sent.clear()
+
+    def pending(self):
+        shown = self.frame()
+        return [(o, shown[o]) for o in OUTPUTS if o in shown and self.sent.get(o) != shown[o]]
+
+    def flush(self, api, force=False):
+        """Write the outputs that changed, within the rate limit unless `force`; returns the writes.
+
+        Link errors are not caught: the supervisor reconnects on them."""
+        now = self.clock.perf_counter()
+        if self._refilled is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        writes = 0
+        for output, value in self.pending():
+            if not force and self._tokens < 1:
+                break
+            self._write(api, output, value)
+            self.sent[output] = value
+            self._tokens -= 1
+            writes += 1
+        self.writes += writes
+        return writes
+
+    def _write(self, api, output, value):
+        if output == FRONT:
+            api.set_front_led(value)
+        elif output == BACK:
+            api.set_back_led(value)
+        elif isinstance(value, Main):
+            api.set_main_led(value.color)
+        elif value == CLEAR:
+            api.clear_matrix()
+        else:
+            api.set_matrix_character(value.character, value.color)
+
+    def wait(self, api, poll=0.02):
+        """Flush until the animations are over (for scripts with nothing else to do)."""
+        while True:
+            self.flush(api)
+            if not self.animating:
+                break
+            self.clock.sleep(poll)
+        self.flush(api, force=True)
@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys, time, math, argparse
-from spherov2 import scanner
-from spherov2.sphero_edu import SpheroEduAPI
+import sys, math, argparse
 from spherov2.types import Color
-from spherov2.commands.power import Power
+# vrai BOLT ou simulateur (SPHERO_SIM=1), voir backend.py
+from backend import scanner, SpheroEduAPI, clock
+# modèle vitesse→cm/s calibré par toy et par sol (calibration.py)
+from calibration import SpeedModel, calibrate, load_model, save_model
+# connexion BLE (reconnexion, arrêt d’urgence sur la session ouverte)
+from supervisor import ConnectionSupervisor
+# batterie lue en arrière-plan (battery.py)
+from battery import battery_monitor
+# LEDs : seulement les changements, animations sans bloquer (lights.py)
+from lights import Countdown, Lights
 
 SEGMENTS_CM = [200, 200, 100, 100, 150, 100, 100, 200, 250]     # top →, right ↓, bottom ←, left ↑, finish →
 HEADINGS    = [  0,  90, 180, 270, 180,  90, 180, 270,   0]     # 0°=vers la droite
 
 # Vitesse et modèle distance→temps
 SPEED_PCT_DEFAULT = 70                      # 0–100 (l’API mappe vers 0–255)
-CM_PER_SEC_DEFAULT = 41.7                   # à mesurer 1x sur ton sol à ta vitesse
+CM_PER_SEC_DEFAULT = 41.7                   # sans calibration (--calibrate) : à mesurer 1x sur ton sol à ta vitesse
 
 # Douceur d’accélération/freinage (limite le patinage)
 RAMP = 0.35
@@ -33,31 +40,90 @@ def find_toy(name_or_mac: str):
             return t
     return None
 
-def seconds_for_distance(dist_cm: float, cmps: float) -> float:
+def seconds_for_distance(dist_cm: float, cmps: float, model: SpeedModel = None, speed_pct: int = None) -> float:
+    """Durée de gentle_roll pour parcourir dist_cm : modèle calibré si dispo, sinon cmps constant."""
+    if model is not None:
+        return model.seconds_for_distance(dist_cm, speed_pct)
     return max(0.0, dist_cm / max(cmps, 1.0))
 
-def print_battery(api, toy_name: str):
-    try:
-        v = Power.get_battery_voltage(api.toy)
-        print(f"[{toy_name}] Battery: {v:.2f} V")
-        if v <= 3.5:
-            print("⚠️  Batterie faible — charge avant les essais.")
-    except Exception:
-        pass
+def print_battery(battery, toy_name: str):
+    status = battery.sample()
+    print(f"[{toy_name}] Battery: {battery.describe()}")
+    if status.state in ("red", "critical"):
+        print("⚠️  Batterie faible — charge avant les essais.")
 
-def gentle_roll(api: SpheroEduAPI, heading: int, speed_pct: int, seconds: float):
-    """Petite rampe d’accélération puis freinage actif pour réduire le dérapage."""
+def segment_phases(heading: int, speed_pct: int, seconds: float):
+    """Phases (cap, vitesse, durée) d’un segment : rampe, croisière, décélération, frein."""
     if seconds <= 0:
-        return
+        return []
     # ramp-up
-    api.roll(heading, speed_pct, RAMP)
+    phases = [(heading, speed_pct, RAMP)]
     # cruise
     cruise = max(0.0, seconds - 2*RAMP)
     if cruise > 0:
-        api.roll(heading, speed_pct, cruise)
+        phases.append((heading, speed_pct, cruise))
     # ramp-down + petit frein
-    api.roll(heading, max(10, int(0.4 * speed_pct)), RAMP)
-    api.roll(heading, 0, BRAKE)
+    phases.append((heading, max(10, int(0.4 * speed_pct)), RAMP))
+    phases.append((heading, 0, BRAKE))
+    return phases
+
+def gentle_roll(api: SpheroEduAPI, heading: int, speed_pct: int, seconds: float):
+    """Petite rampe d’accélération puis freinage actif pour réduire le dérapage."""
+    for hdg, speed, duration in segment_phases(heading, speed_pct, seconds):
+        api.roll(hdg, speed, duration)
+
+class RollStreamer:
+    """Mode streaming : chaque commande part *avant* la fin de la phase en cours.
+
+    Les échéances sont absolues (perf_counter), donc les retards ne s’additionnent
+    pas ; `lead` est la durée d’une commande BLE, moyennée sur les dernières mesures,
+    et chaque commande est envoyée `lead` avant son échéance."""
+
+    def __init__(self, api: SpheroEduAPI, lead: float = 0.03, alpha: float = 0.3):
+        self.api = api
+        self.lead = lead
+        self.alpha = alpha
+        self.heading = None
+
+    def _send(self, command, value, at: float) -> float:
+        wait = at - clock.perf_counter()
+        if wait > 0:
+            clock.sleep(wait)
+        start = clock.perf_counter()
+        command(value)
+        done = clock.perf_counter()
+        self.lead += self.alpha * ((done - start) - self.lead)
+        return done
+
+    def run(self, segments, on_segment=None):
+        """segments : liste de listes de phases. Retourne [(prévu, mesuré)] par segment.
+
+        on_segment(i) est appelé juste avant la première commande du segment i."""
+        t = clock.perf_counter() + 2 * self.lead
+        starts, planned = [], []
+        for i, phases in enumerate(segments):
+            planned.append(sum(duration for _, _, duration in phases))
+            if on_segment is not None:
+                on_segment(i)
+            first = None
+            for hdg, speed, duration in phases:
+                if hdg != self.heading:
+                    self._send(self.api.set_heading, hdg, t - 2 * self.lead)
+                    self.heading = hdg
+                done = self._send(self.api.set_speed, speed, t - self.lead)
+                first = done if first is None else first
+                t += duration
+            starts.append(first)
+        # attendre la fin du dernier freinage
+        wait = t - clock.perf_counter()
+        if wait > 0:
+            clock.sleep(wait)
+        ends = starts[1:] + [clock.perf_counter()]
+        return [(p, end - start) for p, start, end in zip(planned, starts, ends)]
+
+def stream_roll(api: SpheroEduAPI, heading: int, speed_pct: int, seconds: float):
+    """Comme gentle_roll, mais en mode streaming (même signature, pour calibration.py)."""
+    RollStreamer(api).run([segment_phases(heading, speed_pct, seconds)])
 
 def calibrate_zero(api: SpheroEduAPI):
     print("🔧 Calibration: vise 0° dans la direction du PREMIER segment, puis ENTER …")
@@ -72,32 +138,58 @@ def calibrate_zero(api: SpheroEduAPI):
         api.set_heading(0)
     print("✅ 0° fixé.\n")
 
-def run_lap(api: SpheroEduAPI, segments_cm, headings, cmps: float, speed_pct: int):
+def run_lap(api: SpheroEduAPI, segments_cm, headings, cmps: float, speed_pct: int, model: SpeedModel = None,
+            stream: bool = False, telemetry=None):
+    plan = [(hdg, dist, segment_phases(hdg, speed_pct, seconds_for_distance(dist, cmps, model, speed_pct)))
+            for hdg, dist in zip(headings, segments_cm)]
+    return run_plan(api, plan, stream, telemetry)
+
+def run_plan(api: SpheroEduAPI, plan, stream: bool = False, telemetry=None):
+    """Un tour à partir d’un plan [(cap, cm, phases)] (voir course.py).
+
+    telemetry : TelemetryRecorder (telemetry.py) qui reçoit les débuts de segment."""
+    def mark(i):
+        if telemetry is not None:
+            hdg, dist, phases = plan[i]
+            telemetry.segment(i, dist, sum(d for _, _, d in phases))
     api.set_stabilization(True)
-    api.set_back_led(255)
-    api.set_main_led(LED_RUN)
-
-    # départ
-    for k in (3,2,1):
-        print(f"… {k}")
-        api.set_main_led(Color(255,255,0)); time.sleep(0.3)
-        api.set_main_led(Color(0,0,0));     time.sleep(0.4)
+    lights = Lights()
+    lights.set_back_led(255)
+    lights.set_main_led(LED_RUN)
+
+    # départ : compte à rebours cadencé par l’horloge, pas par les écritures BLE
+    lights.play(Countdown(on_step=lambda k: print(f"… {k}")))
+    lights.wait(api)
     print("🏁 GO!")
-    api.set_main_led(LED_RUN)
 
-    t0 = time.perf_counter()
+    t0 = clock.perf_counter()
 
-    for hdg, dist in zip(headings, segments_cm):
-        api.set_heading(hdg)   # virage instantané pour rester serré
-        secs = seconds_for_distance(dist, cmps)
-        print(f"→ {dist:.0f} cm @ {hdg:3d}°  (~{secs:.2f}s)")
-        gentle_roll(api, hdg, speed_pct, secs)
+    if stream:
+        # toutes les commandes du tour sont planifiées d’avance
+        timings = RollStreamer(api).run([phases for _, _, phases in plan], mark)
+    else:
+        timings = []
+        for i, (hdg, dist, phases) in enumerate(plan):
+            planned = sum(d for _, _, d in phases)
+            print(f"→ {dist:.0f} cm @ {hdg:3d}°  (~{planned:.2f}s)")
+            start = clock.perf_counter()
+            mark(i)
+            api.set_heading(hdg)   # virage instantané pour rester serré
+            for phase in phases:
+                api.roll(*phase)
+            timings.append((planned, clock.perf_counter() - start))
 
+    if telemetry is not None:
+        telemetry.end()
     api.roll(0,0,0.1)
-    t1 = time.perf_counter()
+    t1 = clock.perf_counter()
     lap = t1 - t0
-    api.set_back_led(0)
-    api.set_main_led(LED_OK)
+    lights.set_back_led(0)
+    lights.set_main_led(LED_OK)
+    lights.flush(api, force=True)
+    print("\nSegment   prévu    mesuré")
+    for (hdg, dist, _), (planned, measured) in zip(plan, timings):
+        print(f"{dist:4.0f}@{hdg:3d}° {planned:6.2f}s  {measured:6.2f}s  ({measured - planned:+.2f}s)")
     print(f"\n⏱️  Lap time: {lap:.3f} s")
     return lap
 
@@ -106,40 +198,87 @@ def main():
     p = argparse.ArgumentParser(description="Sphero BOLT — Autonome ronde (horaire)")
     p.add_argument("--name", required=True, help="Nom ou MAC du BOLT (ex: SB-9DD8)")
     p.add_argument("--speed", type=int, default=SPEED_PCT_DEFAULT, help="Vitesse % (0–100)")
-    p.add_argument("--cmps", type=float, default=CM_PER_SEC_DEFAULT, help="cm/s mesuré à cette vitesse")
+    p.add_argument("--cmps", type=float, default=None,
+                   help=f"cm/s constant (défaut : modèle calibré du sol, sinon {CM_PER_SEC_DEFAULT})")
+    p.add_argument("--surface", default="default", help="sol utilisé pour la calibration de vitesse")
+    p.add_argument("--calibrate", action="store_true",
+                   help="calibrer vitesse→cm/s avant le tour et sauvegarder pour ce toy et ce sol")
+    p.add_argument("--stream", action="store_true",
+                   help="envoyer les commandes en avance (pas de temps mort entre les phases)")
     p.add_argument("--segments", type=str, default=",".join(str(x) for x in SEGMENTS_CM),
-                   help="Segments en cm séparés par des virgules")
+                   help="Segments en cm séparés par des virgules (mêmes caps que HEADINGS)")
+    p.add_argument("--course", help="fichier de parcours YAML/JSON (voir course.py), remplace --segments")
+    p.add_argument("--telemetry", nargs="?", const="telemetry", metavar="DIR",
+                   help="enregistrer commandes et capteurs du tour dans DIR (défaut telemetry/, voir telemetry.py)")
     args = p.parse_args()
+    if args.cmps is not None and args.calibrate:
+        # un cm/s explicite remplace le modèle : calibrer ne servirait à rien
+        p.error("--cmps et --calibrate s’excluent")
+
+    from course import CourseError, course_from_segments, load_course, load_plan
+    try:
+        if args.course:
+            course = load_course(args.course)
+        else:
+            segments = [float(x) for x in args.segments.split(",") if x.strip()]
+            course = course_from_segments(segments, HEADINGS)
+    except (CourseError, OSError) as e:
+        print(f"Parcours invalide : {e}")
+        sys.exit(1)
+    speed = max(10, min(100, args.speed))
 
-    segments = [float(x) for x in args.segments.split(",") if x.strip()]
     toy = find_toy(args.name)
     if toy is None:
         print(f"NO BOLT '{args.name}'")
         sys.exit(1)
 
     print(f"Connected {toy.name}")
+    # le streaming ne s’arrête pas entre les phases : calibration séparée
+    surface = args.surface + ("+stream" if args.stream else "")
+    model = load_model(toy.name, surface) if args.cmps is None else None
+    supervisor = ConnectionSupervisor(toy)
+    battery = None
     try:
-        with SpheroEduAPI(toy) as api:
+        with supervisor.session() as api:
             api.set_main_led(LED_READY)
-            print_battery(api, toy.name)
+            battery = battery_monitor(toy, period=10.0)
+            print_battery(battery, toy.name)
+            if args.calibrate:
+                print("📏 Calibration vitesse (aller-retour en ligne droite) …")
+                model = calibrate(api, stream_roll if args.stream else gentle_roll)
+                save_model(model, toy.name, surface)
+            if model is not None:
+                print(f"Modèle de vitesse '{surface}' : {model.cmps(speed):.1f} cm/s à {speed}")
+            # plan précompilé (course.py compile) ou compilé une fois puis gardé en cache ;
+            # un --cmps explicite gagne toujours (model est alors None)
+            plan, cached = load_plan(course, speed, model, None if model else args.cmps or CM_PER_SEC_DEFAULT)
+            print(f"Plan '{course.name}' @ {speed} : {'cache' if cached else 'compilé'} ({plan.seconds:.2f} s prévues)")
+            for warning in plan.warnings:
+                print(f"⚠️  {warning}")
             calibrate_zero(api)
-            _ = run_lap(api, segments, HEADINGS, args.cmps, max(10, min(100, args.speed)))
-            api.set_main_led(LED_OK)
+            if args.telemetry:
+                from telemetry import TelemetryRecorder, new_log_path
+                meta = {"toy": toy.name, "course": course.name, "course_hash": course.geometry_hash(),
+                        "speed": speed, "stream": args.stream, "plan": plan.key}
+                with TelemetryRecorder(new_log_path(args.telemetry, toy.name), meta) as telemetry:
+                    _ = run_plan(telemetry.attach(api, battery=battery), plan.segments, args.stream, telemetry)
+                print(f"📈 Télémétrie : {telemetry.path} ({telemetry.records} enregistrements, "
+                      f"{telemetry.dropped} perdus)")
+            else:
+                _ = run_plan(api, plan.segments, args.stream)
     except KeyboardInterrupt:
-        try:
-            with SpheroEduAPI(toy) as api:
-                api.roll(0,0,0.2); api.set_main_led(LED_ERR)
-        except Exception:
-            pass
+        # même session si elle vit encore, sinon une reconnexion
+        supervisor.emergency_stop(LED_ERR)
         print("\n STOPED")
     except Exception as e:
         print(f" Error {e}")
-        try:
-            with SpheroEduAPI(toy) as api:
-                api.roll(0,0,0.2); api.set_main_led(LED_ERR)
-        except Exception:
-            pass
+        supervisor.emergency_stop(LED_ERR)
         sys.exit(2)
+    finally:
+        # plus de lectures BLE de la batterie une fois la session finie
+        if battery is not None:
+            battery.release()
+        supervisor.close()
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,10 @@
-import time
-from spherov2 import scanner
-from spherov2.sphero_edu import SpheroEduAPI
 from spherov2.types import Color
+# real BOLT or the simulator (SPHERO_SIM=1), see backend.py
+from backend import scanner, SpheroEduAPI, clock
 
 toy = scanner.find_toy()
 with SpheroEduAPI(toy) as droid:
     droid.set_main_led(Color(r=0, g=0, b=255))
     droid.set_speed(60)
-    time.sleep(2)
+    clock.sleep(2)
     droid.set_speed(0)
\ No newline at end of file
@@ -0,0 +1,537 @@
+# Headless stand-in for the parts of spherov2 our scripts use, so they run
+# without a BOLT or Bluetooth (select it with SPHERO_SIM=1, see backend.py).
+#
+# - SimToy: kinematic model (speed -> cm/s with deadband and motor lag),
+#   battery drain and a per-command BLE latency, all on a VirtualClock.
+#   With defer_latency (async_control.py) a command does not sleep: the
+#   latency is collected and the caller awaits it on its event loop.
+# - SpheroEduAPI / Power / scanner / EventType: same call signatures as spherov2.
+# - SimJoystick: scripted replacement for a pygame joystick.
+# - SimEventScript: scripted collisions, hills and BLE link drops; the toy
+#   delivers them like the robot does (collision notifications, streamed
+#   accelerometer, commands failing with ConnectionError until reconnected).
+#
+# Environment knobs (all optional):
+#   SPHERO_SIM_SPEEDUP   virtual seconds per real second (default 1, "inf" =
+#                        never really sleep, time only moves on sleep())
+#   SPHERO_SIM_LATENCY   seconds per BLE command (default 0.03)
+#   SPHERO_SIM_JITTER    +/- random seconds added to each command (default 0.01)
+#   SPHERO_SIM_TOYS      comma separated toy names the scanner "finds"
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from enum import Enum, auto
+
+from spherov2.scanner import ToyNotFoundError
+from spherov2.types import Color
+
+DEFAULT_TOYS = ['SB-9DD8', 'SB-2BBE', 'SB-27A5', 'SB-81E0', 'SB-7740']
+
+G_CM_S2 = 980.665
+
+
+class VirtualClock:
+    """Drop-in for the time module: time(), perf_counter(), monotonic(), sleep().
+
+    With speedup=100 a sleep(1.0) takes 10 ms of real time. With speedup=inf
+    nothing really sleeps and time only advances through sleep()/advance();
+    use that for single-threaded benchmarks. Background threads that only
+    observe (samplers, monitors) should use wait() instead of sleep(), so they
+    follow the time instead of pushing it forward."""
+
+    def __init__(self, speedup=1.0):
+        self.speedup = float(speedup)
+        self.stepped = math.isinf(self.speedup)
+        self._real0 = time.perf_counter()
+        self._offset = 0.0
+        self._lock = threading.Lock()
+        self._moved = threading.Condition(self._lock)
+        self.epoch = time.time()
+
+    def perf_counter(self):
+        if self.stepped:
+            return self._offset
+        return (time.perf_counter() - self._real0) * self.speedup + self._offset
+
+    monotonic = perf_counter
+
+    def time(self):
+        return self.epoch + self.perf_counter()
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        if self.stepped:
+            self.advance(seconds)
+        else:
+            time.sleep(seconds / self.speedup)
+
+    async def asleep(self, seconds):
+        # sleep() for coroutines: yields to the event loop instead of blocking it
+        if self.stepped:
+            self.advance(max(0.0, seconds))
+            await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(max(0.0, seconds) / self.speedup)
+
+    def advance(self, seconds):
+        # jump the virtual time forward without sleeping
+        with self._moved:
+            self._offset += seconds
+            self._moved.notify_all()
+
+    def wait(self, seconds):
+        # sleep for observers: on a stepped clock block until the other
+        # threads moved the time on (gives up after 0.1 s real time)
+        if not self.stepped:
+            return self.sleep(seconds)
+        with self._moved:
+            deadline = self._offset + seconds
+            self._moved.wait_for(lambda: self._offset >= deadline, timeout=0.1)
+
+
+class EventType(Enum):
+    # the spherov2.sphero_edu.EventType members the simulator can raise
+    on_collision = auto()
+    on_freefall = auto()
+    on_landing = auto()
+    on_gyro_max = auto()
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+default_clock = VirtualClock(_env_float('SPHERO_SIM_SPEEDUP', 1.0))
+
+
+class SimToy:
+    """One simulated BOLT. Heading 0 drives along +y, 90 along +x (cm)."""
+
+    def __init__(self, name='SB-SIM', address=None, clock=None,
+                 latency=None, jitter=None, battery_voltage=4.2,
+                 drain_per_hour=0.5, gain=0.68, deadband=5, droop=0.0008,
+                 motor_lag=0.25, seed=None):
+        self.name = name
+        self.address = address or 'SIM:' + name
+        self.clock = clock or default_clock
+        self.latency = _env_float('SPHERO_SIM_LATENCY', 0.03) if latency is None else latency
+        self.jitter = _env_float('SPHERO_SIM_JITTER', 0.01) if jitter is None else jitter
+        self.random = random.Random(seed)
+        # speed model: cm/s = gain * (speed - deadband) * (1 - droop * speed)
+        self.gain = gain
+        self.deadband = deadband
+        self.droop = droop
+        self.motor_lag = motor_lag
+        # battery
+        self.full_voltage = battery_voltage
+        self.drain_per_hour = drain_per_hour
+        # BLE commands sent, per kind, and total time spent in them
+        self.commands = Counter()
+        self.ble_time = 0.0
+        self.connected = False
+        # tilt of the floor under the robot in degrees (hills, ramps)
+        self.tilt = 0.0
+        # link faults: commands fail until the link is back and reconnected
+        self.link_timeout = 0.5
+        self.link_down_until = 0.0
+        self.link_lost = False
+        # async callers take the command latency with take_delay() and await it
+        self.defer_latency = False
+        self.pending_delay = 0.0
+        self._lock = threading.RLock()
+        self._collision_listeners = []
+        self.sensor_control = SimSensorControl(self)
+        self.reset()
+
+    def reset(self):
+        # put the robot back at the origin, standing still
+        with self._lock:
+            self.x = self.y = 0.0
+            self.distance = 0.0
+            self.velocity = 0.0
+            self.target_velocity = 0.0
+            self.heading = 0
+            self.aim_offset = 0
+            self.speed = 0
+            self.started = self.clock.perf_counter()
+            self._last_update = self.started
+
+    def cm_per_sec(self, speed):
+        # steady state velocity for a speed command (0-255)
+        speed = abs(speed)
+        if speed <= self.deadband:
+            return 0.0
+        return self.gain * (speed - self.deadband) * (1.0 - self.droop * speed)
+
+    def update(self):
+        # integrate the motion up to now (exact solution of the first order lag)
+        with self._lock:
+            now = self.clock.perf_counter()
+            dt = now - self._last_update
+            if dt <= 0:
+                return
+            self._last_update = now
+            v0, vt = self.velocity, self.target_velocity
+            decay = math.exp(-dt / self.motor_lag)
+            travelled = vt * dt + (v0 - vt) * self.motor_lag * (1.0 - decay)
+            self.velocity = vt + (v0 - vt) * decay
+            # positions are in the aimed frame, like the robot's locator
+            angle = math.radians(self.heading)
+            self.x += travelled * math.sin(angle)
+            self.y += travelled * math.cos(angle)
+            self.distance += abs(travelled)
+
+    def command(self, kind):
+        # one BLE round trip: count it and wait the link latency
+        if self.link_lost and (kind != 'connect' or self.clock.perf_counter() < self.link_down_until):
+            # a dead link answers nothing: the command times out
+            self._wait_link(self.link_timeout)
+            raise ConnectionError(f"{self.name}: BLE link lost ({kind})")
+        if kind == 'connect':
+            self.link_lost = False
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        self.commands[kind] += 1
+        self.ble_time += delay
+        self._wait_link(delay)
+        self.update()
+
+    def _wait_link(self, seconds):
+        if self.defer_latency:
+            self.pending_delay += seconds
+        else:
+            self.clock.sleep(seconds)
+
+    def take_delay(self):
+        delay, self.pending_delay = self.pending_delay, 0.0
+        return delay
+
+    def drive(self, heading, speed):
+        # what the roll/set_speed/set_heading commands do on the robot
+        self.update()
+        with self._lock:
+            self.heading = int(heading) % 360
+            self.speed = max(-255, min(255, int(speed)))
+            self.target_velocity = math.copysign(self.cm_per_sec(self.speed), self.speed)
+
+    def acceleration(self):
+        # accelerometer in g: x left/right, y forward/back, z up/down
+        self.update()
+        forward = (self.target_velocity - self.velocity) / self.motor_lag / G_CM_S2
+        tilt = math.radians(self.tilt)
+        return {'x': math.sin(tilt), 'y': forward, 'z': math.cos(tilt)}
+
+    # Notifications, as on spherov2's BOLT class
+    def add_collision_detected_notify_listener(self, listener):
+        self._collision_listeners.append(listener)
+
+    def remove_collision_detected_notify_listener(self, listener):
+        self._collision_listeners.remove(listener)
+
+    def configure_collision_detection(self, *args, **kwargs):
+        self.command('configure_collision_detection')
+
+    def drop_link(self, seconds):
+        # the robot stops when its central goes away; reconnecting works after `seconds`
+        self.link_lost = True
+        self.connected = False
+        self.link_down_until = self.clock.perf_counter() + seconds
+        self.drive(self.heading, 0)
+
+    def collide(self, power=1.0):
+        # a bump: the robot stops and notifies, on its own thread like the BLE stack
+        self.update()
+        with self._lock:
+            self.velocity = 0.0
+        data = {'power': power, 'speed': self.speed, 'time': self.clock.perf_counter()}
+        for listener in list(self._collision_listeners):
+            threading.Thread(target=listener, args=(data,), daemon=True).start()
+
+    def battery_voltage(self):
+        hours = (self.clock.perf_counter() - self.started) / 3600.0
+        sag = 0.05 * abs(self.speed) / 255
+        return round(self.full_voltage - self.drain_per_hour * hours - sag, 2)
+
+
+class SimSensorControl:
+    """toy.sensor_control: streams the accelerometer to listeners while connected."""
+
+    def __init__(self, toy, interval=0.1):
+        self.toy = toy
+        self.interval = interval
+        self.listeners = []
+        self.samples = 0
+        self._thread = None
+
+    def add_sensor_data_listener(self, listener):
+        self.listeners.append(listener)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._stream, daemon=True)
+            self._thread.start()
+
+    def remove_sensor_data_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def _stream(self):
+        while self.listeners:
+            if self.toy.connected:
+                data = {'accelerometer': self.toy.acceleration()}
+                self.samples += 1
+                for listener in list(self.listeners):
+                    listener(data)
+            self.toy.clock.wait(self.interval)
+
+
+class SimEventScript:
+    """Replays [(t, 'collision'), (t, 'tilt', degrees), (t, 'drop', seconds), ...]
+
+    on a toy, t in seconds from start()."""
+
+    def __init__(self, toy, script):
+        self.toy = toy
+        self.script = sorted(script, key=lambda e: e[0])
+        self.fired = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._start = self.toy.clock.perf_counter()
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        clock = self.toy.clock
+        for event in self.script:
+            while clock.perf_counter() - self._start < event[0]:
+                clock.wait(min(0.05, event[0] - (clock.perf_counter() - self._start)))
+            if event[1] == 'collision':
+                self.toy.collide()
+            elif event[1] == 'tilt':
+                self.toy.tilt = event[2]
+            elif event[1] == 'drop':
+                self.toy.drop_link(event[2])
+            self.fired.append((clock.perf_counter() - self._start,) + tuple(event[1:]))
+
+
+class SpheroEduAPI:
+    """Subset of spherov2.sphero_edu.SpheroEduAPI on top of a SimToy."""
+
+    def __init__(self, toy):
+        self.toy = toy
+        self.clock = toy.clock
+        self.leds = {'main': Color(0, 0, 0), 'front': Color(0, 0, 0), 'back': Color(0, 0, 0)}
+        self.matrix = None
+        self.stabilization = True
+        self._listeners = {}
+        toy.add_collision_detected_notify_listener(self._collision_detected_notify)
+
+    def __enter__(self):
+        self.toy.command('connect')
+        self.toy.connected = True
+        return self
+
+    def __exit__(self, *args):
+        if self.toy.speed:
+            self.stop_roll()
+        self.toy.command('sleep')
+        self.toy.connected = False
+
+    # Movements
+    def roll(self, heading, speed, duration):
+        self.toy.command('roll')
+        self.toy.drive(heading, speed)
+        self.clock.sleep(duration)
+        self.stop_roll()
+
+    def set_speed(self, speed):
+        self.toy.command('set_speed')
+        self.toy.drive(self.toy.heading, speed)
+
+    def stop_roll(self, heading=None):
+        self.toy.command('stop_roll')
+        self.toy.drive(self.toy.heading if heading is None else heading, 0)
+
+    def set_heading(self, heading):
+        self.toy.command('set_heading')
+        self.toy.drive(heading, self.toy.speed)
+
+    def spin(self, angle, duration):
+        self.toy.command('spin')
+        self.clock.sleep(duration)
+        self.toy.drive(self.toy.heading + angle, self.toy.speed)
+
+    def set_stabilization(self, stabilize):
+        self.toy.command('set_stabilization')
+        self.stabilization = stabilize
+
+    # Aiming: the current direction becomes heading 0
+    def reset_aim(self):
+        self.toy.command('reset_aim')
+        self.toy.update()
+        self.toy.aim_offset = (self.toy.aim_offset + self.toy.heading) % 360
+        self.toy.heading = 0
+
+    def start_calibration(self):
+        self.toy.command('start_calibration')
+
+    def finish_calibration(self):
+        self.reset_aim()
+
+    # Lights
+    def set_main_led(self, color):
+        self.toy.command('set_main_led')
+        self.leds['main'] = color
+
+    def set_front_led(self, color):
+        self.toy.command('set_front_led')
+        self.leds['front'] = color
+
+    def set_back_led(self, color):
+        self.toy.command('set_back_led')
+        self.leds['back'] = Color(0, 0, color) if isinstance(color, int) else color
+
+    def set_matrix_character(self, character, color):
+        self.toy.command('set_matrix_character')
+        self.matrix = (character, color)
+
+    def scroll_matrix_text(self, text, color, fps, wait):
+        self.toy.command('scroll_matrix_text')
+        if wait:
+            self.clock.sleep(len(text) / max(1, fps))
+
+    def clear_matrix(self):
+        self.toy.command('clear_matrix')
+        self.matrix = None
+
+    def get_main_led(self):
+        return self.leds['main']
+
+    def get_front_led(self):
+        return self.leds['front']
+
+    def get_back_led(self):
+        return self.leds['back']
+
+    # Events: like spherov2, every listener runs on a new thread with the api
+    def register_event(self, event_type, listener):
+        if listener:
+            self._listeners.setdefault(event_type, set()).add(listener)
+        else:
+            self._listeners.pop(event_type, None)
+
+    def _collision_detected_notify(self, data):
+        for listener in list(self._listeners.get(EventType.on_collision, ())):
+            threading.Thread(target=listener, args=(self,), daemon=True).start()
+
+    # Sensors: streamed by the robot, reading them costs no BLE round trip
+    def get_acceleration(self):
+        return self.toy.acceleration()
+
+    def get_velocity(self):
+        self.toy.update()
+        angle = math.radians(self.toy.heading)
+        return {'x': self.toy.velocity * math.sin(angle),
+                'y': self.toy.velocity * math.cos(angle)}
+
+    def get_location(self):
+        self.toy.update()
+        return {'x': self.toy.x, 'y': self.toy.y}
+
+    def get_distance(self):
+        self.toy.update()
+        return self.toy.distance
+
+    def get_speed(self):
+        return self.toy.speed
+
+    def get_heading(self):
+        return self.toy.heading
+
+    def get_orientation(self):
+        return {'pitch': 0.0, 'roll': self.toy.tilt, 'yaw': float(self.toy.heading)}
+
+
+class Power:
+
+    @staticmethod
+    def get_battery_voltage(toy, proc=None):
+        toy.command('get_battery_voltage')
+        return toy.battery_voltage()
+
+
+class SimScanner:
+    """Replaces spherov2.scanner; the same name always returns the same SimToy."""
+
+    def __init__(self, names=None, clock=None):
+        env_names = os.getenv('SPHERO_SIM_TOYS')
+        self.names = names or (env_names.split(',') if env_names else DEFAULT_TOYS)
+        self.clock = clock or default_clock
+        self.toys = {}
+
+    def toy(self, name):
+        if name not in self.toys:
+            self.toys[name] = SimToy(name, clock=self.clock)
+        return self.toys[name]
+
+    def find_toys(self, *, timeout=5.0, toy_types=None, toy_names=None, adapter=None):
+        names = [n for n in self.names if toy_names is None or n in toy_names]
+        return [self.toy(n) for n in names]
+
+    def find_toy(self, *, toy_name=None, **kwargs):
+        toys = self.find_toys(toy_names=None if toy_name is None else [toy_name])
+        if not toys:
+            raise ToyNotFoundError
+        return toys[0]
+
+
+scanner = SimScanner()
+
+
+class SimJoystick:
+    """Scripted stand-in for pygame.joystick.Joystick.
+
+    script(t) gets the seconds since the joystick was created and returns a
+    dict with optional keys 'axes' (x, y), 'buttons' (set of indexes) and
+    'hat' (x, y). Without a script the stick slowly circles at half throw."""
+
+    def __init__(self, script=None, clock=None, numbuttons=10, numhats=1):
+        self.clock = clock or default_clock
+        self.script = script or self.circle
+        self.numbuttons = numbuttons
+        self.numhats = numhats
+        self.start = self.clock.perf_counter()
+        self.reads = 0
+
+    @staticmethod
+    def circle(t):
+        return {'axes': (0.5 * math.sin(t / 2), -0.5 * math.cos(t / 2))}
+
+    def state(self):
+        self.reads += 1
+        return self.script(self.clock.perf_counter() - self.start)
+
+    def init(self):
+        pass
+
+    def get_axis(self, i):
+        axes = self.state().get('axes', (0.0, 0.0))
+        return axes[i] if i < len(axes) else 0.0
+
+    def get_button(self, i):
+        return 1 if i in self.state().get('buttons', ()) else 0
+
+    def get_numbuttons(self):
+        return self.numbuttons
+
+    def get_numhats(self):
+        return self.numhats
+
+    def get_hat(self, i):
+        return self.state().get('hat', (0, 0))
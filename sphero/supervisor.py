@@ -0,0 +1,171 @@
+# Keeps a BOLT connected: when the BLE link drops, the control loop's api
+# calls raise, the supervisor closes the dead session and reconnects to the
+# same toy object (its cached address, no new scan) with exponential backoff,
+# then calls on_connect(api, reconnected=True) so the controller can restore
+# its state (heading, matrix number, LEDs) before driving resumes. Before the
+# dead session is closed on_disconnect() is called, e.g. to pause battery
+# reads until on_connect. The first connect of run() goes through the same
+# backoff, so one failed BLE connect at start-up does not end the controller.
+#
+# After `rescan_after` failed attempts the toy is looked up again by name and
+# supervisor.toy becomes that new object. Controllers take the toy from
+# supervisor.toy in on_connect, so their sensor listeners and battery reads
+# follow it instead of staying on the dead one.
+#
+#   supervisor = ConnectionSupervisor(toy, on_connect=controller.restore)
+#   supervisor.run(controller.drive)      # drive(api) is the control loop
+#
+# Outages are recorded as (lost, recovered) times on the supervisor clock,
+# from the failed command of the control loop (before the dead session is
+# closed) to the restored session, so the time to recover can be measured (benchmarks/bench_supervisor.py uses a
+# simulated toy that drops its link, see simulator.SimEventScript).
+import concurrent.futures
+import contextlib
+import threading
+
+from backend import SpheroEduAPI, scanner, clock as backend_clock
+
+try:
+    from bleak.exc import BleakError
+except ImportError:  # simulator without bleak
+    BleakError = ConnectionError
+
+# what a lost link looks like from the api: BLE errors, timeouts waiting for
+# a response (spherov2 waits on a future), a closed transport. Not OSError as
+# a whole: a file or socket error of the control loop itself is a bug, not
+# something a reconnect fixes.
+LINK_ERRORS = (ConnectionError, TimeoutError, concurrent.futures.TimeoutError, EOFError, BleakError)
+
+
+class GaveUp(Exception):
+    """The toy could not be reconnected within give_up seconds."""
+
+
+class ConnectionSupervisor:
+
+    def __init__(self, toy, on_connect=None, backoff=0.25, max_backoff=2.0, give_up=120.0,
+                 rescan_after=5, clock=None, log=print, on_disconnect=None):
+        self.toy = toy
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.give_up = give_up
+        self.rescan_after = rescan_after
+        # simulated toys carry their own clock
+        self.clock = clock or getattr(toy, 'clock', None) or backend_clock
+        self.log = log
+        self.api = None
+        self.outages = []
+        self.attempts = 0
+        self._stop = threading.Event()
+
+    @property
+    def connected(self):
+        return self.api is not None
+
+    def stop(self):
+        # ends run() after the current loop iteration, or cuts a backoff short
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def connect(self):
+        """Open a session (one attempt); returns the api or raises a link error."""
+        self.attempts += 1
+        api = SpheroEduAPI(self.toy)
+        api.__enter__()
+        self.api = api
+        return api
+
+    @contextlib.contextmanager
+    def session(self):
+        """connect() as a with block; after an exception the session stays open for emergency_stop()."""
+        api = self.connect()
+        yield api
+        self.close()
+
+    def close(self):
+        api, self.api = self.api, None
+        if api is not None:
+            try:
+                api.__exit__(None, None, None)
+            except Exception:
+                pass  # the session is already dead
+
+    def reconnect(self, lost=None):
+        """Connect with backoff; returns the api, or None if stopped meanwhile.
+
+        lost is when the link went down (the outage is recorded from there);
+        None for the first connect of run()."""
+        start = self.clock.perf_counter() if lost is None else lost
+        what = 'Connect' if lost is None else 'Reconnect'
+        delay = self.backoff
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                api = self.connect()
+                if lost is not None:
+                    self.outages.append((lost, self.clock.perf_counter()))
+                return api
+            except LINK_ERRORS as e:
+                failures += 1
+                down = self.clock.perf_counter() - start
+                if self.give_up is not None and down > self.give_up:
+                    raise GaveUp(f"{self.toy.name}: no link for {down:.0f} s ({e})")
+                self.log(f"{what} {self.toy.name} failed ({e}), retry in {delay:.2f} s")
+                if failures % self.rescan_after == 0:
+                    self._rescan()
+            self.clock.wait(delay)
+            delay = min(self.max_backoff, delay * 2)
+        return None
+
+    def _rescan(self):
+        # the cached toy keeps failing: look it up again by name
+        try:
+            self.toy = scanner.find_toy(toy_name=self.toy.name)
+        except Exception as e:
+            self.log(f"Rescan for {self.toy.name} failed: {e}")
+
+    def run(self, body):
+        """Call body(api) until it returns or stop() is called, reconnecting on link loss."""
+        api = self.reconnect()
+        reconnected = False
+        try:
+            while api is not None:
+                try:
+                    if self.on_connect is not None:
+                        self.on_connect(api, reconnected)
+                    body(api)
+                    return
+                except LINK_ERRORS as e:
+                    lost = self.clock.perf_counter()
+                    if self._stop.is_set():
+                        return
+                    self.log(f"Link to {self.toy.name} lost ({e}), reconnecting …")
+                    if self.on_disconnect is not None:
+                        self.on_disconnect()
+                    self.close()
+                    api = self.reconnect(lost)
+                    reconnected = True
+        finally:
+            self.close()
+
+    def emergency_stop(self, led=None, attempts=3):
+        """Stop the motors on the open session, or on a fresh one if the link is gone."""
+        for _ in range(attempts):
+            try:
+                api = self.api or self.connect()
+                api.stop_roll()
+                if led is not None:
+                    api.set_main_led(led)
+                return True
+            except LINK_ERRORS:
+                self.close()
+                self.clock.wait(self.backoff)
+        return False
+
+    def recovery_times(self):
+        return [recovered - lost for lost, recovered in self.outages]
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# Lap telemetry: commands and sensor samples in a compact append-only log.
+#
+# A log is a small header (magic, version, JSON metadata) followed by fixed
+# 24-byte records, so NumPy can load a whole file in one np.fromfile call:
+#   kind     u1   COMMAND, SAMPLE, BATTERY, SEGMENT or END
+#   segment  u1   segment of the course the record belongs to
+#   aux      u2   command code (COMMANDS) for COMMAND records
+#   t_us     u4   microseconds since the recorder started (71 minutes max)
+#   v        8 x i2, depending on the kind:
+#     COMMAND  heading, speed, duration ms
+#     SAMPLE   heading, vx, vy (cm/s x10), ax, ay, az (milli-g), x, y (cm)
+#     BATTERY  millivolts (smoothed, from a battery.BatteryMonitor)
+#     SEGMENT  cm, planned duration (cs)
+#
+# Recording only packs the record into a preallocated chunk under a lock;
+# full chunks go to a writer thread through a bounded queue and are dropped
+# (and counted) rather than blocking the control loop if the disk stalls.
+# Chunks are also flushed every `flush_period`, so a crash loses little.
+#
+#   python race.py --name SB-9DD8 --telemetry          # logs to telemetry/
+#   python telemetry.py report telemetry/*.sptl        # compare segment splits
+import argparse
+import datetime
+import json
+import os
+import queue
+import struct
+import threading
+
+from backend import clock
+
+MAGIC = b"SPTL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")  # magic, version, record size, metadata length
+RECORD = struct.Struct("<BBHI8h")
+
+COMMAND, SAMPLE, BATTERY, SEGMENT, END = 1, 2, 3, 4, 5
+COMMANDS = ("roll", "set_speed", "set_heading", "stop_roll")
+# logged arguments of the commands, passed by position or by keyword
+PARAMS = {"roll": ("heading", "speed", "duration"), "set_speed": ("speed",), "set_heading": ("heading",)}
+NO_SEGMENT = 255
+
+
+def _i16(value):
+    return max(-32768, min(32767, int(round(value))))
+
+
+def new_log_path(folder, toy_name):
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(folder, f"{toy_name}_{stamp}.sptl")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(folder, f"{toy_name}_{stamp}-{n}.sptl")
+    return path
+
+
+class TelemetryAPI:
+    """Proxy around a SpheroEduAPI that logs the motion commands it forwards."""
+
+    def __init__(self, api, recorder):
+        self._api = api
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name not in COMMANDS:
+            return attr
+        code = COMMANDS.index(name)
+        recorder = self._recorder
+        params = PARAMS.get(name, ())
+
+        def command(*args, **kwargs):
+            # roll(heading, speed, duration), set_speed(speed), set_heading(heading)
+            values = args + tuple(kwargs[p] for p in params[len(args):] if p in kwargs)
+            if len(values) < len(params):
+                return attr(*args, **kwargs)  # missing argument: the api raises its TypeError
+            if name == "roll":
+                heading, speed, duration = values[:3]
+                recorder.record(COMMAND, code, heading, speed, duration * 1e3)
+            elif name == "set_speed":
+                recorder.record(COMMAND, code, recorder.heading, values[0])
+            elif name == "set_heading":
+                recorder.heading = values[0]
+                recorder.record(COMMAND, code, values[0])
+            else:
+                recorder.record(COMMAND, code)
+            return attr(*args, **kwargs)
+        return command
+
+
+class TelemetryRecorder:
+
+    def __init__(self, path, meta=None, chunk_records=256, max_pending=16, flush_period=0.5):
+        self.path = path
+        self.segment_index = NO_SEGMENT
+        self.heading = 0
+        self.dropped = 0
+        self.records = 0
+        self.flush_period = flush_period
+        self._chunk_records = chunk_records
+        self._chunk = bytearray(chunk_records * RECORD.size)
+        self._used = 0
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(max_pending)
+        self._t0 = clock.perf_counter()
+        meta = dict(meta or {}, started=datetime.datetime.now().isoformat(timespec="seconds"))
+        blob = json.dumps(meta).encode()
+        self._file = open(path, "xb")  # one run per file, never appended to an old one
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(blob)) + blob)
+        self._stop = threading.Event()
+        self._sampler = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, kind, aux=0, *values):
+        t_us = int((clock.perf_counter() - self._t0) * 1e6) & 0xFFFFFFFF
+        v = [_i16(x) for x in values] + [0] * (8 - len(values))
+        with self._lock:
+            RECORD.pack_into(self._chunk, self._used * RECORD.size,
+                             kind, self.segment_index, aux, t_us, *v)
+            self._used += 1
+            self.records += 1
+            if self._used == self._chunk_records:
+                self._hand_off()
+
+    def _hand_off(self):
+        # with the lock held: queue the filled part of the chunk, start a new one
+        if not self._used:
+            return
+        data = bytes(self._chunk[:self._used * RECORD.size])
+        try:
+            self._pending.put_nowait(data)
+        except queue.Full:
+            self.dropped += self._used
+        self._used = 0
+
+    def _write_loop(self):
+        while True:
+            try:
+                data = self._pending.get(timeout=self.flush_period)
+            except queue.Empty:
+                with self._lock:
+                    self._hand_off()
+                continue
+            if data is None:
+                break
+            self._file.write(data)
+            self._file.flush()
+
+    def segment(self, index, cm=0.0, planned=0.0):
+        self.segment_index = index
+        self.record(SEGMENT, 0, cm, planned * 100)
+
+    def end(self):
+        self.record(END)
+
+    def attach(self, api, period=0.05, battery=None):
+        """Start sampling api (and battery's status) in the background; returns the api to drive with."""
+        self._sampler = threading.Thread(target=self._sample_loop, args=(api, period, battery),
+                                         daemon=True)
+        self._sampler.start()
+        return TelemetryAPI(api, self)
+
+    def _sample_loop(self, api, period, battery):
+        battery_stamp = None
+        while not self._stop.is_set():
+            try:
+                v = api.get_velocity() or {"x": 0, "y": 0}
+                a = api.get_acceleration() or {"x": 0, "y": 0, "z": 0}
+                p = api.get_location() or {"x": 0, "y": 0}
+                self.record(SAMPLE, 0, api.get_heading() or 0, v["x"] * 10, v["y"] * 10,
+                            a["x"] * 1e3, a["y"] * 1e3, a["z"] * 1e3, p["x"], p["y"])
+                status = battery.status if battery is not None else None
+                if status is not None and status.voltage is not None and status.stamp != battery_stamp:
+                    # the monitor did the BLE read; log each new reading once
+                    self.record(BATTERY, 0, status.voltage * 1e3)
+                    battery_stamp = status.stamp
+            except Exception:
+                pass  # a missing reading must not stop the run
+            clock.wait(period)
+
+    def close(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        with self._lock:
+            self._hand_off()
+        self._pending.put(None)
+        self._writer.join()
+        self._file.close()
+
+
+# ===================== analysis (NumPy) =====================
+
+def record_dtype():
+    import numpy as np
+    return np.dtype([("kind", "u1"), ("segment", "u1"), ("aux", "<u2"), ("t_us", "<u4"), ("v", "<i2", (8,))])
+
+
+def load_run(path):
+    """(metadata, structured record array) of one log; a cut-off last record is ignored."""
+    import numpy as np
+    with open(path, "rb") as f:
+        magic, version, size, meta_len = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            raise ValueError(f"{path}: not a version {VERSION} telemetry log")
+        meta = json.loads(f.read(meta_len))
+    offset = HEADER.size + meta_len
+    count = (os.path.getsize(path) - offset) // RECORD.size
+    return meta, np.fromfile(path, record_dtype(), count=count, offset=offset)
+
+
+def segment_splits(records):
+    """Seconds per segment: SEGMENT marker to the next marker (or END); NaN if unfinished."""
+    import numpy as np
+    marks = records[records["kind"] == SEGMENT]
+    ends = records[records["kind"] == END]
+    t = marks["t_us"].astype(np.float64) / 1e6
+    stop = np.append(t[1:], ends["t_us"][-1] / 1e6 if len(ends) else np.nan)
+    return stop - t
+
+
+def segment_speeds(records, segments):
+    """Mean sampled speed (cm/s) per segment."""
+    import numpy as np
+    samples = records[(records["kind"] == SAMPLE) & (records["segment"] < segments)]
+    speed = np.hypot(samples["v"][:, 1], samples["v"][:, 2]) / 10.0
+    total = np.bincount(samples["segment"], speed, minlength=segments)
+    count = np.bincount(samples["segment"], minlength=segments)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / count
+
+
+def compare(paths):
+    """Group runs by course and stack their splits: {course: (paths, splits, speeds)}."""
+    import numpy as np
+    groups = {}
+    for path in paths:
+        meta, records = load_run(path)
+        splits = segment_splits(records)
+        key = (meta.get("course", "?"), meta.get("course_hash", ""), len(splits))
+        groups.setdefault(key, []).append((path, splits, segment_speeds(records, len(splits))))
+    return {key: ([r[0] for r in runs], np.vstack([r[1] for r in runs]), np.vstack([r[2] for r in runs]))
+            for key, runs in groups.items()}
+
+
+def report(paths):
+    import numpy as np
+    for (course, _, segments), (runs, splits, speeds) in compare(paths).items():
+        done = ~np.isnan(splits).any(axis=1)
+        print(f"\n{course}: {len(runs)} runs ({done.sum()} complete), {segments} segments")
+        if not done.any():
+            continue
+        complete = splits[done]
+        best, median = complete.min(axis=0), np.median(complete, axis=0)
+        lost = median - best
+        print("seg    best    median    std     lost   cm/s")
+        for i in range(segments):
+            print(f"{i:3d} {best[i]:7.3f} {median[i]:8.3f} {complete[:, i].std():7.3f} "
+                  f"{lost[i]:+7.3f} {np.nanmean(speeds[done, i]):6.1f}")
+        totals = complete.sum(axis=1)
+        print(f"lap best {totals.min():.3f} s, median {np.median(totals):.3f} s, "
+              f"sum of best segments {best.sum():.3f} s")
+        worst = np.argsort(lost)[::-1][:3]
+        print("most time lost (median - best): " + ", ".join(f"segment {i} {lost[i]:+.3f} s" for i in worst))
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sphero BOLT — lap telemetry logs")
+    p.add_argument("command", choices=["report"])
+    p.add_argument("logs", nargs="+", help=".sptl files written with --telemetry")
+    args = p.parse_args()
+    report(args.logs)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-import time, sys, argparse
-from spherov2 import scanner
-from spherov2.sphero_edu import SpheroEduAPI
+import sys, argparse
 from spherov2.types import Color
-from spherov2.commands import sensor as SensorCmd
+# vrai BOLT ou simulateur (SPHERO_SIM=1), voir backend.py
+from backend import scanner, SpheroEduAPI, clock
+# notifications de collision via une file bornée (events.py)
+from events import EventBus, EventSource, COLLISION
 
 LED_READY = Color(0,0,255)
 LED_RUN   = Color(255,120,0)
@@ -30,6 +31,8 @@ def main():
     p.add_argument("--name", required=True)
     p.add_argument("--speed", type=int, default=70)
     p.add_argument("--heading", type=int, default=0)
+    p.add_argument("--telemetry", nargs="?", const="telemetry", metavar="DIR",
+                   help="enregistrer commandes et capteurs dans DIR (voir telemetry.py)")
     args = p.parse_args()
 
     toy = find_toy(args.name)
@@ -38,37 +41,50 @@ def main():
         sys.exit(1)
 
     print(f"✅ Connecté à {toy.name}")
+    telemetry = None
+    if args.telemetry:
+        from telemetry import TelemetryRecorder, new_log_path
+        telemetry = TelemetryRecorder(new_log_path(args.telemetry, toy.name),
+                                      {"toy": toy.name, "course": "test", "speed": args.speed})
     try:
         with SpheroEduAPI(toy) as api:
-            # 🔕 coupe les notifications de collision (fix crash)
-            try: SensorCmd.disable_collision_detected_notify(api.toy)
-            except: pass
-            try: SensorCmd.configure_collision_detection(api.toy, enabled=False)
-            except: pass
+            # 💥 collisions : le thread BLE ne fait que poster, traitées entre deux roll()
+            events = EventBus()
+            collisions = []
+            events.subscribe(COLLISION, lambda e: (collisions.append(e.time),
+                                                   print(f"💥 Collision {len(collisions)}")))
+            EventSource(api, toy, events, tilt=False).start()
 
             api.set_stabilization(True)
             api.set_back_led(255)
             api.set_main_led(LED_READY)
 
             calibrate_zero(api)
+            if telemetry:
+                api = telemetry.attach(api)
 
             print("Prêt. ENTER pour démarrer, puis Ctrl+C pour arrêter et afficher le temps.")
             input()
 
             for k in (3,2,1):
                 print(f"… {k}")
-                api.set_main_led(Color(255,255,0)); time.sleep(0.25)
-                api.set_main_led(Color(0,0,0));     time.sleep(0.35)
+                api.set_main_led(Color(255,255,0)); clock.sleep(0.25)
+                api.set_main_led(Color(0,0,0));     clock.sleep(0.35)
 
             print("🏁 GO")
             api.set_main_led(LED_RUN)
-            t0 = time.perf_counter()
+            t0 = clock.perf_counter()
+            if telemetry:
+                telemetry.segment(0)
 
             # avance tout droit jusqu'au Ctrl+C
             while True:
                 api.roll(args.heading % 360, max(10, min(100, args.speed)), 1.0)
+                events.dispatch()
 
     except KeyboardInterrupt:
+        if telemetry:
+            telemetry.end()
         # Stop + chrono
         try:
             with SpheroEduAPI(toy) as api:
@@ -76,7 +92,7 @@ def main():
         except Exception:
             pass
         try:
-            elapsed = time.perf_counter() - t0
+            elapsed = clock.perf_counter() - t0
             print(f"\n⏱️ Temps mesuré: {elapsed:.3f} s")
         except:
             print("\n⛔ Arrêté.")
@@ -88,6 +104,10 @@ def main():
         except Exception:
             pass
         sys.exit(2)
+    finally:
+        if telemetry:
+            telemetry.close()
+            print(f"📈 Télémétrie : {telemetry.path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,12 @@
+# The scripts in sphero/ are run from their own folder and import each other
+# by module name; the tests run them on the simulator (see backend.py) and
+# build their own stepped VirtualClock, so no test really sleeps.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['SPHERO_SIM'] = '1'
+os.environ['SPHERO_SIM_SPEEDUP'] = 'inf'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
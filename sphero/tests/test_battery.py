@@ -0,0 +1,46 @@
+import pygame
+from spherov2.types import Color
+
+import battery
+import driveWithJoystick
+from simulator import SimJoystick, SimToy, VirtualClock
+
+
+def stepped_toy(name, **kwargs):
+    return SimToy(name, clock=VirtualClock(float('inf')), latency=0.01, jitter=0.0, **kwargs)
+
+
+def test_paused_monitor_reads_only_after_resume():
+    toy = stepped_toy('SB-PAUSE')
+    monitor = battery.BatteryMonitor(toy, period=1.0, paused=True, log=lambda *a: None)
+    assert monitor.status is battery.UNKNOWN
+    other = stepped_toy('SB-PAUSE')
+    status = monitor.resume(other)
+    assert monitor.toy is other and not monitor.paused
+    assert status.voltage == other.battery_voltage()
+    assert other.commands['get_battery_voltage'] == 1
+    monitor.pause()
+    assert monitor.paused
+
+
+def test_critical_battery_stops_the_controller_before_it_drives(monkeypatch):
+    reads = []
+
+    class Power:
+        # the real read fails on a toy that is not connected (yet, or any more)
+        @staticmethod
+        def get_battery_voltage(toy):
+            reads.append(toy.connected)
+            return toy.battery_voltage()
+
+    monkeypatch.setattr(battery, 'Power', Power)
+    pygame.init()
+    controller = driveWithJoystick.SpheroController(None, Color(255, 0, 0), 1)
+    controller.joystick = SimJoystick(SimJoystick.circle)
+    controller.toy = stepped_toy('SB-FLAT', battery_voltage=3.4)
+    controller.run_supervised()
+    assert controller.stop_reason == 'battery'
+    assert reads and all(reads)
+    assert controller.toy.distance == 0.0
+    # the last user released the monitor: no polling thread left behind
+    assert 'SB-FLAT' not in battery._monitors
@@ -0,0 +1,50 @@
+import math
+import random
+
+import pytest
+
+import curves
+
+
+def old_control_toy(x, y):
+    # what driveWithJoystick computed every loop before curves.py
+    dx, dy = x, -y
+    mag = math.hypot(dx, dy)
+    if mag > 0.2:
+        return math.degrees(math.atan2(dx, dy)), min(1.0, mag)
+    return None
+
+
+def pygame_axes(n, seed):
+    rng = random.Random(seed)
+    return [(rng.randint(-32768, 32767) / 32768, rng.randint(-32768, 32767) / 32768) for _ in range(n)]
+
+
+def test_linear_profile_is_the_old_math():
+    linear = curves.curve('linear')
+    assert linear.table is None
+    edge = [(0.2 * math.sin(a), 0.2 * math.cos(a)) for a in range(0, 360, 15)]
+    for x, y in pygame_axes(20000, 1) + edge + [(0.0, 0.0), (0.2, 0.0), (0.0, -0.2), (-1.0, 1.0)]:
+        assert linear.map(x, y) == old_control_toy(x, y)
+
+
+def test_table_matches_the_curve_on_its_grid():
+    c = curves.ResponseCurve('grid', **dict(curves.PROFILES['linear'], table=True))
+    grid = [c.axis(i) for i in range(0, c.steps + 1, 4)]
+    for x in grid:
+        for y in grid:
+            assert c.map(x, y) == c.evaluate(x, y)
+    assert c.map(3.0, -3.0) == c.evaluate(1.0, -1.0)
+
+
+@pytest.mark.parametrize('name', list(curves.PROFILES))
+def test_profiles_stop_at_the_centre_and_drive_at_full_throw(name):
+    c = curves.curve(name)
+    assert c.map(0.0, 0.0) is None
+    heading, throttle = c.map(0.0, -1.0)
+    assert heading == 0.0 and throttle == pytest.approx(1.0)
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        curves.curve('turbo')
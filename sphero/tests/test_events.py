@@ -0,0 +1,42 @@
+from events import COLLISION, TILT, EventBus, EventSource
+from simulator import SimToy, SpheroEduAPI, VirtualClock
+
+
+def test_full_bus_drops_the_oldest_events():
+    clock = VirtualClock(float('inf'))
+    bus = EventBus(maxsize=3, timer=clock.perf_counter)
+    seen = []
+    bus.subscribe(COLLISION, lambda event: seen.append((event.time, event.data['n'])))
+    for n in range(5):
+        bus.post(COLLISION, n=n)
+        clock.advance(0.1)
+    assert bus.posted == 5
+    assert bus.dropped == 2
+    assert bus.pending() == 3
+    assert bus.dispatch() == 3
+    assert [n for _, n in seen] == [2, 3, 4]
+    assert [round(t, 6) for t, _ in seen] == [0.2, 0.3, 0.4]
+
+
+def test_dispatch_limit_and_failing_handler():
+    bus = EventBus(timer=VirtualClock(float('inf')).perf_counter)
+    seen = []
+    bus.subscribe(TILT, lambda event: 1 / 0)
+    bus.subscribe(TILT, lambda event: seen.append(event.data['angle']))
+    for angle in (31.0, 35.0, 40.0):
+        bus.post(TILT, angle=angle)
+    assert bus.dispatch(limit=2) == 2
+    assert bus.errors == 2
+    assert seen == [31.0, 35.0]
+    assert bus.dispatch() == 1
+    assert bus.dropped == 0
+
+
+def test_source_keeps_the_sdk_collision_detection():
+    toy = SimToy('SB-EVENTS', clock=VirtualClock(float('inf')), latency=0.0, jitter=0.0)
+    with SpheroEduAPI(toy) as api:
+        source = EventSource(api, toy, EventBus(), tilt=False).start()
+        assert 'configure_collision_detection' not in toy.commands
+        source.stop()
+        EventSource(api, toy, EventBus(), tilt=False, collision_detection=(1, 60, 100, 60, 100, 1)).start()
+        assert toy.commands['configure_collision_detection'] == 1
@@ -0,0 +1,60 @@
+import game
+from simulator import VirtualClock
+
+# (time, input, player, data) posted while the engine ticks; both players are
+# ready at 0.5 s, so round 1 runs 1.5-6.5 s and round 2 9.5-14.5 s
+INPUTS = [
+    (0.0, game.READY, 1, {}),
+    (0.5, game.READY, 2, {}),
+    (2.0, game.COLLISION, 1, {}),
+    (2.2, game.COLLISION, 1, {}),       # debounced
+    (3.0, game.BOOST, 2, {}),
+    (3.5, game.TILT, 2, {'angle': 35.0}),
+    (6.0, game.LEVEL, 2, {}),
+    (7.0, game.COLLISION, 1, {}),       # break
+    (9.0, game.COLLISION, 2, {}),       # countdown
+    (11.0, game.COLLISION, 1, {}),
+    (13.5, game.COLLISION, 2, {}),
+]
+
+
+def play(log_path=None):
+    clock = VirtualClock(float('inf'))
+    engine = game.GameEngine([1, 2], rounds=2, round_seconds=5.0, countdown=1.0, break_seconds=2.0,
+                             log_path=log_path, clock=clock, log=lambda *a: None)
+    inputs = list(INPUTS)
+    while not engine.finished and clock.perf_counter() < 60.0:
+        while inputs and inputs[0][0] <= clock.perf_counter():
+            _, kind, player, data = inputs.pop(0)
+            engine.post(kind, player, **data)
+        engine.tick()
+        clock.advance(engine.period)
+    engine.stop()
+    return engine
+
+
+def summary(state):
+    return [(p.number, p.score, p.round_scores, p.collisions, p.hills, p.boosters_left)
+            for p in state.standings()]
+
+
+def test_rounds_follow_the_rules():
+    engine = play()
+    assert engine.finished
+    assert engine.state.phase == game.OVER
+    assert summary(engine.state) == [(1, 2, [1, 1], 2, 0, 3), (2, -1, [-2, 1], 1, 1, 3)]
+
+
+def test_replay_gives_the_published_state():
+    engine = play()
+    replayed = game.replay(engine.events)
+    assert summary(replayed) == summary(engine.state)
+    assert (replayed.phase, replayed.round) == (engine.state.phase, engine.state.round)
+
+
+def test_replay_from_the_log_file(tmp_path):
+    path = tmp_path / 'game.jsonl'
+    engine = play(str(path))
+    events = game.load_log(str(path))
+    assert events == engine.events
+    assert summary(game.replay(events)) == summary(engine.state)
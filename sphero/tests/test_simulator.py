@@ -0,0 +1,54 @@
+import pytest
+
+from simulator import SimToy, SpheroEduAPI, VirtualClock
+
+
+def stepped_toy(**kwargs):
+    return SimToy('SB-TEST', clock=VirtualClock(float('inf')), **kwargs)
+
+
+def test_every_command_takes_the_latency():
+    toy = stepped_toy(latency=0.03, jitter=0.0)
+    with SpheroEduAPI(toy) as api:
+        start = toy.clock.perf_counter()
+        api.set_speed(100)
+        api.set_heading(90)
+        api.stop_roll()
+        assert toy.clock.perf_counter() - start == pytest.approx(0.09)
+    assert toy.commands == {'connect': 1, 'set_speed': 1, 'set_heading': 1, 'stop_roll': 1, 'sleep': 1}
+    assert toy.ble_time == pytest.approx(0.15)
+
+
+def test_jitter_is_repeatable_with_a_seed():
+    times = []
+    for _ in range(2):
+        toy = stepped_toy(latency=0.03, jitter=0.01, seed=7)
+        for _ in range(50):
+            toy.command('set_speed')
+        times.append(toy.clock.perf_counter())
+        assert 50 * 0.02 <= toy.ble_time <= 50 * 0.04
+    assert times[0] == times[1]
+
+
+def test_deferred_latency_leaves_the_clock_alone():
+    toy = stepped_toy(latency=0.03, jitter=0.0)
+    toy.defer_latency = True
+    toy.command('set_speed')
+    toy.command('set_heading')
+    assert toy.clock.perf_counter() == 0.0
+    assert toy.take_delay() == pytest.approx(0.06)
+    assert toy.take_delay() == 0.0
+
+
+def test_dropped_link_times_out_until_reconnected():
+    toy = stepped_toy(latency=0.01, jitter=0.0)
+    toy.drop_link(1.0)
+    start = toy.clock.perf_counter()
+    with pytest.raises(ConnectionError):
+        toy.command('set_speed')
+    assert toy.clock.perf_counter() - start == pytest.approx(toy.link_timeout)
+    assert 'set_speed' not in toy.commands
+    toy.clock.advance(1.0)
+    toy.command('connect')
+    toy.command('set_speed')
+    assert not toy.link_lost
@@ -0,0 +1,89 @@
+import pytest
+
+from simulator import SimToy, VirtualClock
+from supervisor import ConnectionSupervisor, GaveUp
+
+
+def dropping_toy():
+    # no real sleeps: failed commands move the clock by link_timeout
+    return SimToy('SB-DROP', clock=VirtualClock(float('inf')), latency=0.01, jitter=0.0)
+
+
+def test_reconnects_and_restores_after_a_drop():
+    toy = dropping_toy()
+    sessions, dropped = [], []
+    supervisor = ConnectionSupervisor(toy, on_connect=lambda api, reconnected: sessions.append(reconnected),
+                                      on_disconnect=lambda: sessions.append('lost'), log=lambda *a: None)
+
+    def drive(api):
+        if len(sessions) == 1:
+            dropped.append(toy.clock.perf_counter())
+            toy.drop_link(1.0)
+            api.set_speed(100)  # raises: the link is gone
+        api.set_speed(50)
+
+    supervisor.run(drive)
+    assert sessions == [False, 'lost', True]
+    assert len(supervisor.outages) == 1
+    # lost when the failed command gave up, before closing the dead session
+    # timed out too; back as soon as the toy accepts connections again
+    lost, recovered = supervisor.outages[0]
+    assert lost == pytest.approx(dropped[0] + toy.link_timeout)
+    assert recovered - dropped[0] == pytest.approx(1.0 + toy.latency)
+    assert supervisor.attempts == 2
+    assert toy.commands['set_speed'] == 1
+    assert not supervisor.connected
+
+
+def test_first_connect_is_retried():
+    toy = dropping_toy()
+    toy.drop_link(1.2)
+    sessions = []
+    supervisor = ConnectionSupervisor(toy, on_connect=lambda api, reconnected: sessions.append(reconnected),
+                                      log=lambda *a: None)
+    supervisor.run(lambda api: api.set_speed(50))
+    assert sessions == [False]
+    assert supervisor.attempts == 4
+    assert supervisor.outages == []
+    assert toy.commands['set_speed'] == 1
+
+
+def test_other_errors_are_not_a_lost_link(tmp_path):
+    toy = dropping_toy()
+    supervisor = ConnectionSupervisor(toy, log=lambda *a: None)
+
+    def drive(api):
+        api.set_speed(50)
+        open(tmp_path / 'missing' / 'telemetry.csv', 'w')
+
+    with pytest.raises(FileNotFoundError):
+        supervisor.run(drive)
+    assert supervisor.attempts == 1
+    assert not supervisor.connected
+
+
+def test_gives_up_when_the_link_stays_down():
+    toy = dropping_toy()
+    supervisor = ConnectionSupervisor(toy, give_up=1.0, log=lambda *a: None)
+
+    def drive(api):
+        toy.drop_link(60.0)
+        api.set_speed(100)
+
+    with pytest.raises(GaveUp):
+        supervisor.run(drive)
+    assert supervisor.outages == []
+    assert not supervisor.connected
+
+
+def test_stop_ends_the_reconnect_loop():
+    toy = dropping_toy()
+    supervisor = ConnectionSupervisor(toy, give_up=None, log=lambda *a: None)
+
+    def drive(api):
+        toy.drop_link(60.0)
+        supervisor.stop()
+        api.set_speed(100)
+
+    supervisor.run(drive)
+    assert supervisor.attempts == 1
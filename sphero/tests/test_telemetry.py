@@ -0,0 +1,26 @@
+import pytest
+
+import telemetry
+from simulator import SimToy, SpheroEduAPI, VirtualClock
+
+
+def test_commands_are_logged_with_positional_and_keyword_arguments(tmp_path):
+    toy = SimToy('SB-TELEMETRY', clock=VirtualClock(float('inf')), latency=0.0, jitter=0.0)
+    path = str(tmp_path / 'run.sptl')
+    with SpheroEduAPI(toy) as api, telemetry.TelemetryRecorder(path) as recorder:
+        logged = telemetry.TelemetryAPI(api, recorder)
+        logged.roll(90, 100, 0.5)
+        logged.roll(heading=180, speed=60, duration=0.25)
+        logged.roll(270, speed=80, duration=0.1)
+        logged.set_heading(heading=45)
+        logged.set_speed(speed=70)
+        logged.stop_roll(heading=0)
+        with pytest.raises(TypeError):
+            logged.set_speed()
+    assert toy.commands['roll'] == 3
+    _, records = telemetry.load_run(path)
+    commands = records[records['kind'] == telemetry.COMMAND]
+    assert [telemetry.COMMANDS[c] for c in commands['aux']] == [
+        'roll', 'roll', 'roll', 'set_heading', 'set_speed', 'stop_roll']
+    assert [tuple(v[:3]) for v in commands['v'][:5]] == [
+        (90, 100, 500), (180, 60, 250), (270, 80, 100), (45, 0, 0), (45, 70, 0)]
@@ -0,0 +1,180 @@
+# Opt-in latency tracing for the control loops (SPHERO_TRACE=1).
+#
+# Stages are timed with the backend clock and collected in fixed-size
+# histograms, so memory stays constant however long a game runs:
+#   input           pygame pump + reading the stick
+#   decision        input read -> motor command ready (buttons, maths)
+#   api.<call>      every SpheroEduAPI call, start to end
+#   battery         Power.get_battery_voltage round trip
+#   stick_to_motor  input read -> set_speed returned
+# The report is printed on exit (and written as JSON to SPHERO_TRACE_FILE if
+# set); flaskJoystick.py also serves it on /metrics.
+#
+# When tracing is off, now()/stage() return 0.0 straight away, span() returns
+# a shared no-op context and wrap() hands back the api object itself.
+import atexit
+import contextlib
+import json
+import math
+import os
+import sys
+import threading
+
+from backend import clock
+
+# bucket i holds durations up to BUCKET_BASE * 2 ** (i / 2): 1 us .. ~95 s
+BUCKET_BASE = 1e-6
+BUCKET_COUNT = 54
+BUCKET_BOUNDS = [BUCKET_BASE * 2 ** (i / 2) for i in range(BUCKET_COUNT)]
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds > BUCKET_BASE:
+            index = min(BUCKET_COUNT - 1, math.ceil(2 * math.log2(seconds / BUCKET_BASE)))
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        # fold another histogram into this one (e.g. one per thread or toy)
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the requested fraction
+        wanted = fraction * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= wanted:
+                return min(BUCKET_BOUNDS[index], self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1e3,
+            'min_ms': self.min * 1e3,
+            'p50_ms': self.percentile(0.50) * 1e3,
+            'p90_ms': self.percentile(0.90) * 1e3,
+            'p99_ms': self.percentile(0.99) * 1e3,
+            'max_ms': self.max * 1e3,
+        }
+
+
+class TracedAPI:
+    """Proxy around a SpheroEduAPI that times every method call."""
+
+    def __init__(self, api, tracer):
+        self._api = api
+        self._tracer = tracer
+        self._methods = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr):
+            return attr
+        method = self._methods.get(name)
+        if method is None:
+            stage = 'api.' + name
+            tracer = self._tracer
+
+            def method(*args, **kwargs):
+                start = tracer.now()
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    tracer.stage(stage, start)
+            self._methods[name] = method
+        return method
+
+
+class Tracer:
+
+    def __init__(self, enabled=False, timer=None):
+        self.enabled = enabled
+        self.timer = timer or clock.perf_counter
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self.timer() if self.enabled else 0.0
+
+    def stage(self, name, start):
+        # record now - start under name, returns now (start of the next stage)
+        if not self.enabled:
+            return 0.0
+        end = self.timer()
+        self.record(name, end - start)
+        return end
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def span(self, name):
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        start = self.timer()
+        try:
+            yield
+        finally:
+            self.stage(name, start)
+
+    def wrap(self, api):
+        return TracedAPI(api, self) if self.enabled else api
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: h.summary() for name, h in sorted(self.histograms.items())}
+        return {'enabled': self.enabled, 'stages': stages}
+
+    def report(self):
+        lines = ['%-28s %7s %9s %9s %9s %9s %9s' % (
+            'stage', 'count', 'mean ms', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms')]
+        for name, s in self.snapshot()['stages'].items():
+            if s['count']:
+                lines.append('%-28s %7d %9.2f %9.2f %9.2f %9.2f %9.2f' % (
+                    name, s['count'], s['mean_ms'], s['p50_ms'], s['p90_ms'],
+                    s['p99_ms'], s['max_ms']))
+        return '\n'.join(lines)
+
+    def dump(self, path=None):
+        print(self.report(), file=sys.stderr)
+        if path:
+            with open(path, 'w') as f:
+                json.dump(self.snapshot(), f, indent=2)
+
+
+tracer = Tracer(enabled=os.getenv('SPHERO_TRACE', '') not in ('', '0'))
+
+if tracer.enabled:
+    atexit.register(tracer.dump, os.getenv('SPHERO_TRACE_FILE'))